@@ -1,13 +1,24 @@
 import streamlit as st
 import pandas as pd
+import json
+from functools import partial
 import plotly.express as px
 import plotly.graph_objects as go
-import requests
-import json
-import psycopg2
 from PIL import Image
 from streamlit_option_menu import option_menu
-from contextlib import contextmanager
+import export
+import metrics
+from config import ADMIN_PANEL, METRICS_HOST, METRICS_LOG_INTERVAL, METRICS_PORT
+from cube import load_transaction_cube
+from figcache import cached_figure
+from profiling import SHOW_TIMINGS_KEY, section
+from queries import QueryError, load_district_fact, load_fact, load_periods, load_slice
+from trends import TREND_TABLES, load_trend
+from pagedata import PAGES, prefetch
+from geo import (DISTRICT_FEATURE_ID_KEY, FEATURE_ID_KEY, load_district_geojson, load_states_geojson,
+                 match_districts, match_states)
+from pincodes import load_pincode_index, with_activity
+from warmup import Warmer
 
 #PAGE CONFIGURATION
 st.set_page_config(
@@ -41,38 +52,6 @@ st.markdown("""
     </style>
 """, unsafe_allow_html=True)
 
-# Database connection context manager
-@contextmanager
-def get_db_connection():
-    conn = None
-    try:
-        conn = psycopg2.connect(
-            host="localhost",
-            user="postgres",
-            password="AI@Guvi12345",
-            database="phone_pay",
-            port="5432"
-        )
-        yield conn
-    except Exception as e:
-        st.error(f"Database connection error: {e}")
-        yield None
-    finally:
-        if conn is not None:
-            conn.close()
-
-# Data loading functions with caching
-@st.cache_data(ttl=600)
-def load_data(table_name):
-    query = f"SELECT * FROM {table_name}"
-    try:
-        with get_db_connection() as conn:
-            if conn:
-                return pd.read_sql_query(query, conn)
-    except Exception as e:
-        st.error(f"Error loading {table_name} data: {e}")
-    return pd.DataFrame()
-
 # Helper functions
 def format_currency(amount):
     if amount >= 1e7:
@@ -81,16 +60,15 @@ def format_currency(amount):
         return f"₹{amount/1e5:.2f} L"
     return f"₹{amount:,.2f}"
 
-def create_geo_visualization(df, value_column, title):
-    url = "https://gist.githubusercontent.com/jbrobst/56c13bbbf9d97d187fea01ca62ea5112/raw/e388c4cae20aa53cb5090210a42ebb9b765c0a36/india_states.geojson"
-    response = requests.get(url)
-    data = json.loads(response.content)
+def create_geo_visualization(df, value_column, title, detail="coarse"):
+    data = load_states_geojson(detail)
+    df = df.assign(states=match_states(df['states']))
     
     fig = px.choropleth(
         df,
         geojson=data,
         locations='states',
-        featureidkey="properties.ST_NM",
+        featureidkey=FEATURE_ID_KEY,
         color=value_column,
         color_continuous_scale="Viridis",
         title=title
@@ -98,277 +76,664 @@ def create_geo_visualization(df, value_column, title):
     fig.update_geos(fitbounds="locations", visible=False)
     return fig
 
+# Downloads are generated in chunks only when clicked, off the script thread
+# Downloads stream from the API (api.py) instead of being built in the script run
+def export_buttons(view, year=None, quarter=None, state=None):
+    columns = st.columns(len(export.FORMATS))
+    for column, fmt in zip(columns, export.FORMATS):
+        column.link_button(f"Download {fmt.upper()}", export.export_url(view, fmt, year, quarter, state))
+
+METRIC_LABELS = {
+    'transaction_count': 'Transaction Count',
+    'transaction_amount': 'Transaction Amount',
+    'registereduser': 'Registered Users',
+    'appopens': 'App Opens',
+}
+
+GEO_METRICS = {
+    "Transaction Amount": 'transaction_amount',
+    "Transaction Count": 'transaction_count',
+    "Registered Users": 'registereduser',
+}
+
+def build_state_map(metric, year, quarter, detail="coarse"):
+    if metric == 'registereduser':
+        state_totals = load_slice("map_user", ('states',), (metric,), year, quarter)
+    else:
+        state_totals = load_transaction_cube().aggregate(('states',), (year, quarter))
+    return create_geo_visualization(
+        state_totals,
+        metric,
+        f'{METRIC_LABELS[metric]} by State ({year} Q{quarter})',
+        detail
+    )
+
+def build_district_map(metric, state, year, quarter, detail="coarse"):
+    geojson = load_district_geojson(state, detail)
+    if metric == 'registereduser':
+        district_totals = load_slice("map_user", ('districts',), (metric,), year, quarter, state)
+        district_totals = district_totals.rename(columns={'districts': 'district'})
+    else:
+        district_totals = load_slice("map_transaction", ('district',), (metric,), year, quarter, state)
+    district_totals = district_totals.assign(district=match_districts(district_totals['district'], geojson))
+    
+    fig = px.choropleth(
+        district_totals,
+        geojson=geojson,
+        locations='district',
+        featureidkey=DISTRICT_FEATURE_ID_KEY,
+        color=metric,
+        color_continuous_scale="Viridis",
+        title=f'{METRIC_LABELS[metric]} by District in {state} ({year} Q{quarter})'
+    )
+    fig.update_geos(fitbounds="locations", visible=False)
+    return fig
+
+PENETRATION_METRICS = {
+    "Transactions per Registered User": 'transactions_per_user',
+    "Amount per App Open": 'amount_per_app_open',
+}
+
+def penetration_ratios(df):
+    return df.assign(
+        transactions_per_user=df['transaction_count'] / df['registereduser'].where(df['registereduser'] != 0),
+        amount_per_app_open=df['transaction_amount'] / df['appopens'].where(df['appopens'] != 0)
+    )
+
+def build_penetration_ranking(ranked, metric, label, scope):
+    fig = px.bar(
+        ranked,
+        x=metric,
+        y='district',
+        color='states',
+        orientation='h',
+        title=f'{label} - Top Districts in {scope}'
+    )
+    fig.update_layout(yaxis={'categoryorder': 'total ascending'})
+    return fig
+
+def build_penetration_map(facts, metric, label, year, quarter, state=None):
+    if state is None:
+        # State ratios come from the summed district inputs, not from averaging ratios
+        state_totals = facts.groupby('states', as_index=False, observed=True)[
+            ['transaction_count', 'transaction_amount', 'registereduser', 'appopens']].sum()
+        return create_geo_visualization(
+            penetration_ratios(state_totals),
+            metric,
+            f'{label} by State ({year} Q{quarter})'
+        )
+    geojson = load_district_geojson(state)
+    districts = facts.assign(district=match_districts(facts['district'].astype(str), geojson))
+    fig = px.choropleth(
+        districts,
+        geojson=geojson,
+        locations='district',
+        featureidkey=DISTRICT_FEATURE_ID_KEY,
+        color=metric,
+        color_continuous_scale="Viridis",
+        title=f'{label} by District in {state} ({year} Q{quarter})'
+    )
+    fig.update_geos(fitbounds="locations", visible=False)
+    return fig
+
+# The state maps are the slowest charts to build; the warm-up renders the
+# latest quarter's before anyone asks for them
+def latest_quarter_figures(year, quarter):
+    return [
+        (partial(build_state_map, metric, year, quarter), 'state_map',
+         dict(metric=metric, year=year, quarter=quarter, detail="coarse"))
+        for metric in GEO_METRICS.values()
+    ]
+
+# One warm-up thread per process, started by the first session
+@st.cache_resource
+def start_warmup():
+    return Warmer(figure_jobs=latest_quarter_figures).start()
+
+# Metric export is optional and, like the warm-up, per process
+@st.cache_resource
+def start_metrics_export():
+    warmer = start_warmup()
+    if METRICS_PORT is not None:
+        metrics.serve(METRICS_PORT, METRICS_HOST, warmer)
+    if METRICS_LOG_INTERVAL > 0:
+        metrics.log_periodically(METRICS_LOG_INTERVAL, warmer)
+    return True
+
+# Trend controls only rerun this section
+@st.fragment
+def show_trends(trend_metrics, key):
+    st.subheader("Trends")
+    with section(f"{key}:trends"):
+        periods = load_periods(TREND_TABLES[trend_metrics[0]])
+        if periods.empty:
+            st.info("No quarterly rollups yet - run rollups.py")
+            return
+        periods = sorted(zip(periods['years'], periods['quarter']))
+        labels = [f"{year} Q{quarter}" for year, quarter in periods]
+    
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            metric = st.selectbox("Metric", trend_metrics, format_func=METRIC_LABELS.get, key=f'{key}_trend_metric')
+        with col2:
+            states = load_slice(TREND_TABLES[metric], ('states',), (metric,))
+            scope = st.selectbox("Scope", ["All India", *sorted(states['states'].unique())], key=f'{key}_trend_scope')
+        with col3:
+            window = st.number_input("Moving Average (quarters)", 1, 8, 4, key=f'{key}_trend_window')
+        start, end = st.select_slider("Quarter Range", options=labels, value=(labels[0], labels[-1]),
+                                      key=f'{key}_trend_range')
+    
+        trend = load_trend(metric, periods[labels.index(start)], periods[labels.index(end)],
+                           None if scope == "All India" else scope, window)
+        if trend.empty:
+            st.info("No data for this range")
+            return
+    
+        label = METRIC_LABELS[metric]
+        latest = trend.iloc[-1]
+        col1, col2, col3 = st.columns(3)
+        col1.metric(f"{label} ({latest['period']})", f"{latest[metric]:,.0f}")
+        col2.metric("QoQ Growth", "-" if pd.isna(latest['qoq_pct']) else f"{latest['qoq_pct']:.1f}%")
+        col3.metric("YoY Growth", "-" if pd.isna(latest['yoy_pct']) else f"{latest['yoy_pct']:.1f}%")
+    
+        def build_trend():
+            fig = go.Figure()
+            fig.add_trace(go.Scatter(x=trend['period'], y=trend[metric], name=label, mode='lines+markers'))
+            fig.add_trace(go.Scatter(x=trend['period'], y=trend['moving_avg'], name=f'{window}-Quarter Moving Average',
+                                     line=dict(dash='dash')))
+            fig.update_layout(title=f'{label} - {scope} ({start} to {end})', xaxis_title='Quarter', yaxis_title=label)
+            return fig
+    
+        fig = cached_figure(build_trend, 'trend', metric, state=scope, start=start, end=end, window=window)
+        st.plotly_chart(fig, use_container_width=True)
+    
+        col1, col2 = st.columns(2)
+        with col1:
+            def build_growth():
+                fig_growth = go.Figure()
+                fig_growth.add_trace(go.Bar(x=trend['period'], y=trend['qoq_pct'], name='QoQ %'))
+                fig_growth.add_trace(go.Bar(x=trend['period'], y=trend['yoy_pct'], name='YoY %'))
+                fig_growth.update_layout(barmode='group', title=f'{label} Growth (%)', yaxis_title='%')
+                return fig_growth
+        
+            fig_growth = cached_figure(build_growth, 'trend_growth', metric, state=scope, start=start, end=end)
+            st.plotly_chart(fig_growth, use_container_width=True)
+        with col2:
+            fig_cumulative = cached_figure(
+                lambda: px.area(trend, x='period', y='cumulative',
+                                title=f'Cumulative {label}', labels={'period': 'Quarter', 'cumulative': label}),
+                'trend_cumulative', metric, state=scope, start=start, end=end)
+            st.plotly_chart(fig_cumulative, use_container_width=True)
+
 def show_transaction_analysis():
     st.header("Transaction Analysis")
 
+# Picking a state or opening the details only reruns this panel
+@st.fragment
+def transaction_state_panel(cube, year, quarter, states):
+    with section("transaction:state_panel"):
+        # State Selection and Transaction Type Distribution
+        selected_state = st.selectbox("Select State", states)
+        state_breakdown = cube.aggregate(('transaction_type',), (year, quarter), states=selected_state)
+    
+        # Two pie charts side by side
+        col1, col2 = st.columns(2)
+        with col1:
+            # Transaction amount pie chart
+            fig_amount = cached_figure(
+                lambda: px.pie(state_breakdown, 
+                               values='transaction_amount',
+                               names='transaction_type',
+                               title=f'{selected_state} Transaction Amount Distribution'),
+                'transaction_type_pie', 'transaction_amount', year, quarter, selected_state)
+            st.plotly_chart(fig_amount)
+
+        with col2:
+            # Transaction count pie chart
+            fig_count = cached_figure(
+                lambda: px.pie(state_breakdown, 
+                               values='transaction_count',
+                               names='transaction_type',
+                               title=f'{selected_state} Transaction Count Distribution'),
+                'transaction_type_pie', 'transaction_count', year, quarter, selected_state)
+            st.plotly_chart(fig_count)
+    
+        # State metrics and detailed breakdown
+        st.subheader(f"{selected_state} Transaction Summary")
+        state_total = state_breakdown['transaction_amount'].sum()
+        state_count = state_breakdown['transaction_count'].sum()
+        st.write(f"Total Amount: {format_currency(state_total)}")
+        st.write(f"Transaction Count: {state_count:,}")
+    
+        if st.button("View More Details"):
+            st.write("Transaction Type Breakdown:")
+            st.dataframe(state_breakdown)
+        
+        export_buttons("transaction_types", year, quarter, selected_state)
+
 def show_transaction_analysis():
     st.header("Transaction Analysis")
     
     # Load data
-    df = load_data("aggregated_transaction")
-    if df.empty:
+    periods = load_periods("aggregated_transaction")
+    if periods.empty:
         st.warning("No transaction data available")
         return
     
     # Year and Quarter selection
     col1, col2 = st.columns([1,2])
     with col1:
-        years = sorted(df['years'].unique(), reverse=True)
+        years = sorted(periods['years'].unique(), reverse=True)
         year = st.selectbox("Select Year", years)
-        quarters = sorted(df['quarter'].unique())
-        quarter = st.selectbox("Select Quarter", quarters)
+        # Newest quarter of the year by default, the period the warm-up loads
+        quarters = sorted(periods.loc[periods['years'] == year, 'quarter'].unique())
+        quarter = st.selectbox("Select Quarter", quarters, index=len(quarters) - 1)
     
-    filtered_df = df[(df['years'] == year) & (df['quarter'] == quarter)]
+    # Everything the page shows for this quarter, fetched at once
+    with section("transaction:fetch"):
+        prefetch(PAGES["transaction"](year, quarter))
     
-    # Transaction Metrics
-    total_amount = filtered_df['transaction_amount'].sum()
-    total_count = filtered_df['transaction_count'].sum()
-    avg_amount = total_amount / total_count if total_count > 0 else 0
-    
-    col1, col2, col3 = st.columns(3)
-    col1.metric("Total Transaction Amount", format_currency(total_amount))
-    col2.metric("Total Transactions", f"{total_count:,}")
-    col3.metric("Average Transaction Value", format_currency(avg_amount))
+    cube = load_transaction_cube()
+    if cube is None:
+        st.warning("No transaction data available")
+        return
+    state_totals = cube.aggregate(('states',), (year, quarter))
     
-    # State Selection and Transaction Type Distribution
-    selected_state = st.selectbox("Select State", sorted(filtered_df['states'].unique()))
-    state_df = filtered_df[filtered_df['states'] == selected_state]
+    # Transaction Metrics
+    with section("transaction:overview"):
+        total_amount = state_totals['transaction_amount'].sum()
+        total_count = state_totals['transaction_count'].sum()
+        avg_amount = total_amount / total_count if total_count > 0 else 0
+        
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Total Transaction Amount", format_currency(total_amount))
+        col2.metric("Total Transactions", f"{total_count:,}")
+        col3.metric("Average Transaction Value", format_currency(avg_amount))
     
-    # Two pie charts side by side
-    col1, col2 = st.columns(2)
-    with col1:
-        # Transaction amount pie chart
-        type_df_amount = state_df.groupby('transaction_type').agg({
-            'transaction_amount': 'sum'
-        }).reset_index()
-        fig_amount = px.pie(type_df_amount, 
-                    values='transaction_amount', 
-                    names='transaction_type',
-                    title=f'{selected_state} Transaction Amount Distribution')
-        st.plotly_chart(fig_amount)
-
-    with col2:
-        # Transaction count pie chart
-        type_df_count = state_df.groupby('transaction_type').agg({
-            'transaction_count': 'sum'
-        }).reset_index()
-        fig_count = px.pie(type_df_count, 
-                    values='transaction_count', 
-                    names='transaction_type',
-                    title=f'{selected_state} Transaction Count Distribution')
-        st.plotly_chart(fig_count)
-    
-    # State metrics and detailed breakdown
-    st.subheader(f"{selected_state} Transaction Summary")
-    state_total = state_df['transaction_amount'].sum()
-    state_count = state_df['transaction_count'].sum()
-    st.write(f"Total Amount: {format_currency(state_total)}")
-    st.write(f"Transaction Count: {state_count:,}")
-    
-    if st.button("View More Details"):
-        st.write("Transaction Type Breakdown:")
-        state_breakdown = state_df.groupby('transaction_type').agg({
-            'transaction_amount': 'sum',
-            'transaction_count': 'sum'
-        }).reset_index()
-        st.dataframe(state_breakdown)
+    transaction_state_panel(cube, year, quarter, sorted(state_totals['states'].unique()))
     
     # State-wise bar charts
-    st.subheader("State-wise Transaction Analysis")
-    state_totals = filtered_df.groupby('states').agg({
-        'transaction_count': 'sum',
-        'transaction_amount': 'sum'
-    }).reset_index()
-    
-    # Transaction Amount by State
-    fig_bar_amount = px.bar(state_totals,
+    with section("transaction:state_bars"):
+        st.subheader("State-wise Transaction Analysis")
+    
+        # Transaction Amount by State
+        fig_bar_amount = cached_figure(
+            lambda: px.bar(state_totals,
                            x='transaction_amount',
                            y='states',
                            orientation='h',
-                           title='Transaction Amount by State')
-    st.plotly_chart(fig_bar_amount, use_container_width=True)
-    
-    # Transaction Count by State
-    fig_bar_count = px.bar(state_totals,
-                          x='transaction_count',
-                          y='states',
-                          orientation='h',
-                          title='Transaction Count by State')
-    st.plotly_chart(fig_bar_count, use_container_width=True)
+                           title='Transaction Amount by State'),
+            'state_bar', 'transaction_amount', year, quarter)
+        st.plotly_chart(fig_bar_amount, use_container_width=True)
+    
+        # Transaction Count by State
+        fig_bar_count = cached_figure(
+            lambda: px.bar(state_totals,
+                           x='transaction_count',
+                           y='states',
+                           orientation='h',
+                           title='Transaction Count by State'),
+            'state_bar', 'transaction_count', year, quarter)
+        st.plotly_chart(fig_bar_count, use_container_width=True)
+        
+        export_buttons("transaction_states", year, quarter)
+    
+    show_trends(('transaction_amount', 'transaction_count'), 'transaction')
+
+# The district drill-down reruns on its own
+@st.fragment
+def user_district_panel(year, quarter, states):
+    user_metrics = ('registereduser', 'appopens')
+    with section("user:district_panel"):
+        # State-wise Detailed Analysis
+        st.subheader("State-wise Detailed Analysis")
+        selected_state = st.selectbox("Select State", states)
+        state_df = load_slice("map_user", ('districts',), user_metrics, year, quarter, selected_state)
+    
+        col1, col2 = st.columns(2)
+    
+        with col1:
+            # Registered Users by District
+            fig_reg_users = cached_figure(
+                lambda: px.bar(state_df,
+                               x='registereduser',
+                               y='districts',
+                               orientation='h',
+                               title=f'Registered Users by District in {selected_state}',
+                               color_discrete_sequence=['#ff7f0e']),  # Orange color
+                'district_bar', 'registereduser', year, quarter, selected_state)
+            st.plotly_chart(fig_reg_users, use_container_width=True)
+    
+        with col2:
+            # App Opens by District
+            fig_app_opens = cached_figure(
+                lambda: px.bar(state_df,
+                               x='appopens',
+                               y='districts',
+                               orientation='h',
+                               title=f'App Opens by District in {selected_state}',
+                               color_discrete_sequence=['#1f77b4']),  # Blue color
+                'district_bar', 'appopens', year, quarter, selected_state)
+            st.plotly_chart(fig_app_opens, use_container_width=True)
+        
+        export_buttons("user_districts", year, quarter, selected_state)
 
 def show_user_analysis():
     st.header("User Analysis")
     
     # Load data
-    user_df = load_data("map_user")
-    agg_user_df = load_data("aggregated_user")  # For brand analysis
+    periods = load_periods("map_user")
     
-    if user_df.empty or agg_user_df.empty:
+    if periods.empty:
         st.warning("No user data available")
         return
     
     # Year and Quarter selection
     col1, col2 = st.columns([1,2])
     with col1:
-        years = sorted(user_df['years'].unique(), reverse=True)
+        years = sorted(periods['years'].unique(), reverse=True)
         year = st.selectbox("Select Year", years, key='user_year')
-        quarters = sorted(user_df['quarter'].unique())
-        quarter = st.selectbox("Select Quarter", quarters, key='user_quarter')
-    
-    # Filter data based on selection
-    filtered_user_df = user_df[(user_df['years'] == year) & (user_df['quarter'] == quarter)]
-    filtered_agg_user_df = agg_user_df[(agg_user_df['years'] == year) & (agg_user_df['quarter'] == quarter)]
-    
-    # Transaction Type Distribution Pie Chart
-    st.subheader("Transaction Type Distribution")
-    type_df = filtered_agg_user_df.groupby('brands').agg({
-        'transaction_count': 'sum'
-    }).reset_index()
-    
-    fig_pie = px.pie(type_df,
-                     values='transaction_count',
-                     names='brands',
-                     title=f'Transaction Distribution by Brand ({year} Q{quarter})')
-    st.plotly_chart(fig_pie, use_container_width=True)
-    
-    # Brand Transaction Count Bar Chart
-    st.subheader("Brand-wise Transaction Analysis")
-    fig_bar = px.bar(type_df,
-                     x='transaction_count',
-                     y='brands',
-                     orientation='h',
-                     title=f'Transaction Count by Brand ({year} Q{quarter})')
-    st.plotly_chart(fig_bar, use_container_width=True)
-    
-    # Registered Users and App Opens Analysis
-    st.subheader("State-wise User Metrics")
-    state_metrics = filtered_user_df.groupby('states').agg({
-        'registereduser': 'sum',
-        'appopens': 'sum'
-    }).reset_index()
-    
-    fig_metrics = go.Figure()
-    fig_metrics.add_trace(go.Bar(
-        name='Registered Users',
-        x=state_metrics['registereduser'],
-        y=state_metrics['states'],
-        orientation='h',
-        marker_color='#ff7f0e'  # Orange color for registered users
-    ))
-    fig_metrics.add_trace(go.Bar(
-        name='App Opens',
-        x=state_metrics['appopens'],
-        y=state_metrics['states'],
-        orientation='h',
-        marker_color='#1f77b4'  # Blue color for app opens
-    ))
-    
-    fig_metrics.update_layout(
-        barmode='group',
-        title=f'Registered Users and App Opens by State ({year} Q{quarter})',
-        xaxis_title='Count',
-        yaxis_title='State'
-    )
-    st.plotly_chart(fig_metrics, use_container_width=True)
-    
-    # State-wise Detailed Analysis
-    st.subheader("State-wise Detailed Analysis")
-    selected_state = st.selectbox("Select State", sorted(filtered_user_df['states'].unique()))
-    state_df = filtered_user_df[filtered_user_df['states'] == selected_state]
+        # Newest quarter of the year by default, the period the warm-up loads
+        quarters = sorted(periods.loc[periods['years'] == year, 'quarter'].unique())
+        quarter = st.selectbox("Select Quarter", quarters, index=len(quarters) - 1, key='user_quarter')
+    
+    # Everything the page shows for this quarter, fetched at once
+    with section("user:fetch"):
+        prefetch(PAGES["user"](year, quarter))
+    
+    with section("user:brands"):
+        # Transaction Type Distribution Pie Chart
+        st.subheader("Transaction Type Distribution")
+        type_df = load_slice("aggregated_user", ('brands',), ('transaction_count',), year, quarter)  # For brand analysis
+    
+        fig_pie = cached_figure(
+            lambda: px.pie(type_df,
+                           values='transaction_count',
+                           names='brands',
+                           title=f'Transaction Distribution by Brand ({year} Q{quarter})'),
+            'brand_pie', 'transaction_count', year, quarter)
+        st.plotly_chart(fig_pie, use_container_width=True)
+    
+        # Brand Transaction Count Bar Chart
+        st.subheader("Brand-wise Transaction Analysis")
+        fig_bar = cached_figure(
+            lambda: px.bar(type_df,
+                           x='transaction_count',
+                           y='brands',
+                           orientation='h',
+                           title=f'Transaction Count by Brand ({year} Q{quarter})'),
+            'brand_bar', 'transaction_count', year, quarter)
+        st.plotly_chart(fig_bar, use_container_width=True)
+    
+    with section("user:state_metrics"):
+        # Registered Users and App Opens Analysis
+        st.subheader("State-wise User Metrics")
+        user_metrics = ('registereduser', 'appopens')
+        state_metrics = load_slice("map_user", ('states',), user_metrics, year, quarter)
+    
+        def build_user_metrics():
+            fig_metrics = go.Figure()
+            fig_metrics.add_trace(go.Bar(
+                name='Registered Users',
+                x=state_metrics['registereduser'],
+                y=state_metrics['states'],
+                orientation='h',
+                marker_color='#ff7f0e'  # Orange color for registered users
+            ))
+            fig_metrics.add_trace(go.Bar(
+                name='App Opens',
+                x=state_metrics['appopens'],
+                y=state_metrics['states'],
+                orientation='h',
+                marker_color='#1f77b4'  # Blue color for app opens
+            ))
+    
+            fig_metrics.update_layout(
+                barmode='group',
+                title=f'Registered Users and App Opens by State ({year} Q{quarter})',
+                xaxis_title='Count',
+                yaxis_title='State'
+            )
+            return fig_metrics
     
-    col1, col2 = st.columns(2)
+        fig_metrics = cached_figure(build_user_metrics, 'state_user_metrics', None, year, quarter)
+        st.plotly_chart(fig_metrics, use_container_width=True)
     
-    with col1:
-        # Registered Users by District
-        fig_reg_users = px.bar(state_df,
-                              x='registereduser',
-                              y='districts', 
-                              orientation='h',
-                              title=f'Registered Users by District in {selected_state}',
-                              color_discrete_sequence=['#ff7f0e'])  # Orange color
-        st.plotly_chart(fig_reg_users, use_container_width=True)
+    user_district_panel(year, quarter, sorted(state_metrics['states'].unique()))
     
-    with col2:
-        # App Opens by District
-        fig_app_opens = px.bar(state_df,
-                              x='appopens',
-                              y='districts',  
-                              orientation='h',
-                              title=f'App Opens by District in {selected_state}',
-                              color_discrete_sequence=['#1f77b4'])  # Blue color
-        st.plotly_chart(fig_app_opens, use_container_width=True)
+    show_trends(('registereduser', 'appopens'), 'user')
 
 def show_geographical_insights():
     st.header("Geographical Insights")
     
     # Load all required data
-    trans_df = load_data("aggregated_transaction")
-    user_df = load_data("map_user")
+    periods = load_periods("aggregated_transaction")
     
-    if trans_df.empty or user_df.empty:
+    if periods.empty:
         st.warning("No data available")
         return
     
     # Year and Quarter selection
     col1, col2 = st.columns([1,2])
     with col1:
-        years = sorted(trans_df['years'].unique(), reverse=True)
+        years = sorted(periods['years'].unique(), reverse=True)
         year = st.selectbox("Select Year", years, key='geo_year')
-        quarters = sorted(trans_df['quarter'].unique())
-        quarter = st.selectbox("Select Quarter", quarters, key='geo_quarter')
+        # Newest quarter of the year by default, the period the warm-up loads
+        quarters = sorted(periods.loc[periods['years'] == year, 'quarter'].unique())
+        quarter = st.selectbox("Select Quarter", quarters, index=len(quarters) - 1, key='geo_quarter')
+    
+    # Everything the page shows for this quarter, fetched at once
+    with section("geo:fetch"):
+        prefetch(PAGES["geo"](year, quarter))
     
     # Visualization type selection
     viz_type = st.radio(
         "Select Visualization",
-        ["Transaction Amount", "Transaction Count", "Registered Users"]
+        list(GEO_METRICS)
     )
     
-    # Filter data based on selection
-    filtered_trans_df = trans_df[(trans_df['years'] == year) & (trans_df['quarter'] == quarter)]
-    filtered_user_df = user_df[(user_df['years'] == year) & (user_df['quarter'] == quarter)]
+    level = st.radio("Map Level", ["States", "Districts"], horizontal=True, key='geo_level')
     
-    if viz_type == "Transaction Amount":
-        state_totals = filtered_trans_df.groupby('states')['transaction_amount'].sum().reset_index()
-        fig = create_geo_visualization(
-            state_totals,
-            'transaction_amount',
-            f'Transaction Amount by State ({year} Q{quarter})'
-        )
-        st.plotly_chart(fig, use_container_width=True)
+    # Coarse geometry keeps the overview light; finer levels are for zooming in
+    detail = st.select_slider("Map Detail", options=["coarse", "medium", "fine"], key='geo_detail')
     
-    elif viz_type == "Transaction Count":
-        state_totals = filtered_trans_df.groupby('states')['transaction_count'].sum().reset_index()
-        fig = create_geo_visualization(
-            state_totals,
-            'transaction_count',
-            f'Transaction Count by State ({year} Q{quarter})'
-        )
+    metric = GEO_METRICS[viz_type]
+    if level == "Districts":
+        states = load_slice("map_transaction", ('states',), ('transaction_count',), year, quarter)
+        state = st.selectbox("Select State", sorted(states['states'].unique()), key='geo_state')
+        
+        # Only the selected state's district boundaries are ever loaded
+        if load_district_geojson(state, detail) is None:
+            st.info(f"No district boundaries for {state} - put india_districts.geojson in the geo "
+                    "directory and run python geo.py split-districts")
+        else:
+            with section("geo:district_map"):
+                fig = cached_figure(lambda: build_district_map(metric, state, year, quarter, detail),
+                                    'district_map', metric, year, quarter, state, detail=detail)
+                st.plotly_chart(fig, use_container_width=True)
+    else:
+        if metric != 'registereduser' and load_transaction_cube() is None:
+            st.warning("No transaction data available")
+            return
+        
+        with section("geo:map"):
+            fig = cached_figure(lambda: build_state_map(metric, year, quarter, detail),
+                                'state_map', metric, year, quarter, detail=detail)
+            st.plotly_chart(fig, use_container_width=True)
+    
+    show_trends(('transaction_amount', 'transaction_count', 'registereduser', 'appopens'), 'geo')
+
+# Searching runs on its own without redrawing the top-pincode charts
+@st.fragment
+def pincode_search_panel(year, quarter):
+    st.subheader("Nearby Pincodes")
+    with section("pincode:search"):
+        index = load_pincode_index()
+        if index is None:
+            st.info("No pincode locations loaded - run pincodes.py with the India Post pincode directory")
+            return
+        
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            pincode = st.text_input("Pincode", key='pin_search').strip()
+        with col2:
+            mode = st.radio("Search", ["Nearest", "Within Radius"], horizontal=True, key='pin_mode')
+        with col3:
+            if mode == "Nearest":
+                size = st.slider("Pincodes", 1, 50, 10, key='pin_k')
+            else:
+                size = st.slider("Radius (km)", 1, 200, 25, key='pin_radius')
+        
+        if not pincode:
+            st.caption("Enter a 6-digit pincode to find the pincodes around it")
+            return
+        location = index.locate(pincode) if pincode.isdigit() else None
+        if location is None:
+            st.warning(f"No location known for pincode {pincode}")
+            return
+        
+        found = index.nearest(*location, size) if mode == "Nearest" else index.within(*location, size)
+        found = with_activity(found, year, quarter)
+        
+        def build_nearby():
+            fig = px.scatter_geo(found.assign(pincode=found['pincodes'].astype(str)),
+                                 lat='latitude',
+                                 lon='longitude',
+                                 color='distance_km',
+                                 hover_name='pincode',
+                                 hover_data=['transaction_amount', 'transaction_count', 'registereduser'],
+                                 title=f'Pincodes near {pincode}')
+            fig.update_geos(fitbounds="locations")
+            return fig
+        
+        fig = cached_figure(build_nearby, 'nearby_pincodes', None, year, quarter,
+                            pincode=pincode, mode=mode, size=size)
         st.plotly_chart(fig, use_container_width=True)
+        st.dataframe(found, hide_index=True)
+
+def show_pincode_insights():
+    st.header("Pincode Insights")
     
-    else:  # Registered Users
-        state_totals = filtered_user_df.groupby('states')['registereduser'].sum().reset_index()
-        fig = create_geo_visualization(
-            state_totals,
-            'registereduser',
-            f'Registered Users by State ({year} Q{quarter})'
-        )
+    periods = load_periods("top_transaction")
+    if periods.empty:
+        st.warning("No pincode data available")
+        return
+    
+    # Year and Quarter selection
+    col1, col2 = st.columns([1,2])
+    with col1:
+        years = sorted(periods['years'].unique(), reverse=True)
+        year = st.selectbox("Select Year", years, key='pin_year')
+        # Newest quarter of the year by default, the period the warm-up loads
+        quarters = sorted(periods.loc[periods['years'] == year, 'quarter'].unique())
+        quarter = st.selectbox("Select Quarter", quarters, index=len(quarters) - 1, key='pin_quarter')
+    
+    # Everything the page shows for this quarter, fetched at once
+    with section("pincode:fetch"):
+        prefetch(PAGES["pincode"](year, quarter))
+    
+    with section("pincode:top"):
+        st.subheader("Top Pincodes")
+        states = load_slice("top_transaction", ('states',), ('transaction_count',), year, quarter)
+        
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            state = st.selectbox("State", ["All India", *sorted(states['states'].unique())], key='pin_state')
+        with col2:
+            metric = st.selectbox("Rank By", ['transaction_amount', 'transaction_count', 'registereduser'],
+                                  format_func=METRIC_LABELS.get, key='pin_metric')
+        with col3:
+            top_n = st.slider("Top N", 5, 50, 10, key='pin_top_n')
+        
+        table = "top_user" if metric == 'registereduser' else "top_transaction"
+        pincode_totals = load_slice(table, ('pincodes',), (metric,), year, quarter,
+                                    None if state == "All India" else state)
+        top = pincode_totals.nlargest(top_n, metric).astype({'pincodes': str})
+        
+        def build_top():
+            fig = px.bar(top,
+                         x=metric,
+                         y='pincodes',
+                         orientation='h',
+                         title=f'Top {top_n} Pincodes by {METRIC_LABELS[metric]} - {state} ({year} Q{quarter})')
+            # Pincodes are labels, largest first
+            fig.update_yaxes(type='category', autorange='reversed')
+            return fig
+        
+        fig = cached_figure(build_top, 'top_pincodes', metric, year, quarter, state, top_n=top_n)
         st.plotly_chart(fig, use_container_width=True)
+    
+    pincode_search_panel(year, quarter)
 
-def show_facts_analysis():
-    st.header("PhonePe Facts and Insights")
+def show_district_penetration():
+    st.header("District Penetration")
+    st.caption("Transactions and users per district, from the precomputed district x quarter fact table")
+    
+    periods = load_periods("district_quarter_fact")
+    if periods.empty:
+        st.warning("No district fact data available - run python rollups.py")
+        return
+    
+    col1, col2 = st.columns([1,2])
+    with col1:
+        years = sorted(periods['years'].unique(), reverse=True)
+        year = st.selectbox("Select Year", years, key='pen_year')
+        # Newest quarter of the year by default, the period the warm-up loads
+        quarters = sorted(periods.loc[periods['years'] == year, 'quarter'].unique())
+        quarter = st.selectbox("Select Quarter", quarters, index=len(quarters) - 1, key='pen_quarter')
+    
+    # Everything the page shows for this quarter, fetched at once
+    with section("penetration:fetch"):
+        prefetch(PAGES["penetration"](year, quarter))
+    
+    label = st.radio("Metric", list(PENETRATION_METRICS), horizontal=True, key='pen_metric')
+    metric = PENETRATION_METRICS[label]
     
     try:
-        conn = psycopg2.connect(
-            host="localhost",
-            user="postgres",
-            password="AI@Guvi12345",
-            database="phone_pay",
-            port="5432"
-        )
-        cursor = conn.cursor()
-    except Exception as e:
-        st.error(f"Database connection error: {e}")
+        facts = load_district_fact(year, quarter)
+    except QueryError as e:
+        st.error(str(e))
         return
+    if facts.empty:
+        st.info(f"No district facts for {year} Q{quarter}")
+        return
+    col1, col2 = st.columns(2)
+    with col1:
+        state = st.selectbox("State", ["All India", *sorted(facts['states'].unique())], key='pen_state')
+    with col2:
+        top_n = st.slider("Districts", 5, 50, 10, key='pen_top')
+    
+    scope = facts if state == "All India" else facts[facts['states'] == state]
+    scope = scope.dropna(subset=[metric])
+    # Ranked by the selected metric, nationally or within the state; the stored
+    # penetration ranks only follow transactions_per_user
+    ranked = (scope.assign(rank=scope[metric].rank(ascending=False, method="min").astype(int))
+              .sort_values(metric, ascending=False).head(top_n))
+    
+    with section("penetration:ranking"):
+        fig = cached_figure(lambda: build_penetration_ranking(ranked, metric, label, state),
+                            'penetration_ranking', metric, year, quarter, state, top_n=top_n)
+        st.plotly_chart(fig, use_container_width=True)
+        st.dataframe(ranked[['district', 'states', 'rank', 'transactions_per_user', 'amount_per_app_open',
+                             'transaction_count', 'transaction_amount', 'registereduser', 'appopens']],
+                     hide_index=True)
+        export_buttons("district_penetration", year, quarter, None if state == "All India" else state)
+    
+    with section("penetration:map"):
+        if state == "All India":
+            fig = cached_figure(lambda: build_penetration_map(facts, metric, label, year, quarter),
+                                'penetration_map', metric, year, quarter)
+        elif load_district_geojson(state) is None:
+            st.info(f"No district boundaries for {state} - put india_districts.geojson in the geo "
+                    "directory and run python geo.py split-districts")
+            return
+        else:
+            fig = cached_figure(lambda: build_penetration_map(scope, metric, label, year, quarter, state),
+                                'penetration_map', metric, year, quarter, state)
+        st.plotly_chart(fig, use_container_width=True)
+
+def show_facts_analysis():
+    st.header("PhonePe Facts and Insights")
     
     options = st.selectbox(
         "Select Fact to Explore",
@@ -391,163 +756,147 @@ def show_facts_analysis():
         if options == "Top Brands of Mobile Used":
             year = st.selectbox("Select Year", [2018, 2019, 2020, 2021, 2022])
             
-            query = f"""
-            SELECT brands, SUM(transaction_count) as count 
-            FROM aggregated_user 
-            WHERE years = {year} 
-            GROUP BY brands 
-            ORDER BY count DESC
-            """
+            df = load_fact("top_brands", year)
+            df.columns = ['Brand', 'Count']
             
-            cursor.execute(query)
-            data = cursor.fetchall()
-            df = pd.DataFrame(data, columns=['Brand', 'Count'])
-            
-            fig = px.bar(df, x='Brand', y='Count', 
-                        title=f'Mobile Brand Usage in {year}',
-                        color_discrete_sequence=['#ff4b4b'])
+            fig = cached_figure(
+                lambda: px.bar(df, x='Brand', y='Count', 
+                               title=f'Mobile Brand Usage in {year}',
+                               color_discrete_sequence=['#ff4b4b']),
+                'facts', options, year)
             st.plotly_chart(fig, use_container_width=True)
+            export_buttons("fact:top_brands", year)
             
         elif options == "Top 10 Districts - Lowest Transaction Amount":
             year = st.selectbox("Select Year", [2018, 2019, 2020, 2021, 2022])
             
-            query = f"""
-            SELECT district, SUM(transaction_amount) as amount 
-            FROM map_transaction 
-            WHERE years = {year} 
-            GROUP BY district 
-            ORDER BY amount ASC 
-            LIMIT 10
-            """
-            
-            cursor.execute(query)
-            data = cursor.fetchall()
-            df = pd.DataFrame(data, columns=['District', 'Amount'])
+            df = load_fact("districts_amount_lowest", year)
+            df.columns = ['District', 'Amount']
             
-            fig = px.pie(df, values='Amount', names='District', 
-                        title=f'Top 10 Districts with Lowest Transactions ({year})')
+            fig = cached_figure(
+                lambda: px.pie(df, values='Amount', names='District', 
+                               title=f'Top 10 Districts with Lowest Transactions ({year})'),
+                'facts', options, year)
             st.plotly_chart(fig, use_container_width=True)
+            export_buttons("fact:districts_amount_lowest", year)
             
         elif options == "Top 10 Districts - Highest Transaction Amount":
             year = st.selectbox("Select Year", [2018, 2019, 2020, 2021, 2022])
             
-            query = f"""
-            SELECT district, SUM(transaction_amount) as amount 
-            FROM map_transaction 
-            WHERE years = {year} 
-            GROUP BY district 
-            ORDER BY amount DESC 
-            LIMIT 10
-            """
+            df = load_fact("districts_amount_highest", year)
+            df.columns = ['District', 'Amount']
             
-            cursor.execute(query)
-            data = cursor.fetchall()
-            df = pd.DataFrame(data, columns=['District', 'Amount'])
-            
-            fig = px.pie(df, values='Amount', names='District', 
-                        title=f'Top 10 Districts with Highest Transactions ({year})')
+            fig = cached_figure(
+                lambda: px.pie(df, values='Amount', names='District', 
+                               title=f'Top 10 Districts with Highest Transactions ({year})'),
+                'facts', options, year)
             st.plotly_chart(fig, use_container_width=True)
+            export_buttons("fact:districts_amount_highest", year)
             
         elif options == "PhonePe Users Growth Trend":
-            query = """
-            SELECT years, SUM(registereduser) as users 
-            FROM map_user 
-            GROUP BY years 
-            ORDER BY years
-            """
-            
-            cursor.execute(query)
-            data = cursor.fetchall()
-            df = pd.DataFrame(data, columns=['Years', 'Users'])
+            df = load_fact("users_growth")
+            df.columns = ['Years', 'Users']
             
-            fig = px.line(df, x='Years', y='Users', 
-                         title='PhonePe Users Growth Over Years',
-                         markers=True)
+            fig = cached_figure(
+                lambda: px.line(df, x='Years', y='Users', 
+                                title='PhonePe Users Growth Over Years',
+                                markers=True),
+                'facts', options)
             st.plotly_chart(fig, use_container_width=True)
+            export_buttons("fact:users_growth")
             
         elif options in ["Top 10 States - Highest PhonePe Usage", "Top 10 States - Lowest PhonePe Usage"]:
             year = st.selectbox("Select Year", [2018, 2019, 2020, 2021, 2022])
-            order = "DESC" if "Highest" in options else "ASC"
+            level = "highest" if "Highest" in options else "lowest"
             
-            query = f"""
-            SELECT states, SUM(registereduser) as users 
-            FROM map_user 
-            WHERE years = {year} 
-            GROUP BY states 
-            ORDER BY users {order}
-            LIMIT 10
-            """
-            cursor.execute(query)
-            data = cursor.fetchall()
-            df = pd.DataFrame(data, columns=['States', 'Users'])
+            df = load_fact(f"states_usage_{level}", year)
+            df.columns = ['States', 'Users']
             
-            fig = px.pie(df, 
-                        values='Users', 
-                        names='States',
-                        title=f'{"Top" if "Highest" in options else "Bottom"} 10 States by PhonePe Usage ({year})')
+            fig = cached_figure(
+                lambda: px.pie(df, 
+                               values='Users',
+                               names='States',
+                               title=f'{"Top" if "Highest" in options else "Bottom"} 10 States by PhonePe Usage ({year})'),
+                'facts', options, year)
             st.plotly_chart(fig, use_container_width=True)
+            export_buttons(f"fact:states_usage_{level}", year)
             st.dataframe(df)
             
         elif options in ["Top 10 Districts - Highest PhonePe Usage", "Top 10 Districts - Lowest PhonePe Usage"]:
             year = st.selectbox("Select Year", [2018, 2019, 2020, 2021, 2022])
-            order = "DESC" if "Highest" in options else "ASC"
+            level = "highest" if "Highest" in options else "lowest"
             
-            query = f"""
-            SELECT districts, states, SUM(registereduser) as users 
-            FROM map_user 
-            WHERE years = {year} 
-            GROUP BY districts, states 
-            ORDER BY users {order}
-            LIMIT 10
-            """
-            cursor.execute(query)
-            data = cursor.fetchall()
-            df = pd.DataFrame(data, columns=['District', 'State', 'Users'])
+            df = load_fact(f"districts_usage_{level}", year)
+            df.columns = ['District', 'State', 'Users']
             
-            fig = px.pie(df, 
-                        values='Users', 
-                        names='District',
-                        title=f'{"Top" if "Highest" in options else "Bottom"} 10 Districts by PhonePe Usage ({year})',
-                        hover_data=['State'])
+            fig = cached_figure(
+                lambda: px.pie(df, 
+                               values='Users',
+                               names='District',
+                               title=f'{"Top" if "Highest" in options else "Bottom"} 10 Districts by PhonePe Usage ({year})',
+                               hover_data=['State']),
+                'facts', options, year)
             st.plotly_chart(fig, use_container_width=True)
+            export_buttons(f"fact:districts_usage_{level}", year)
             st.dataframe(df)
             
         elif options in ["Top 10 Districts - Highest Transaction Count", "Top 10 Districts - Lowest Transaction Count"]:
             year = st.selectbox("Select Year", [2018, 2019, 2020, 2021, 2022])
-            order = "DESC" if "Highest" in options else "ASC"
+            level = "highest" if "Highest" in options else "lowest"
             
-            query = f"""
-            SELECT states, district, SUM(transaction_count) as count 
-            FROM map_transaction 
-            WHERE years = {year} 
-            GROUP BY states, district 
-            ORDER BY count {order}
-            LIMIT 10
-            """
+            df = load_fact(f"districts_count_{level}", year)
+            df.columns = ['States', 'District', 'Count']
             
-            cursor.execute(query)
-            data = cursor.fetchall()
-            df = pd.DataFrame(data, columns=['States', 'District', 'Count'])
-            
-            fig = px.sunburst(df, path=['States', 'District'], values='Count',
-                             title=f'{"Top" if "Highest" in options else "Bottom"} 10 Districts by Transaction Count ({year})')
+            fig = cached_figure(
+                lambda: px.sunburst(df, path=['States', 'District'], values='Count',
+                                    title=f'{"Top" if "Highest" in options else "Bottom"} 10 Districts by Transaction Count ({year})'),
+                'facts', options, year)
             st.plotly_chart(fig, use_container_width=True)
+            export_buttons(f"fact:districts_count_{level}", year)
             
     except Exception as e:
         st.error(f"Error processing request: {e}")
         st.error("Please check your database schema and column names")
-    
-    finally:
-        cursor.close()
-        conn.close()
+def show_admin_panel():
+    with st.expander("Performance"):
+        snap = metrics.snapshot(start_warmup())
+        figure_cache = snap['figure_cache']
+        lookups = figure_cache['hits'] + figure_cache['misses']
+        
+        col1, col2 = st.columns(2)
+        col1.metric("Data Version", snap['data_version'])
+        col2.metric("Figure Cache Hits", f"{figure_cache['hits'] / lookups:.0%}" if lookups else "-")
+        
+        # Slowest first
+        st.caption("Queries")
+        st.dataframe(pd.DataFrame(snap['queries']).sort_values('total_s', ascending=False)
+                     if snap['queries'] else pd.DataFrame(), hide_index=True)
+        st.caption("Sections and stages")
+        st.dataframe(pd.DataFrame(snap['sections']).sort_values('total_s', ascending=False)
+                     if snap['sections'] else pd.DataFrame(), hide_index=True)
+        st.caption("Query caches")
+        st.dataframe(pd.DataFrame(snap['caches']), hide_index=True)
+        st.caption("Cached frame memory (bytes before and after compaction)")
+        st.dataframe(pd.DataFrame(snap['footprint']), hide_index=True)
+        st.caption(f"Figures ({figure_cache['figures']} cached, {figure_cache['bytes'] / 2**20:.1f} MB)")
+        st.dataframe(pd.DataFrame(snap['figures']), hide_index=True)
+        
+        st.download_button("Download Metrics (JSON)", json.dumps(snap, indent=2),
+                           "metrics.json", "application/json")
+        st.download_button("Download Metrics (Prometheus)", metrics.prometheus(snap),
+                           "metrics.prom", "text/plain")
+
 #  main() 
 def main():
+    start_warmup()
+    start_metrics_export()
+    
     with st.sidebar:
         selected = option_menu(
             "Navigation",
             ["Home", "Transaction Analysis", "User Analysis", 
-             "Geographical Insights", "Facts & Insights"],
-            icons=['house', 'graph-up', 'people', 'geo-alt', 'info-circle'],
+             "Geographical Insights", "Pincode Insights", "District Penetration", "Facts & Insights"],
+            icons=['house', 'graph-up', 'people', 'geo-alt', 'pin-map', 'bar-chart', 'info-circle'],
             menu_icon="cast",
             default_index=0,
             styles={
@@ -557,6 +906,9 @@ def main():
                 "nav-link-selected": {"background-color": "#ff4b4b"},
             }
         )
+        st.toggle("Show section timings", key=SHOW_TIMINGS_KEY)
+        if ADMIN_PANEL:
+            show_admin_panel()
     
     if selected == "Home":
         # Title Section
@@ -646,13 +998,18 @@ def main():
                 - Key statistics
                 - Trending patterns
             """)
-        
-    elif selected == "Transaction Analysis":
+
+    
+    if selected == "Transaction Analysis":
         show_transaction_analysis()
     elif selected == "User Analysis":
         show_user_analysis()
     elif selected == "Geographical Insights":
         show_geographical_insights()
+    elif selected == "Pincode Insights":
+        show_pincode_insights()
+    elif selected == "District Penetration":
+        show_district_penetration()
     elif selected == "Facts & Insights":
         show_facts_analysis()
 
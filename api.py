@@ -0,0 +1,341 @@
+"""Read-only JSON API over the dashboard's aggregations.
+
+Serves the numbers behind the dashboard pages and Facts & Insights from the
+same cached query layer (queries.py, cube.py, trends.py), so the API and the
+dashboard share caches, data versions and warm-up:
+
+    python api.py --port 8000
+    curl 'localhost:8000/v1/transactions/states?year=2024&quarter=1'
+    curl 'localhost:8000/v1/facts/top_brands?year=2022'
+    curl -OJ 'localhost:8000/v1/export/user_districts?format=csv&year=2024&quarter=1'
+
+Every response carries an ETag derived from the data version and the
+normalised request, so a conditional request (If-None-Match) is answered
+with 304 before any query runs. Bodies above GZIP_MIN_BYTES are gzipped for
+clients that accept it. Period parameters default to the newest quarter.
+A failed query is answered with 503 and no ETag, and is retried by the next
+request.
+
+/v1/export/{view} serves the views of export.py as CSV, Parquet or Excel
+files, for the dashboard's download links. Each export is written chunk by
+chunk to a temporary file, streamed out and deleted.
+"""
+import argparse
+import hashlib
+import logging
+import os
+import re
+import tempfile
+from contextlib import asynccontextmanager
+from functools import lru_cache
+
+import pandas as pd
+from starlette.applications import Starlette
+from starlette.background import BackgroundTask
+from starlette.concurrency import run_in_threadpool
+from starlette.exceptions import HTTPException
+from starlette.middleware import Middleware
+from starlette.middleware.gzip import GZipMiddleware
+from starlette.responses import FileResponse, JSONResponse, Response
+from starlette.routing import Route
+
+import export
+from config import API_HOST, API_PORT
+from cube import load_transaction_cube
+from queries import FACTS, QueryError, data_version, load_district_fact, load_fact, load_periods, load_slice
+from trends import TREND_TABLES, load_trend
+from warmup import Warmer, latest_period
+
+logger = logging.getLogger(__name__)
+# The query layer's st.cache_resource works outside a Streamlit session but
+# warns on every call from a new thread
+logging.getLogger("streamlit.runtime.scriptrunner_utils.script_run_context").setLevel(logging.ERROR)
+
+GZIP_MIN_BYTES = 500
+# Rendered bodies kept per process; keys include the data version
+BODY_CACHE_SIZE = 1024
+
+TABLES = ("aggregated_transaction", "aggregated_user", "map_transaction", "map_user", "top_transaction",
+          "district_quarter_fact", *sorted(set(TREND_TABLES.values())))
+TRANSACTION_METRICS = ("transaction_count", "transaction_amount")
+USER_METRICS = ("registereduser", "appopens")
+
+# path -> (load function, {query parameter: parser})
+ENDPOINTS = {}
+
+
+def endpoint(path, **params):
+    def register(load):
+        ENDPOINTS[path] = (load, params)
+        return load
+    return register
+
+
+def choice(*values):
+    def parse(value):
+        if value not in values:
+            raise ValueError(f"must be one of {', '.join(values)}")
+        return value
+    return parse
+
+
+def quarter(value):
+    value = int(value)
+    if value not in (1, 2, 3, 4):
+        raise ValueError("must be 1-4")
+    return value
+
+
+def limit(value):
+    value = int(value)
+    if value < 1:
+        raise ValueError("must be positive")
+    return value
+
+
+def period(value):
+    """A (year, quarter) written as 2024Q1."""
+    match = re.fullmatch(r"(\d{4})[Qq]([1-4])", value)
+    if match is None:
+        raise ValueError("must look like 2024Q1")
+    return int(match.group(1)), int(match.group(2))
+
+
+def _period(table, year, quarter):
+    if year is None or quarter is None:
+        latest = latest_period(table, raise_errors=True)
+        if latest is None:
+            raise LookupError(f"No {table} data")
+        year = latest[0] if year is None else year
+        quarter = latest[1] if quarter is None else quarter
+    return year, quarter
+
+
+def _transaction_totals(by, year, quarter, **where):
+    cube = load_transaction_cube(raise_errors=True)
+    if cube is None:
+        return pd.DataFrame(columns=[*by, *TRANSACTION_METRICS])
+    return cube.aggregate(by, _period("aggregated_transaction", year, quarter), **where)
+
+
+def _top(df, column, n, lowest=False):
+    return df.nsmallest(n, column) if lowest else df.nlargest(n, column)
+
+
+@endpoint("/v1/periods/{table}", table=choice(*TABLES))
+def periods(table):
+    return load_periods(table, raise_errors=True)
+
+
+@endpoint("/v1/transactions/states", year=int, quarter=quarter)
+def transaction_states(year=None, quarter=None):
+    """Transaction Analysis: count and amount per state."""
+    return _transaction_totals(("states",), year, quarter)
+
+
+@endpoint("/v1/transactions/types", year=int, quarter=quarter, state=str)
+def transaction_types(year=None, quarter=None, state=None):
+    """Transaction Analysis: breakdown by transaction type, nationally or for one state."""
+    where = {} if state is None else {"states": state}
+    return _transaction_totals(("transaction_type",), year, quarter, **where)
+
+
+@endpoint("/v1/transactions/districts", year=int, quarter=quarter, state=str,
+          metric=choice(*TRANSACTION_METRICS), limit=limit, order=choice("highest", "lowest"))
+def transaction_districts(year=None, quarter=None, state=None, metric="transaction_amount",
+                          limit=10, order="highest"):
+    """Geographical Insights: top districts by transactions, nationally or within a state."""
+    year, quarter = _period("map_transaction", year, quarter)
+    df = load_slice("map_transaction", ("states", "district"), TRANSACTION_METRICS, year, quarter, state,
+                    raise_errors=True)
+    return _top(df, metric, limit, order == "lowest")
+
+
+@endpoint("/v1/users/brands", year=int, quarter=quarter)
+def user_brands(year=None, quarter=None):
+    """User Analysis: registered devices per brand, with each brand's share."""
+    year, quarter = _period("aggregated_user", year, quarter)
+    df = load_slice("aggregated_user", ("brands",), ("transaction_count",), year, quarter, raise_errors=True)
+    total = df["transaction_count"].sum()
+    return df.assign(share_pct=df["transaction_count"] / total * 100 if total else 0.0)
+
+
+@endpoint("/v1/users/states", year=int, quarter=quarter)
+def user_states(year=None, quarter=None):
+    """User Analysis: registered users and app opens per state."""
+    year, quarter = _period("map_user", year, quarter)
+    return load_slice("map_user", ("states",), USER_METRICS, year, quarter, raise_errors=True)
+
+
+@endpoint("/v1/users/districts", year=int, quarter=quarter, state=str,
+          metric=choice(*USER_METRICS), limit=limit, order=choice("highest", "lowest"))
+def user_districts(year=None, quarter=None, state=None, metric="registereduser", limit=10, order="highest"):
+    """User Analysis: top districts by users, nationally or within a state."""
+    year, quarter = _period("map_user", year, quarter)
+    df = load_slice("map_user", ("states", "districts"), USER_METRICS, year, quarter, state, raise_errors=True)
+    return _top(df, metric, limit, order == "lowest")
+
+
+@endpoint("/v1/districts/penetration", year=int, quarter=quarter, state=str,
+          metric=choice("transactions_per_user", "amount_per_app_open"), limit=limit)
+def district_penetration(year=None, quarter=None, state=None, metric="transactions_per_user", limit=10):
+    """District Penetration: districts ranked by a per-user ratio, from district_quarter_fact."""
+    year, quarter = _period("district_quarter_fact", year, quarter)
+    df = load_district_fact(year, quarter)
+    if state is not None:
+        df = df[df["states"] == state]
+    return df.dropna(subset=[metric]).sort_values(metric, ascending=False).head(limit)
+
+
+@endpoint("/v1/pincodes", year=int, quarter=quarter, state=str,
+          metric=choice(*TRANSACTION_METRICS), limit=limit)
+def pincodes(year=None, quarter=None, state=None, metric="transaction_amount", limit=10):
+    """Pincode Insights: top pincodes by transactions."""
+    year, quarter = _period("top_transaction", year, quarter)
+    df = load_slice("top_transaction", ("pincodes",), (metric,), year, quarter, state, raise_errors=True)
+    return _top(df, metric, limit).astype({"pincodes": str})
+
+
+@endpoint("/v1/trends/{metric}", metric=choice(*TREND_TABLES), state=str, start=period, end=period,
+          window=limit)
+def trend(metric, state=None, start=None, end=None, window=4):
+    """Quarterly series with growth rates and moving averages (see trends.py)."""
+    return load_trend(metric, start, end, state, window, raise_errors=True)
+
+
+@endpoint("/v1/facts/{fact}", fact=choice(*FACTS), year=int)
+def fact(fact, year=None):
+    """Facts & Insights lookups; every one except users_growth needs a year."""
+    if fact == "users_growth":
+        return load_fact(fact)
+    if year is None:
+        raise ValueError("year is required")
+    return load_fact(fact, year)
+
+
+def _parse(request, params):
+    values = {**request.query_params, **request.path_params}
+    unknown = set(values) - set(params)
+    if unknown:
+        raise HTTPException(400, f"Unknown parameter(s): {', '.join(sorted(unknown))}")
+    parsed = {}
+    for name, value in values.items():
+        try:
+            parsed[name] = params[name](value)
+        except ValueError as e:
+            raise HTTPException(400 if name in request.query_params else 404, f"{name}: {e}")
+    return tuple(sorted(parsed.items()))
+
+
+@lru_cache(maxsize=BODY_CACHE_SIZE)
+def _body(path, args, version):
+    load = ENDPOINTS[path][0]
+    df = load(**dict(args))
+    rows = df.to_json(orient="records", date_format="iso")
+    return f'{{"data_version": {version}, "rows": {rows}}}'.encode()
+
+
+def _etag(path, args, version):
+    digest = hashlib.blake2b(repr((path, args)).encode(), digest_size=8).hexdigest()
+    return f'W/"{version}-{digest}"'
+
+
+def _not_modified(request, etag):
+    header = request.headers.get("if-none-match")
+    if header is None:
+        return False
+    # Weak comparison, as RFC 9110 prescribes for If-None-Match
+    tags = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return "*" in tags or etag.removeprefix("W/") in tags
+
+
+def _handler(path):
+    params = ENDPOINTS[path][1]
+
+    async def handle(request):
+        args = _parse(request, params)
+        # A memory read once the warmer has published a version; otherwise
+        # a backend probe at most every VERSION_POLL_INTERVAL seconds, kept
+        # off the event loop
+        version = await run_in_threadpool(data_version)
+        etag = _etag(path, args, version)
+        headers = {"ETag": etag, "Cache-Control": "no-cache", "X-Data-Version": str(version)}
+        if _not_modified(request, etag):
+            return Response(status_code=304, headers=headers)
+        try:
+            body = await run_in_threadpool(_body, path, args, version)
+        except QueryError as e:
+            # Not cached: the next request retries the query
+            logger.warning("%s failed: %s", path, e)
+            raise HTTPException(503, str(e))
+        except ValueError as e:
+            raise HTTPException(400, str(e))
+        except LookupError as e:
+            raise HTTPException(404, str(e))
+        return Response(body, media_type="application/json", headers=headers)
+
+    return handle
+
+
+EXPORT_PARAMS = {"view": choice(*export.VIEWS), "format": choice(*export.FORMATS),
+                 "year": int, "quarter": quarter, "state": str}
+
+
+async def export_view(request):
+    args = dict(_parse(request, EXPORT_PARAMS))
+    view, fmt = args.pop("view"), args.pop("format", "csv")
+    fd, path = tempfile.mkstemp(prefix="pulse-export-", suffix=f".{fmt}")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            await run_in_threadpool(export.export, view, fmt, out, **args)
+    except Exception as e:
+        os.remove(path)
+        if isinstance(e, ValueError):
+            raise HTTPException(400, str(e))
+        logger.warning("Export of %s failed: %s", view, e)
+        raise HTTPException(503, f"Error exporting {view}: {e}")
+    return FileResponse(path, media_type=export.FORMATS[fmt], filename=export.file_name(view, fmt, **args),
+                        background=BackgroundTask(os.remove, path))
+
+
+async def index(request):
+    return JSONResponse({
+        "data_version": await run_in_threadpool(data_version),
+        "endpoints": {path: sorted(params) for path, (_, params) in ENDPOINTS.items()},
+        "export": {"path": "/v1/export/{view}", "views": list(export.VIEWS), "formats": list(export.FORMATS)},
+    })
+
+
+async def http_error(request, exc):
+    return JSONResponse({"error": exc.detail}, status_code=exc.status_code, headers=exc.headers)
+
+
+@asynccontextmanager
+async def lifespan(app):
+    # Same warm-up as the dashboard: new data versions are loaded before they are served
+    Warmer().start()
+    yield
+
+
+app = Starlette(
+    routes=[Route("/", index), Route("/v1/export/{view}", export_view),
+            *(Route(path, _handler(path)) for path in ENDPOINTS)],
+    middleware=[Middleware(GZipMiddleware, minimum_size=GZIP_MIN_BYTES)],
+    exception_handlers={HTTPException: http_error},
+    lifespan=lifespan,
+)
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Serve the dashboard's aggregations as JSON")
+    parser.add_argument("--host", default=API_HOST)
+    parser.add_argument("--port", type=int, default=API_PORT)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    uvicorn.run(app, host=args.host, port=args.port, access_log=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,445 @@
+"""Storage backends the dashboard's query layer reads through.
+
+Every backend answers the same `select` call, its chunked counterpart
+`select_chunks` (used by export.py), and a cheap `version` probe of the
+data version (see dataversion.py):
+
+* PostgresBackend compiles it to SQL with bind parameters.
+* ParquetBackend scans a hive-partitioned snapshot (years=/quarter=) with
+  memory-mapped Arrow, reading only the needed columns and partitions.
+* DuckDBBackend runs the same SQL in an embedded DuckDB over the snapshot
+  or the live database.
+
+The backend is chosen with PHONEPE_BACKEND (see config.py). A snapshot of
+the database for the parquet backend is written with:
+
+    python backends.py snapshot [DIR]
+"""
+import argparse
+import itertools
+import json
+import operator
+import os
+import shutil
+import threading
+import time
+from functools import reduce
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+import streamlit as st
+from psycopg2.errors import UndefinedTable
+from pyarrow import fs
+
+try:
+    import duckdb
+except ImportError:  # optional, only needed for the duckdb backend
+    duckdb = None
+
+import dataversion
+from config import DB_CONFIG, DUCKDB_SOURCE, EXPORT_CHUNK_ROWS, PARQUET_DIR, STORAGE_BACKEND
+from db import get_connection, record_latency, run_query
+from schema import TABLES, check_columns, table_columns
+
+
+def _normalise_request(table, columns, group_by, metrics, filters, order_by):
+    filters = {column: value for column, value in (filters or {}).items() if value is not None}
+    check_columns(table, (*group_by, *filters), metrics)
+    if metrics:
+        output = (*group_by, *metrics)
+    else:
+        output = tuple(columns) or table_columns(table)
+        unknown = set(output) - set(table_columns(table))
+        if unknown:
+            raise ValueError(f"{table} has no column {', '.join(sorted(unknown))}")
+    if order_by is not None and order_by not in output:
+        raise ValueError(f"Cannot order {table} by {order_by}")
+    return filters, output
+
+
+def _quote(identifier):
+    return '"' + identifier.replace('"', '""') + '"'
+
+
+# Bind-parameter syntax of each driver
+PLACEHOLDERS = {
+    "pyformat": "%({})s",  # psycopg2
+    "dollar": "${}",       # duckdb
+}
+
+
+def build_query(table, columns=(), group_by=(), metrics=(), filters=None,
+                order_by=None, descending=False, limit=None, paramstyle="pyformat"):
+    """Compose a select/aggregate over one table as (query, params).
+
+    Identifiers are checked against schema.TABLES before they are quoted;
+    filter values are always passed as bind parameters.
+    """
+    filters, output = _normalise_request(table, columns, group_by, metrics, filters, order_by)
+    metric_types = TABLES[table]["metrics"]
+    placeholder = PLACEHOLDERS[paramstyle]
+
+    if metrics:
+        select = [_quote(column) for column in group_by]
+        select += [
+            f"SUM({_quote(column)})::{metric_types[column]} AS {_quote(column)}"
+            for column in metrics
+        ]
+    else:
+        select = [_quote(column) for column in output]
+    query = f"SELECT {', '.join(select)} FROM {_quote(table)}"
+    if filters:
+        query += " WHERE " + " AND ".join(
+            f"{_quote(column)} = {placeholder.format(column)}" for column in filters
+        )
+    if metrics and group_by:
+        query += f" GROUP BY {', '.join(_quote(column) for column in group_by)}"
+    order = [order_by] if order_by else list(group_by)
+    if order:
+        direction = "DESC" if descending else "ASC"
+        query += f" ORDER BY {', '.join(_quote(column) for column in order)} {direction}"
+    if limit is not None:
+        query += f" LIMIT {int(limit)}"
+    return query, filters
+
+
+def _non_empty(chunks, empty):
+    """Yield `chunks`, or a single empty frame from `empty()` if there are none."""
+    chunks = iter(chunks)
+    first = next(chunks, None)
+    if first is None:
+        yield empty()
+        return
+    yield from itertools.chain([first], chunks)
+
+
+# Names server-side cursors, which must be unique per connection
+_cursor_ids = itertools.count()
+
+
+# Snapshot file naming each table's current directory
+SNAPSHOT_TABLES_FILE = "_tables.json"
+
+
+def snapshot_tables(root):
+    """{table: directory name} of a Parquet snapshot.
+
+    Older snapshots without SNAPSHOT_TABLES_FILE keep each table in a
+    directory named after it.
+    """
+    try:
+        with open(os.path.join(root, SNAPSHOT_TABLES_FILE)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {table: table for table in TABLES if os.path.isdir(os.path.join(root, table))}
+
+
+def snapshot_table_dir(root, table):
+    return os.path.join(root, snapshot_tables(root).get(table, table))
+
+
+def _periods_query(table):
+    check_columns(table, ("years", "quarter"))
+    return f"SELECT DISTINCT years, quarter FROM {_quote(table)} ORDER BY years, quarter"
+
+
+class PostgresBackend:
+    name = "postgres"
+
+    def select(self, table, columns=(), group_by=(), metrics=(), filters=None,
+               order_by=None, descending=False, limit=None):
+        query, params = build_query(table, columns, group_by, metrics, filters,
+                                    order_by, descending, limit)
+        return run_query(query, params, name=f"{table}:{','.join(group_by) or 'rows'}")
+
+    def select_chunks(self, table, columns=(), group_by=(), metrics=(), filters=None,
+                      order_by=None, descending=False, limit=None, chunk_rows=EXPORT_CHUNK_ROWS):
+        """Like select, but yields the result in frames of up to `chunk_rows` rows."""
+        query, params = build_query(table, columns, group_by, metrics, filters,
+                                    order_by, descending, limit)
+        with get_connection() as conn:
+            # A named cursor keeps the result on the server; only one chunk is held here at a time
+            with conn.cursor(name=f"select_chunks_{next(_cursor_ids)}") as cursor:
+                cursor.itersize = chunk_rows
+                cursor.execute(query, params)
+
+                def chunks():
+                    while True:
+                        rows = cursor.fetchmany(chunk_rows)
+                        if not rows:
+                            return
+                        yield pd.DataFrame(rows, columns=[col[0] for col in cursor.description])
+
+                yield from _non_empty(chunks(), lambda: pd.DataFrame(columns=[col[0] for col in cursor.description]))
+
+    def periods(self, table):
+        return run_query(_periods_query(table), name=f"{table}:periods")
+
+    def version(self):
+        with get_connection() as conn:
+            return dataversion.read(conn)
+
+
+class ParquetBackend:
+    name = "parquet"
+
+    def __init__(self, root):
+        self.root = root
+        self.filesystem = fs.LocalFileSystem(use_mmap=True)
+        self._datasets = {}
+        self._version = None
+
+    def dataset(self, table):
+        if table not in self._datasets:
+            self._datasets[table] = ds.dataset(
+                snapshot_table_dir(self.root, table),
+                format="parquet",
+                partitioning="hive",
+                filesystem=self.filesystem,
+            )
+        return self._datasets[table]
+
+    def select(self, table, columns=(), group_by=(), metrics=(), filters=None,
+               order_by=None, descending=False, limit=None):
+        start = time.perf_counter()
+        filters, output = _normalise_request(table, columns, group_by, metrics, filters, order_by)
+        predicate = None
+        if filters:
+            predicate = reduce(operator.and_, (pc.field(c) == v for c, v in filters.items()))
+        # Only the projected columns of the matching partitions are read
+        arrow = self.dataset(table).to_table(columns=list(output), filter=predicate)
+        scanned = arrow.nbytes
+
+        if metrics and group_by:
+            arrow = arrow.group_by(list(group_by)).aggregate([(m, "sum") for m in metrics])
+            arrow = arrow.rename_columns([c.removesuffix("_sum") for c in arrow.column_names])
+        elif metrics:
+            arrow = pa.table({m: [pc.sum(arrow[m]).as_py() or 0] for m in metrics})
+        df = arrow.select(list(output)).to_pandas()
+
+        order = [order_by] if order_by else list(group_by)
+        if order:
+            df = df.sort_values(order, ascending=not descending, ignore_index=True)
+        if limit is not None:
+            df = df.head(int(limit))
+        # Bytes are what was read from the snapshot, before aggregation
+        record_latency(f"parquet:{table}:{','.join(group_by) or 'rows'}",
+                       time.perf_counter() - start, len(df), scanned)
+        return df
+
+    def select_chunks(self, table, columns=(), group_by=(), metrics=(), filters=None,
+                      order_by=None, descending=False, limit=None, chunk_rows=EXPORT_CHUNK_ROWS):
+        """Like select, but yields the result in frames of up to `chunk_rows` rows."""
+        if metrics or order_by or limit is not None:
+            # Aggregates and sorted results need the whole scan; they are small anyway
+            yield self.select(table, columns, group_by, metrics, filters, order_by, descending, limit)
+            return
+        filters, output = _normalise_request(table, columns, group_by, metrics, filters, order_by)
+        predicate = None
+        if filters:
+            predicate = reduce(operator.and_, (pc.field(c) == v for c, v in filters.items()))
+        scanner = self.dataset(table).scanner(columns=list(output), filter=predicate, batch_size=chunk_rows)
+        batches = (batch.to_pandas() for batch in scanner.to_batches() if batch.num_rows)
+        yield from _non_empty(batches, lambda: scanner.projected_schema.empty_table().to_pandas())
+
+    def periods(self, table):
+        check_columns(table, ("years", "quarter"))
+        if TABLES[table]["partitions"] == ("years", "quarter"):
+            # Partition keys come from the directory layout; no data is read
+            keys = pd.DataFrame([
+                ds.get_partition_keys(fragment.partition_expression)
+                for fragment in self.dataset(table).get_fragments()
+            ], columns=["years", "quarter"])
+        else:
+            keys = self.select(table, columns=("years", "quarter"))
+        return (keys
+                .drop_duplicates()
+                .sort_values(["years", "quarter"], ignore_index=True))
+
+    def version(self):
+        version = dataversion.read_file(self.root)
+        if version != self._version:
+            # A new snapshot replaced the files the open datasets list
+            self._datasets = {}
+            self._version = version
+        return version
+
+
+def _libpq_dsn(config):
+    keys = {"database": "dbname"}
+    return " ".join(
+        "{}='{}'".format(keys.get(key, key), str(value).replace("\\", "\\\\").replace("'", "\\'"))
+        for key, value in config.items()
+    )
+
+
+class DuckDBBackend:
+    """Runs the same SQL in an embedded, vectorised DuckDB engine.
+
+    Tables are exposed as views over either the Parquet snapshot or the live
+    PostgreSQL database (through DuckDB's postgres extension).
+    """
+    name = "duckdb"
+
+    def __init__(self, source="parquet", parquet_dir=PARQUET_DIR):
+        if duckdb is None:
+            raise RuntimeError("The duckdb backend needs the duckdb package (pip install duckdb)")
+        self.conn = duckdb.connect()
+        self.source = source
+        self.parquet_dir = parquet_dir
+        self._version = None
+        # Serialises the version check and view swap between threads
+        self._views_lock = threading.Lock()
+        if source == "parquet":
+            self._version = dataversion.read_file(parquet_dir)
+            self._create_views()
+        elif source == "postgres":
+            dsn = _libpq_dsn(DB_CONFIG).replace("'", "''")
+            self.conn.execute("INSTALL postgres")
+            self.conn.execute("LOAD postgres")
+            self.conn.execute(f"ATTACH '{dsn}' AS pg (TYPE postgres, READ_ONLY)")
+            for table in TABLES:
+                self.conn.execute(f"CREATE VIEW {_quote(table)} AS SELECT * FROM pg.public.{_quote(table)}")
+        else:
+            raise ValueError(f"Unknown duckdb source: {source}")
+
+    def _create_views(self):
+        cursor = self.conn.cursor()
+        try:
+            for table, name in snapshot_tables(self.parquet_dir).items():
+                table_dir = os.path.join(self.parquet_dir, name)
+                if table in TABLES and os.path.isdir(table_dir):
+                    pattern = os.path.join(table_dir, "**", "*.parquet").replace("'", "''")
+                    cursor.execute(
+                        f"CREATE OR REPLACE VIEW {_quote(table)} AS "
+                        f"SELECT * FROM read_parquet('{pattern}', hive_partitioning = true)"
+                    )
+        finally:
+            cursor.close()
+
+    def _execute(self, query, params, name):
+        # A cursor is a separate connection to the same database, safe per thread
+        cursor = self.conn.cursor()
+        try:
+            start = time.perf_counter()
+            df = cursor.execute(query, params).fetchdf()
+            record_latency(name, time.perf_counter() - start, len(df), df.memory_usage(deep=True).sum())
+            return df
+        finally:
+            cursor.close()
+
+    def select(self, table, columns=(), group_by=(), metrics=(), filters=None,
+               order_by=None, descending=False, limit=None):
+        query, params = build_query(table, columns, group_by, metrics, filters,
+                                    order_by, descending, limit, paramstyle="dollar")
+        return self._execute(query, params, f"duckdb:{table}:{','.join(group_by) or 'rows'}")
+
+    def select_chunks(self, table, columns=(), group_by=(), metrics=(), filters=None,
+                      order_by=None, descending=False, limit=None, chunk_rows=EXPORT_CHUNK_ROWS):
+        """Like select, but yields the result in frames of up to `chunk_rows` rows."""
+        query, params = build_query(table, columns, group_by, metrics, filters,
+                                    order_by, descending, limit, paramstyle="dollar")
+        cursor = self.conn.cursor()
+        try:
+            reader = cursor.execute(query, params).fetch_record_batch(chunk_rows)
+            batches = (batch.to_pandas() for batch in reader)
+            yield from _non_empty(batches, lambda: reader.schema.empty_table().to_pandas())
+        finally:
+            cursor.close()
+
+    def periods(self, table):
+        return self._execute(_periods_query(table), None, f"duckdb:{table}:periods")
+
+    def version(self):
+        if self.source == "parquet":
+            with self._views_lock:
+                version = dataversion.read_file(self.parquet_dir)
+                if version != self._version:
+                    # A new snapshot points the tables at new directories
+                    self._create_views()
+                    self._version = version
+            return version
+        try:
+            df = self._execute("SELECT version FROM pg.public.data_version", None, "duckdb:data_version")
+        except duckdb.CatalogException:
+            return 0
+        return int(df.iloc[0, 0]) if len(df) else 0
+
+
+@st.cache_resource
+def get_backend():
+    """The configured backend, shared by the whole process."""
+    if STORAGE_BACKEND == "postgres":
+        return PostgresBackend()
+    if STORAGE_BACKEND == "parquet":
+        return ParquetBackend(PARQUET_DIR)
+    if STORAGE_BACKEND == "duckdb":
+        return DuckDBBackend(DUCKDB_SOURCE, PARQUET_DIR)
+    raise ValueError(f"Unknown storage backend: {STORAGE_BACKEND}")
+
+
+def _write_json(path, data):
+    with open(path + ".tmp", "w") as f:
+        json.dump(data, f, indent=1, sort_keys=True)
+    os.replace(path + ".tmp", path)
+
+
+def write_snapshot(root, tables=None, source=None):
+    """Copy tables from `source` (PostgreSQL by default) into a partitioned Parquet snapshot.
+
+    Tables are written to new directories named after the snapshot's next
+    data version. Once every table is written, SNAPSHOT_TABLES_FILE is
+    swapped to point at them and the version is bumped, so readers always
+    see complete tables. The previous directories are kept for readers
+    still scanning them; older ones are deleted.
+    """
+    source = source or PostgresBackend()
+    os.makedirs(root, exist_ok=True)
+    version = dataversion.read_file(root) + 1
+    previous = snapshot_tables(root)
+    current = dict(previous)
+    for table in tables or TABLES:
+        try:
+            df = source.select(table)
+        except UndefinedTable:
+            # Optional tables (rollups, pincode centroids) may not have been created yet
+            if tables:
+                raise
+            print(f"{table}: not in the database, skipped")
+            continue
+        name = f"{table}.v{version}"
+        shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+        pq.write_to_dataset(
+            pa.Table.from_pandas(df, preserve_index=False),
+            root_path=os.path.join(root, name),
+            partition_cols=list(TABLES[table]["partitions"]),
+        )
+        current[table] = name
+        print(f"{table}: {len(df):,} rows written")
+    _write_json(os.path.join(root, SNAPSHOT_TABLES_FILE), current)
+    dataversion.write_file(root, version)
+
+    keep = set(current.values()) | set(previous.values())
+    for entry in os.listdir(root):
+        # <table> (older snapshots) or <table>.v<version>
+        if entry.split(".v")[0] in TABLES and entry not in keep:
+            shutil.rmtree(os.path.join(root, entry), ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Storage backend utilities")
+    commands = parser.add_subparsers(dest="command", required=True)
+    snapshot = commands.add_parser("snapshot", help="write a Parquet snapshot of the database")
+    snapshot.add_argument("root", nargs="?", default=PARQUET_DIR)
+    snapshot.add_argument("--tables", nargs="+", choices=list(TABLES))
+    args = parser.parse_args()
+
+    if args.command == "snapshot":
+        write_snapshot(args.root, args.tables)
+
+
+if __name__ == "__main__":
+    main()
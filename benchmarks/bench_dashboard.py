@@ -0,0 +1,277 @@
+"""Time the dashboard's data, aggregation and chart stages on synthetic data.
+
+    python -m benchmarks.bench_dashboard --scales 1 10 --output dashboard.json
+    python -m benchmarks.bench_dashboard --states 36 --districts 40 --years 2018-2030
+    python -m benchmarks.bench_dashboard --scales 1 --compare dashboard.json
+
+Each dataset is written to a Parquet snapshot that the regular query layer
+(queries.py, cube.py, trends.py) reads, so the numbers include compaction
+and caching. Every timing has a cold figure (first call: query, build or
+render) and the median of the repeated warm calls. With --compare, timings
+are matched against an earlier results file and the run fails when any
+median regressed by more than --threshold.
+"""
+import os
+import tempfile
+
+# The query layer reads the configured backend; aim it at the benchmark's
+# snapshot before config.py is imported
+SNAPSHOT_DIR = tempfile.mkdtemp(prefix="pulse-bench-")
+os.environ["PHONEPE_BACKEND"] = "parquet"
+os.environ["PHONEPE_PARQUET_DIR"] = SNAPSHOT_DIR
+
+import argparse
+import json
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import time
+
+import plotly.express as px
+import plotly.graph_objects as go
+import plotly.io as pio
+
+from backends import write_snapshot
+from benchmarks import synthetic
+from cube import load_transaction_cube
+from geo import DETAIL_LEVELS, FEATURE_ID_KEY, simplify_geojson
+from pincodes import PincodeIndex, with_activity
+from queries import FACTS, load_district_fact, load_fact, load_periods, load_slice, probe_version
+from trends import TREND_TABLES, load_trend
+
+
+class Recorder:
+    """Collects one result row per timed step."""
+
+    def __init__(self, repeat, **context):
+        self.repeat = repeat
+        self.context = context
+        self.results = []
+
+    def time(self, stage, name, fn, **extra):
+        """Run `fn` once cold and `repeat` times warm; returns its first result."""
+        start = time.perf_counter()
+        result = fn()
+        cold = time.perf_counter() - start
+        timings = []
+        for _ in range(self.repeat):
+            start = time.perf_counter()
+            fn()
+            timings.append(time.perf_counter() - start)
+        row = {**self.context, "stage": stage, "name": name,
+               "cold_ms": round(cold * 1000, 3),
+               "median_ms": round(statistics.median(timings) * 1000, 3), **extra}
+        self.results.append(row)
+        print(f"{stage:10s} {name:45s} cold {row['cold_ms']:9.2f} ms  warm {row['median_ms']:9.2f} ms")
+        return result
+
+    def figure(self, name, build):
+        """Time building, serialising and re-loading (a figure cache hit) one chart."""
+        fig = self.time("figure", f"{name}:build", build)
+        spec = self.time("figure", f"{name}:to_json", lambda: pio.to_json(fig, validate=False))
+        self.results[-1]["bytes"] = len(spec)
+        self.time("figure", f"{name}:from_json", lambda: go.Figure(json.loads(spec), _validate=False))
+
+
+def bench_pages(recorder, year, quarter, state):
+    """Query-layer loads and aggregations behind each show_* page."""
+    recorder.time("load", "periods:aggregated_transaction", lambda: load_periods("aggregated_transaction"))
+
+    # Transaction Analysis
+    cube = recorder.time("aggregate", "transaction:cube", load_transaction_cube)
+    state_totals = recorder.time("aggregate", "transaction:state_totals",
+                                 lambda: cube.aggregate(("states",), (year, quarter)))
+    breakdown = recorder.time("aggregate", "transaction:state_breakdown",
+                              lambda: cube.aggregate(("transaction_type",), (year, quarter), states=state))
+    recorder.time("aggregate", "transaction:year_totals",
+                  lambda: cube.aggregate(("states",), (year, 1), (year, 4)))
+
+    # User Analysis
+    brands = recorder.time("load", "user:brands",
+                           lambda: load_slice("aggregated_user", ("brands",), ("transaction_count",), year, quarter))
+    user_metrics = ("registereduser", "appopens")
+    state_metrics = recorder.time("load", "user:state_metrics",
+                                  lambda: load_slice("map_user", ("states",), user_metrics, year, quarter))
+    districts = recorder.time("load", "user:districts",
+                              lambda: load_slice("map_user", ("districts",), user_metrics, year, quarter, state))
+
+    # Geographical Insights
+    recorder.time("load", "geo:district_totals", lambda: load_slice(
+        "map_transaction", ("district",), ("transaction_amount",), year, quarter, state))
+
+    # District Penetration
+    recorder.time("load", "penetration:district_fact", lambda: load_district_fact(year, quarter))
+
+    # Trends on every page
+    trends = {}
+    for metric in TREND_TABLES:
+        trends[metric] = recorder.time("aggregate", f"trend:{metric}",
+                                       lambda metric=metric: load_trend(metric, window=4))
+    recorder.time("aggregate", "trend:transaction_amount:state",
+                  lambda: load_trend("transaction_amount", state=state, window=4))
+    return state_totals, breakdown, brands, state_metrics, districts, trends
+
+
+def bench_pincodes(recorder, centroids, year, quarter):
+    index = recorder.time("aggregate", "pincode:index", lambda: PincodeIndex(centroids))
+    latitude, longitude = float(centroids["latitude"].iloc[0]), float(centroids["longitude"].iloc[0])
+    found = recorder.time("aggregate", "pincode:nearest_10", lambda: index.nearest(latitude, longitude, 10))
+    recorder.time("aggregate", "pincode:within_100km", lambda: index.within(latitude, longitude, 100))
+    recorder.time("aggregate", "pincode:with_activity", lambda: with_activity(found, year, quarter))
+
+
+def bench_figures(recorder, state_totals, breakdown, brands, state_metrics, districts, trends):
+    """The charts each page draws, built the way the page builds them."""
+    recorder.figure("transaction:type_pie", lambda: px.pie(
+        breakdown, values="transaction_amount", names="transaction_type"))
+    recorder.figure("transaction:state_bars", lambda: px.bar(
+        state_totals, x="transaction_amount", y="states", orientation="h"))
+    recorder.figure("user:brand_pie", lambda: px.pie(brands, values="transaction_count", names="brands"))
+
+    def user_metrics():
+        fig = go.Figure()
+        fig.add_trace(go.Bar(name="Registered Users", x=state_metrics["registereduser"],
+                             y=state_metrics["states"], orientation="h"))
+        fig.add_trace(go.Bar(name="App Opens", x=state_metrics["appopens"],
+                             y=state_metrics["states"], orientation="h"))
+        fig.update_layout(barmode="group")
+        return fig
+
+    recorder.figure("user:state_metrics", user_metrics)
+    recorder.figure("user:district_bars", lambda: px.bar(
+        districts, x="registereduser", y="districts", orientation="h"))
+
+    trend = trends["transaction_amount"]
+
+    def trend_lines():
+        fig = go.Figure()
+        fig.add_trace(go.Scatter(x=trend["period"], y=trend["transaction_amount"], mode="lines+markers"))
+        fig.add_trace(go.Scatter(x=trend["period"], y=trend["moving_avg"], mode="lines"))
+        return fig
+
+    recorder.figure("trend:lines", trend_lines)
+
+
+def bench_choropleth(recorder, states, state_totals, vertices):
+    """Simplify synthetic state outlines and draw the state choropleth at every detail level."""
+    source = synthetic.states_geojson(states, vertices)
+    for detail, (tolerance, precision) in DETAIL_LEVELS.items():
+        geojson = recorder.time("geometry", f"simplify:{detail}",
+                                lambda: simplify_geojson(source, tolerance, precision))
+
+        def choropleth():
+            fig = px.choropleth(state_totals, geojson=geojson, locations="states",
+                                featureidkey=FEATURE_ID_KEY, color="transaction_amount",
+                                color_continuous_scale="Viridis")
+            fig.update_geos(fitbounds="locations", visible=False)
+            return fig
+
+        recorder.figure(f"choropleth:{detail}", choropleth)
+
+
+def bench_facts(recorder, year):
+    for fact in FACTS:
+        fact_year = None if fact == "users_growth" else year
+        recorder.time("fact", fact, lambda fact=fact, fact_year=fact_year: load_fact(fact, fact_year))
+
+
+def run(scale, args):
+    frames = synthetic.generate(scale, years=args.years, states=args.states,
+                                districts=args.districts, quarters=args.quarters)
+    rows = sum(len(df) for df in frames.values())
+    centroids = frames["pincode_centroids"]
+    states = synthetic.state_names(scale, args.states)
+    frames.update(synthetic.rollup_frames(frames))
+    write_snapshot(SNAPSHOT_DIR, source=synthetic.FrameSource(frames))
+    # A new snapshot version, so nothing is served from the previous scale's caches
+    probe_version(max_age=0)
+
+    recorder = Recorder(args.repeat, scale=scale, states=len(states), districts=args.districts,
+                        years=len(args.years), quarters=len(args.quarters), rows=rows)
+    year, quarter = max(args.years), max(args.quarters)
+    state = states[0]
+    data = bench_pages(recorder, year, quarter, state)
+    bench_pincodes(recorder, centroids, year, quarter)
+    bench_figures(recorder, *data)
+    bench_choropleth(recorder, states, data[0], args.vertices)
+    bench_facts(recorder, year)
+    return recorder.results
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline, threshold):
+    """Print median changes against a baseline run; returns the regressed rows."""
+    def key(row):
+        return row["scale"], row["states"], row["districts"], row["stage"], row["name"]
+
+    previous = {key(row): row for row in baseline["results"]}
+    regressions = []
+    print(f"\nCompared with {baseline['meta'].get('commit') or 'baseline'}:")
+    for row in results:
+        before = previous.get(key(row))
+        if before is None or not before["median_ms"]:
+            continue
+        ratio = row["median_ms"] / before["median_ms"]
+        flag = ""
+        if ratio > threshold:
+            regressions.append(row)
+            flag = "  REGRESSION"
+        print(f"x{row['scale']:<6g} {row['stage']:10s} {row['name']:45s} "
+              f"{before['median_ms']:9.2f} -> {row['median_ms']:9.2f} ms ({ratio:5.2f}x){flag}")
+    return regressions
+
+
+def _year_range(value):
+    first, _, last = value.partition("-")
+    return list(range(int(first), int(last or first) + 1))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scales", type=float, nargs="+", default=[1, 10])
+    parser.add_argument("--states", type=int, help="number of states (overrides --scales)")
+    parser.add_argument("--districts", type=int, default=synthetic.DISTRICTS_PER_STATE,
+                        help="districts per state")
+    parser.add_argument("--years", type=_year_range, default=_year_range("2018-2024"),
+                        help="year or FIRST-LAST range")
+    parser.add_argument("--quarters", type=int, nargs="+", default=[1, 2, 3, 4], choices=[1, 2, 3, 4])
+    parser.add_argument("--vertices", type=int, default=2_000, help="outline vertices per synthetic state")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--compare", help="results file of an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=1.25,
+                        help="slowdown ratio counted as a regression (default 1.25)")
+    args = parser.parse_args()
+
+    scales = [1] if args.states else args.scales
+    try:
+        results = [row for scale in scales for row in run(scale, args)]
+    finally:
+        shutil.rmtree(SNAPSHOT_DIR, ignore_errors=True)
+
+    report = {
+        "meta": {"commit": _git_commit(), "python": platform.python_version(),
+                 "platform": platform.platform(), "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                 "repeat": args.repeat},
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            if compare(results, json.load(f), args.threshold):
+                sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""Compare the DuckDB, Parquet and PostgreSQL backends on synthetic data.
+
+    python -m benchmarks.bench_duckdb --scales 1 10 100
+    python -m benchmarks.bench_duckdb --scales 10 --postgres-dsn "dbname=pulse_bench" --output duckdb.json
+
+--postgres-dsn also benchmarks PostgreSQL. It DROPS and reloads the Pulse
+tables of that database, so it must name a scratch database: settings it
+leaves out are taken from PHONEPE_DB_* (see config.py), and it is refused
+when it resolves to the dashboard's own database.
+"""
+import argparse
+import json
+import statistics
+import tempfile
+import time
+
+import psycopg2
+from psycopg2.extensions import parse_dsn
+
+import dataversion
+import loader
+import rollups
+from backends import DuckDBBackend, ParquetBackend, PostgresBackend, write_snapshot
+from benchmarks import synthetic
+from config import DB_CONFIG
+from queries import FACTS
+
+
+def workload(year, quarter, state):
+    """(name, select kwargs) pairs mirroring what the dashboard pages ask for."""
+    period = {"years": year, "quarter": quarter}
+    queries = [
+        ("page:transaction_state_totals", dict(
+            table="aggregated_transaction", group_by=("states",),
+            metrics=("transaction_count", "transaction_amount"), filters=period)),
+        ("page:transaction_type_breakdown", dict(
+            table="aggregated_transaction", group_by=("transaction_type",),
+            metrics=("transaction_count", "transaction_amount"), filters={**period, "states": state})),
+        ("page:user_brands", dict(
+            table="aggregated_user", group_by=("brands",), metrics=("transaction_count",), filters=period)),
+        ("page:user_state_metrics", dict(
+            table="map_user", group_by=("states",), metrics=("registereduser", "appopens"), filters=period)),
+        ("page:user_districts", dict(
+            table="map_user", group_by=("districts",), metrics=("registereduser", "appopens"),
+            filters={**period, "states": state})),
+        # The same top-N questions answered by scanning the base tables
+        ("scan:top_districts_amount", dict(
+            table="map_transaction", group_by=("states", "district"), metrics=("transaction_amount",),
+            filters={"years": year}, order_by="transaction_amount", descending=True, limit=10)),
+        ("scan:users_growth", dict(
+            table="map_user", group_by=("years",), metrics=("registereduser",))),
+    ]
+    for fact, spec in FACTS.items():
+        filters = {} if spec.get("group_by") == ("years",) else {"years": year}
+        queries.append((f"fact:{fact}", dict(spec, filters=filters)))
+    return queries
+
+
+def scratch_config(dsn):
+    """Connection settings for `dsn`, with DB_CONFIG filling in what it leaves out."""
+    settings = parse_dsn(dsn)
+    if "dbname" in settings:
+        settings["database"] = settings.pop("dbname")
+    return {**DB_CONFIG, **settings}
+
+
+def _server_database(config):
+    return config.get("host") or "localhost", str(config.get("port") or 5432), config["database"]
+
+
+def load_postgres(frames, config):
+    """Drop and reload the Pulse tables of database `config`, then bump its data version."""
+    conn = psycopg2.connect(**config)
+    try:
+        with conn.cursor() as cursor:
+            for table in loader.TABLE_SCHEMAS:
+                cursor.execute(f"DROP TABLE IF EXISTS {table}")
+        conn.commit()
+        for table in loader.TABLE_SCHEMAS:
+            loader.copy_frame(conn, table, frames[table])
+        rollups.create_rollups(conn)
+        rollups.refresh_rollups(conn)
+        # Anything serving this database must not keep results from before the drop
+        dataversion.bump(conn)
+        conn.autocommit = True
+        with conn.cursor() as cursor:
+            cursor.execute("ANALYZE")
+    finally:
+        conn.close()
+
+
+def time_query(backend, spec, repeat):
+    backend.select(**spec)  # warm-up
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        backend.select(**spec)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scales", type=float, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--postgres-dsn", metavar="DSN",
+                        help="also benchmark PostgreSQL on this scratch database (its tables are dropped!)")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    args = parser.parse_args()
+
+    if args.postgres_dsn:
+        config = scratch_config(args.postgres_dsn)
+        if _server_database(config) == _server_database(DB_CONFIG):
+            parser.error(f"--postgres-dsn names the dashboard database {DB_CONFIG['database']!r}; "
+                         "use a scratch database")
+        # PostgresBackend connects through db.py's pool, which reads DB_CONFIG
+        DB_CONFIG.update(config)
+
+    results = []
+    for scale in args.scales:
+        frames = synthetic.generate(scale)
+        rows = sum(len(df) for df in frames.values())
+        frames.update(synthetic.rollup_frames(frames))
+        with tempfile.TemporaryDirectory() as snapshot_dir:
+            write_snapshot(snapshot_dir, source=synthetic.FrameSource(frames))
+            backends = {
+                "duckdb": DuckDBBackend("parquet", snapshot_dir),
+                "parquet": ParquetBackend(snapshot_dir),
+            }
+            if args.postgres_dsn:
+                load_postgres(frames, DB_CONFIG)
+                backends["postgres"] = PostgresBackend()
+
+            year = int(frames["map_user"]["years"].max())
+            state = frames["map_user"]["states"].iloc[0]
+            for name, spec in workload(year, 4, state):
+                for backend_name, backend in backends.items():
+                    seconds = time_query(backend, spec, args.repeat)
+                    results.append({"scale": scale, "rows": rows, "query": name,
+                                    "backend": backend_name, "median_ms": round(seconds * 1000, 3)})
+                    print(f"x{scale:<6g} {name:40s} {backend_name:9s} {seconds * 1000:9.2f} ms")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
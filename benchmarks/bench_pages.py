@@ -0,0 +1,128 @@
+"""Cold page loads with each page's queries run one after another versus concurrently.
+
+    python -m benchmarks.bench_pages --output pages.json
+    python -m benchmarks.bench_pages --latency-ms 20 --trials 7
+    PHONEPE_BACKEND=postgres python -m benchmarks.bench_pages --live
+
+Each page's loads are its pagedata.PAGES entry for the period it opens on. The
+"sequential" figure runs them in order, as the pages did before; the
+"concurrent" one runs them through pagedata.fetch. Every run starts from
+empty query caches (a fresh data version is published first), so both
+measure a cold page. Boundary files are cached per process, not per
+version, so an untimed first pass loads them for both modes alike.
+
+By default a synthetic dataset is written to a temporary Parquet snapshot,
+as in bench_dashboard; --live reads the configured backend instead. Local
+Parquet reads take milliseconds, so --latency-ms adds a fixed wait to every
+backend call to model a database across the network.
+"""
+import argparse
+import json
+import logging
+import os
+import shutil
+import statistics
+import tempfile
+import time
+
+
+def _with_latency(method, seconds):
+    def call(*args, **kwargs):
+        time.sleep(seconds)
+        return method(*args, **kwargs)
+    return call
+
+
+def _timed(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def run(args):
+    # Imported here: the query layer reads the backend configuration on import
+    from backends import get_backend
+    from pagedata import PAGES, PERIOD_TABLES, fetch
+    from queries import publish_version
+    from warmup import latest_period
+
+    # Cached loads warn on every call from a thread outside a Streamlit session
+    logging.getLogger("streamlit.runtime.scriptrunner_utils.script_run_context").setLevel(logging.ERROR)
+    backend = get_backend()
+    if args.latency_ms:
+        for name in ("select", "periods"):
+            setattr(backend, name, _with_latency(getattr(backend, name), args.latency_ms / 1000))
+
+    cold = iter(range(1, 1_000_000))
+
+    def cold_run(page, concurrent):
+        """Seconds to load `page` from empty caches; per-job seconds when sequential."""
+        publish_version(f"bench-{next(cold)}")
+        year, quarter = latest_period(PERIOD_TABLES[page])
+        jobs = PAGES[page](year, quarter)
+        if concurrent:
+            return _timed(lambda: fetch(jobs)), []
+        timings = [_timed(job) for job in jobs]
+        return sum(timings), timings
+
+    results = []
+    for page in args.pages:
+        cold_run(page, True)
+        sequential, concurrent, slowest = [], [], []
+        for _ in range(args.trials):
+            total, timings = cold_run(page, False)
+            sequential.append(total)
+            slowest.append(max(timings))
+            concurrent.append(cold_run(page, True)[0])
+        row = {
+            "page": page, "jobs": len(timings), "trials": args.trials, "latency_ms": args.latency_ms,
+            "sequential_ms": round(statistics.median(sequential) * 1000, 3),
+            "concurrent_ms": round(statistics.median(concurrent) * 1000, 3),
+            "slowest_job_ms": round(statistics.median(slowest) * 1000, 3),
+        }
+        row["speedup"] = round(row["sequential_ms"] / row["concurrent_ms"], 2)
+        results.append(row)
+        print(f"{page:12s} {row['jobs']:3d} jobs  sequential {row['sequential_ms']:9.2f} ms  "
+              f"concurrent {row['concurrent_ms']:9.2f} ms  slowest job {row['slowest_job_ms']:9.2f} ms  "
+              f"x{row['speedup']:.2f}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", nargs="+", default=["transaction", "user", "geo", "pincode", "penetration"])
+    parser.add_argument("--trials", type=int, default=5, help="cold runs per page and mode")
+    parser.add_argument("--latency-ms", type=float, default=0, help="wait added to every backend call")
+    parser.add_argument("--live", action="store_true", help="read the configured backend, not synthetic data")
+    parser.add_argument("--scale", type=float, default=1, help="synthetic dataset scale")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    args = parser.parse_args()
+
+    workdir = None
+    if not args.live:
+        workdir = tempfile.mkdtemp(prefix="pulse-bench-pages-")
+        os.environ["PHONEPE_BACKEND"] = "parquet"
+        os.environ["PHONEPE_PARQUET_DIR"] = os.path.join(workdir, "snapshot")
+        os.environ["PHONEPE_GEO_DIR"] = workdir
+
+        from backends import write_snapshot
+        from benchmarks import synthetic
+
+        frames = synthetic.generate(args.scale)
+        frames.update(synthetic.rollup_frames(frames))
+        write_snapshot(os.environ["PHONEPE_PARQUET_DIR"], source=synthetic.FrameSource(frames))
+        with open(os.path.join(workdir, "india_states.coarse.geojson"), "w") as f:
+            json.dump(synthetic.states_geojson(synthetic.state_names(args.scale)), f)
+    try:
+        results = run(args)
+    finally:
+        if workdir is not None:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""Load-test the JSON API (api.py) and report requests per second.
+
+Start the API against the database or snapshot to test, then:
+
+    python api.py --port 8000
+    python -m benchmarks.load_api --url http://127.0.0.1:8000 --concurrency 32 --duration 20
+    python -m benchmarks.load_api --conditional --output api.json
+
+Each client cycles through a mix of page and Facts requests for the newest
+quarter and a handful of states. With --conditional, clients send back the
+ETag of their previous response to each URL, as a polling tool would, and
+mostly get 304s. The first pass over the mix is a warm-up and is not counted.
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from collections import Counter
+from urllib.parse import quote
+
+import httpx
+
+
+async def request_mix(client, states):
+    """URLs covering every endpoint, for the newest quarter."""
+    periods = (await client.get("/v1/periods/aggregated_transaction")).json()["rows"]
+    latest = max((row["years"], row["quarter"]) for row in periods)
+    year, quarter = latest
+    period = f"year={year}&quarter={quarter}"
+    state_names = [row["states"] for row in (await client.get(f"/v1/users/states?{period}")).json()["rows"]]
+    urls = [
+        f"/v1/transactions/states?{period}",
+        f"/v1/transactions/types?{period}",
+        f"/v1/transactions/districts?{period}",
+        f"/v1/users/brands?{period}",
+        f"/v1/users/states?{period}",
+        f"/v1/users/districts?{period}",
+        f"/v1/pincodes?{period}",
+        "/v1/trends/transaction_amount",
+        "/v1/trends/registereduser",
+        "/v1/facts/users_growth",
+        f"/v1/facts/top_brands?year={year}",
+        f"/v1/facts/districts_amount_highest?year={year}",
+        f"/v1/facts/states_usage_lowest?year={year}",
+    ]
+    for state in state_names[:states]:
+        name = quote(state)
+        urls += [
+            f"/v1/transactions/types?{period}&state={name}",
+            f"/v1/users/districts?{period}&state={name}",
+            f"/v1/trends/transaction_amount?state={name}",
+        ]
+    return urls
+
+
+async def client_loop(client, urls, offset, deadline, conditional, results):
+    etags = {}
+    i = offset
+    while time.perf_counter() < deadline:
+        url = urls[i % len(urls)]
+        i += 1
+        headers = {"If-None-Match": etags[url]} if conditional and url in etags else {}
+        start = time.perf_counter()
+        response = await client.get(url, headers=headers)
+        results.append((time.perf_counter() - start, response.status_code, len(response.content)))
+        if "etag" in response.headers:
+            etags[url] = response.headers["etag"]
+
+
+async def run(args):
+    headers = {} if args.gzip else {"Accept-Encoding": "identity"}
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.url, headers=headers, limits=limits, timeout=30) as client:
+        urls = await request_mix(client, args.states)
+        for url in urls:
+            (await client.get(url)).raise_for_status()
+
+        results = []
+        start = time.perf_counter()
+        deadline = start + args.duration
+        await asyncio.gather(*(client_loop(client, urls, n, deadline, args.conditional, results)
+                               for n in range(args.concurrency)))
+        elapsed = time.perf_counter() - start
+
+    latencies = sorted(latency for latency, _, _ in results)
+
+    def percentile(q):
+        return round(latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000, 3)
+
+    return {
+        "url": args.url, "concurrency": args.concurrency, "duration_s": round(elapsed, 3),
+        "conditional": args.conditional, "gzip": args.gzip, "urls": len(urls),
+        "requests": len(results),
+        "requests_per_s": round(len(results) / elapsed, 1),
+        "status": dict(Counter(status for _, status, _ in results)),
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 3),
+        "p50_ms": percentile(0.5), "p95_ms": percentile(0.95), "p99_ms": percentile(0.99),
+        "body_bytes_mean": round(statistics.fmean(size for _, _, size in results)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10, help="seconds of load after the warm-up")
+    parser.add_argument("--states", type=int, default=5, help="states with per-state requests in the mix")
+    parser.add_argument("--conditional", action="store_true", help="revalidate with If-None-Match")
+    parser.add_argument("--no-gzip", dest="gzip", action="store_false", help="ask for uncompressed bodies")
+    parser.add_argument("--output", help="write the summary as JSON to this file")
+    args = parser.parse_args()
+
+    summary = asyncio.run(run(args))
+    print(f"{summary['requests']} requests in {summary['duration_s']:.1f}s: "
+          f"{summary['requests_per_s']:.1f} req/s, p50 {summary['p50_ms']:.2f} ms, "
+          f"p95 {summary['p95_ms']:.2f} ms, p99 {summary['p99_ms']:.2f} ms, status {summary['status']}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(summary, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
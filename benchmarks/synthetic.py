@@ -0,0 +1,167 @@
+"""Synthetic PhonePe Pulse tables for benchmarks.
+
+At scale 1 the generator produces roughly the volume of the real Pulse
+data (36 states, ~21 districts per state, 2018-2024). Larger scales add
+synthetic states, so every table grows linearly; districts per state, years
+and quarters can be set independently.
+"""
+import numpy as np
+import pandas as pd
+
+from normalise import district_keys, state_ids
+
+TRANSACTION_TYPES = [
+    "Recharge & bill payments", "Peer-to-peer payments", "Merchant payments",
+    "Financial Services", "Others",
+]
+BRANDS = [
+    "Xiaomi", "Samsung", "Vivo", "Oppo", "Realme", "Apple", "Motorola",
+    "OnePlus", "Huawei", "Lenovo", "Others",
+]
+STATES_AT_SCALE_1 = 36
+DISTRICTS_PER_STATE = 21
+PINCODES_PER_STATE = 10
+
+
+def _grid(**dimensions):
+    index = pd.MultiIndex.from_product(list(dimensions.values()), names=list(dimensions))
+    return index.to_frame(index=False)
+
+
+def state_names(scale=1, states=None):
+    n_states = states or max(1, round(STATES_AT_SCALE_1 * scale))
+    return [f"State {i:04d}" for i in range(n_states)]
+
+
+def generate(scale=1, years=range(2018, 2025), seed=0, states=None,
+             districts=DISTRICTS_PER_STATE, quarters=(1, 2, 3, 4)):
+    """Return {table: DataFrame} for the six Pulse tables and the pincode centroids.
+
+    `states` overrides the number of states implied by `scale`.
+    """
+    rng = np.random.default_rng(seed)
+    states = state_names(scale, states)
+    n_states = len(states)
+    periods = dict(years=list(years), quarter=list(quarters))
+
+    frames = {}
+    df = _grid(states=states, **periods, transaction_type=TRANSACTION_TYPES)
+    df["transaction_count"] = rng.integers(1_000, 10_000_000, len(df))
+    df["transaction_amount"] = df["transaction_count"] * rng.uniform(100, 2_000, len(df))
+    frames["aggregated_transaction"] = df
+
+    df = _grid(states=states, **periods, brands=BRANDS)
+    df["transaction_count"] = rng.integers(1_000, 5_000_000, len(df))
+    df["percentage"] = rng.uniform(0, 0.3, len(df))
+    frames["aggregated_user"] = df
+
+    df = _grid(states=states, **periods, district=range(districts))
+    df["district"] = df["states"] + " district " + df["district"].astype(str)
+    df["transaction_count"] = rng.integers(100, 2_000_000, len(df))
+    df["transaction_amount"] = df["transaction_count"] * rng.uniform(100, 2_000, len(df))
+    frames["map_transaction"] = df
+
+    df = _grid(states=states, **periods, districts=range(districts))
+    df["districts"] = df["states"] + " district " + df["districts"].astype(str)
+    df["registereduser"] = rng.integers(1_000, 5_000_000, len(df))
+    df["appopens"] = df["registereduser"] * rng.integers(0, 40, len(df))
+    frames["map_user"] = df
+
+    df = _grid(states=range(n_states), **periods, pincodes=range(PINCODES_PER_STATE))
+    df["pincodes"] = 100_000 + df["states"] * PINCODES_PER_STATE + df["pincodes"]
+    df["states"] = np.asarray(states, dtype=object)[df["states"]]
+    top_user = df.copy()
+    df["transaction_count"] = rng.integers(100, 1_000_000, len(df))
+    df["transaction_amount"] = df["transaction_count"] * rng.uniform(100, 2_000, len(df))
+    frames["top_transaction"] = df
+    top_user["registereduser"] = rng.integers(100, 500_000, len(top_user))
+    frames["top_user"] = top_user
+
+    pincodes = np.unique(df["pincodes"])
+    frames["pincode_centroids"] = pd.DataFrame({
+        "pincodes": pincodes,
+        "latitude": rng.uniform(8, 34, len(pincodes)),
+        "longitude": rng.uniform(69, 96, len(pincodes)),
+    })
+    return frames
+
+
+def states_geojson(states, vertices=2_000, seed=0):
+    """A FeatureCollection with one ragged, roughly circular polygon per state.
+
+    Features carry the state name in ST_NM like the real boundary file;
+    `vertices` per outline sets how heavy the geometry is to simplify and draw.
+    """
+    rng = np.random.default_rng(seed)
+    columns = int(np.ceil(np.sqrt(len(states))))
+    angles = np.linspace(0, 2 * np.pi, vertices, endpoint=False)
+    features = []
+    for i, state in enumerate(states):
+        # Lay the states out on a grid over India's bounding box
+        lon = 69 + 27 * (i % columns + 0.5) / columns
+        lat = 8 + 26 * (i // columns + 0.5) / columns
+        radius = 0.45 * 26 / columns * rng.uniform(0.7, 1.0, vertices)
+        ring = np.column_stack([lon + radius * np.cos(angles), lat + radius * np.sin(angles)]).round(5)
+        features.append({
+            "type": "Feature",
+            "properties": {"ST_NM": state},
+            "geometry": {"type": "Polygon", "coordinates": [[*ring.tolist(), ring[0].tolist()]]},
+        })
+    return {"type": "FeatureCollection", "features": features}
+
+
+def district_quarter_fact(frames):
+    """district_quarter_fact (see rollups.py), computed in pandas."""
+    period = ["years", "quarter", "states", "district_key"]
+
+    def by_district(table, column, metrics):
+        df = frames[table]
+        df = df.assign(district_key=np.asarray(district_keys(df[column]), dtype=object))
+        return df.groupby(period, as_index=False, observed=True).agg(
+            district=(column, "first"), **{metric: (metric, "sum") for metric in metrics})
+
+    df = by_district("map_transaction", "district", ("transaction_count", "transaction_amount")).merge(
+        by_district("map_user", "districts", ("registereduser", "appopens")).drop(columns="district"),
+        on=period)
+    ids = state_ids(df["states"])
+    df["district_id"] = pd.factorize(df["states"].astype(str) + "/" + df["district_key"])[0] + 1
+    df["state_id"] = pd.arrays.IntegerArray(ids, ids == 0)
+    df["transactions_per_user"] = df["transaction_count"] / df["registereduser"].where(df["registereduser"] != 0)
+    df["amount_per_app_open"] = df["transaction_amount"] / df["appopens"].where(df["appopens"] != 0)
+    for column, groups in [("penetration_rank", ["years", "quarter"]),
+                           ("state_penetration_rank", ["years", "quarter", "states"])]:
+        df[column] = df.groupby(groups)["transactions_per_user"].rank(
+            method="min", ascending=False, na_option="bottom").astype(np.int64)
+    return df[["years", "quarter", "district_id", "state_id", "states", "district",
+               "transaction_count", "transaction_amount", "registereduser", "appopens",
+               "transactions_per_user", "amount_per_app_open", "penetration_rank", "state_penetration_rank"]]
+
+
+def rollup_frames(frames):
+    """The rollups.py summary tables, computed in pandas."""
+    def rollup(table, keys, metrics):
+        return frames[table].groupby(list(keys), as_index=False)[list(metrics)].sum()
+
+    return {
+        "rollup_district_transaction_year": rollup(
+            "map_transaction", ("years", "states", "district"), ("transaction_count", "transaction_amount")),
+        "rollup_district_user_year": rollup(
+            "map_user", ("years", "states", "districts"), ("registereduser",)),
+        "rollup_state_user_year": rollup("map_user", ("years", "states"), ("registereduser",)),
+        "rollup_brand_year": rollup("aggregated_user", ("years", "brands"), ("transaction_count",)),
+        "rollup_state_transaction_quarter": rollup(
+            "aggregated_transaction", ("years", "quarter", "states"), ("transaction_count", "transaction_amount")),
+        "rollup_state_user_quarter": rollup(
+            "map_user", ("years", "quarter", "states"), ("registereduser", "appopens")),
+        "district_quarter_fact": district_quarter_fact(frames),
+    }
+
+
+class FrameSource:
+    """Minimal backend over in-memory frames, used to write snapshots."""
+
+    def __init__(self, frames):
+        self.frames = frames
+
+    def select(self, table):
+        return self.frames[table]
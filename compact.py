@@ -0,0 +1,93 @@
+import logging
+import threading
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import CategoricalDtype, is_integer_dtype, is_object_dtype, is_string_dtype
+
+logger = logging.getLogger(__name__)
+
+# Low-cardinality string columns and the shared dictionary each one uses;
+# map_transaction's `district` and map_user's `districts` share one.
+CATEGORICAL_COLUMNS = {
+    "states": "states",
+    "district": "district",
+    "districts": "district",
+    "brands": "brands",
+    "transaction_type": "transaction_type",
+}
+
+_lock = threading.Lock()
+_dictionaries = {}
+_footprint = {}
+
+
+def shared_dtype(dictionary, values):
+    """Categorical dtype for `dictionary`, grown to cover `values`.
+
+    Every frame of a column shares the same categories, so codes mean the
+    same thing across tables and the strings are stored once per process.
+    """
+    with _lock:
+        dtype = _dictionaries.get(dictionary)
+        present = pd.Index(pd.unique(values.dropna()))
+        if dtype is None:
+            dtype = CategoricalDtype(present.sort_values())
+        else:
+            missing = present.difference(dtype.categories)
+            if len(missing):
+                dtype = CategoricalDtype(dtype.categories.append(missing))
+        _dictionaries[dictionary] = dtype
+        return dtype
+
+
+def _read_only(values):
+    """`values` on read-only buffers, so in-place writes through shallow copies raise."""
+    if isinstance(values, pd.Categorical):
+        # .codes is already a read-only view
+        return pd.Categorical.from_codes(values.codes, dtype=values.dtype)
+    if isinstance(values, (pd.arrays.IntegerArray, pd.arrays.FloatingArray, pd.arrays.BooleanArray)):
+        return type(values)(_read_only(values._data), _read_only(values._mask))
+    if isinstance(values, np.ndarray):
+        values = values.view()
+        values.flags.writeable = False
+    return values
+
+
+def compact_frame(df, key=None):
+    """Categorical strings and downcast integers; records the memory saved under `key`.
+
+    The result is cached and handed out as shallow copies, so its columns
+    are read-only: callers derive new frames rather than writing in place.
+    """
+    before = int(df.memory_usage(deep=True).sum())
+    columns = {}
+    for column in df.columns:
+        series = df[column]
+        if column in CATEGORICAL_COLUMNS and (is_object_dtype(series) or is_string_dtype(series)):
+            columns[column] = series.astype(shared_dtype(CATEGORICAL_COLUMNS[column], series))
+        elif is_integer_dtype(series) and not isinstance(series.dtype, CategoricalDtype):
+            columns[column] = pd.to_numeric(series, downcast="integer")
+        else:
+            columns[column] = series
+    # copy=False keeps one unconsolidated block per read-only column
+    columns = {column: _read_only(series.to_numpy() if isinstance(series.dtype, np.dtype) else series.array)
+               for column, series in columns.items()}
+    compacted = pd.DataFrame(columns, index=df.index, copy=False)
+    after = int(compacted.memory_usage(deep=True).sum())
+    if key is not None:
+        with _lock:
+            _footprint[key] = (len(df), before, after)
+        logger.debug("Cached %s: %d rows, %d -> %d bytes", key, len(df), before, after)
+    return compacted
+
+
+def footprint():
+    """Rows and bytes before/after compaction for every cached frame."""
+    with _lock:
+        rows = [
+            {"key": str(key), "rows": rows, "bytes_before": before, "bytes_after": after}
+            for key, (rows, before, after) in _footprint.items()
+        ]
+    return pd.DataFrame(rows, columns=["key", "rows", "bytes_before", "bytes_after"])
+
@@ -0,0 +1,69 @@
+import os
+
+# Database connection settings (override through the environment)
+DB_CONFIG = {
+    "host": os.environ.get("PHONEPE_DB_HOST", "localhost"),
+    "user": os.environ.get("PHONEPE_DB_USER", "postgres"),
+    "password": os.environ.get("PHONEPE_DB_PASSWORD", "AI@Guvi12345"),
+    "database": os.environ.get("PHONEPE_DB_NAME", "phone_pay"),
+    "port": os.environ.get("PHONEPE_DB_PORT", "5432"),
+}
+
+# Connection pool sizing
+DB_POOL_MIN = int(os.environ.get("PHONEPE_DB_POOL_MIN", "1"))
+DB_POOL_MAX = int(os.environ.get("PHONEPE_DB_POOL_MAX", "10"))
+
+# Idle connections older than this (seconds) are pinged before reuse
+DB_HEALTHCHECK_INTERVAL = float(os.environ.get("PHONEPE_DB_HEALTHCHECK_INTERVAL", "30"))
+
+# Where downloaded and pre-simplified map geometry is kept
+GEO_DIR = os.environ.get(
+    "PHONEPE_GEO_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets", "geo")
+)
+
+# Optional download location for district boundaries; without it, put
+# india_districts.geojson into GEO_DIR yourself
+DISTRICTS_GEOJSON_URL = os.environ.get("PHONEPE_DISTRICTS_GEOJSON_URL")
+
+# Where dashboard data is read from: "postgres" or "parquet"
+STORAGE_BACKEND = os.environ.get("PHONEPE_BACKEND", "postgres")
+
+# Root of the partitioned Parquet snapshot used by the parquet backend
+PARQUET_DIR = os.environ.get(
+    "PHONEPE_PARQUET_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "snapshot")
+)
+
+# What the duckdb backend reads: the Parquet snapshot ("parquet") or the live database ("postgres")
+DUCKDB_SOURCE = os.environ.get("PHONEPE_DUCKDB_SOURCE", "parquet")
+
+# Memory budget for pre-rendered chart JSON (see figcache.py)
+FIGURE_CACHE_MB = float(os.environ.get("PHONEPE_FIGURE_CACHE_MB", "64"))
+
+# Seconds between checks of the data version (see dataversion.py)
+VERSION_POLL_INTERVAL = float(os.environ.get("PHONEPE_VERSION_POLL_INTERVAL", "5"))
+
+# Threads used to warm the caches
+WARMUP_WORKERS = int(os.environ.get("PHONEPE_WARMUP_WORKERS", "4"))
+
+# Threads fetching a page's data concurrently (see pagedata.py); database
+# fetches beyond DB_POOL_MAX wait for a free connection
+PAGE_FETCH_WORKERS = int(os.environ.get("PHONEPE_PAGE_FETCH_WORKERS", "8"))
+
+# Performance panel in the sidebar (PHONEPE_ADMIN_PANEL=1)
+ADMIN_PANEL = os.environ.get("PHONEPE_ADMIN_PANEL", "0") == "1"
+
+# Local endpoint for Prometheus metrics (see metrics.py); disabled unless a port is set
+METRICS_PORT = int(os.environ["PHONEPE_METRICS_PORT"]) if os.environ.get("PHONEPE_METRICS_PORT") else None
+METRICS_HOST = os.environ.get("PHONEPE_METRICS_HOST", "127.0.0.1")
+
+# Seconds between JSON metric log lines; disabled unless set
+METRICS_LOG_INTERVAL = float(os.environ.get("PHONEPE_METRICS_LOG_INTERVAL", "0"))
+
+# Rows fetched and written per chunk by export.py
+EXPORT_CHUNK_ROWS = int(os.environ.get("PHONEPE_EXPORT_CHUNK_ROWS", "50000"))
+
+# Address of the JSON API (see api.py)
+API_HOST = os.environ.get("PHONEPE_API_HOST", "127.0.0.1")
+API_PORT = int(os.environ.get("PHONEPE_API_PORT", "8000"))
+# Where browsers reach the API; the dashboard's download links point at its /v1/export route
+API_URL = os.environ.get("PHONEPE_API_URL", f"http://{API_HOST}:{API_PORT}").rstrip("/")
@@ -0,0 +1,133 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from profiling import timed
+from queries import QueryError, call_versioned, load_slice, record_miss
+
+TIME = ("years", "quarter")
+
+
+class Cube:
+    """Dense measure arrays over (time, *dimensions) with prefix sums along time.
+
+    Built once per data load; afterwards any slice - one state's breakdown,
+    state totals, a multi-quarter range - is array indexing plus a
+    difference of two prefix sums, with no pandas groupby.
+    """
+
+    def __init__(self, df, dimensions, measures):
+        self.dimensions = tuple(dimensions)
+        self.measures = tuple(measures)
+        self.integer_measures = {m for m in self.measures if pd.api.types.is_integer_dtype(df[m])}
+
+        periods = df[list(TIME)].drop_duplicates().sort_values(list(TIME))
+        self.periods = [tuple(int(v) for v in row) for row in periods.itertuples(index=False)]
+        self._period_index = {period: i for i, period in enumerate(self.periods)}
+        self.categories = {dim: sorted(df[dim].dropna().astype(str).unique()) for dim in self.dimensions}
+        self._codes = {dim: {value: i for i, value in enumerate(values)}
+                       for dim, values in self.categories.items()}
+
+        time_codes = np.array([self._period_index[(int(y), int(q))]
+                               for y, q in zip(df["years"], df["quarter"])], dtype=np.intp)
+        dim_codes = [df[dim].astype(str).map(self._codes[dim]).to_numpy(dtype=np.intp)
+                     for dim in self.dimensions]
+        shape = (len(self.measures) + 1, len(self.periods), *(len(self.categories[d]) for d in self.dimensions))
+        values = np.zeros(shape)
+        for m, measure in enumerate(self.measures):
+            np.add.at(values[m], (time_codes, *dim_codes), df[measure].to_numpy(dtype=float))
+        # Last slot counts source rows, so empty cells can be told apart from zeros
+        np.add.at(values[-1], (time_codes, *dim_codes), 1)
+
+        # prefix[:, t] holds the sum of periods [0, t)
+        self._prefix = np.zeros((shape[0], shape[1] + 1, *shape[2:]))
+        np.cumsum(values, axis=1, out=self._prefix[:, 1:])
+
+    def period_index(self, period):
+        """Position of a (year, quarter) in `periods`, or None if the cube has no such period."""
+        return self._period_index.get((int(period[0]), int(period[1])))
+
+    def _range(self, start, end):
+        start = self.periods[0] if start is None else start
+        end = start if end is None else end
+        i, j = self.period_index(start), self.period_index(end)
+        if i is None or j is None or j < i:
+            return None
+        return self._prefix[:, j + 1] - self._prefix[:, i]
+
+    def aggregate(self, by=(), start=None, end=None, **where):
+        """Sum the measures over periods start..end (inclusive), grouped by `by`.
+
+        `start`/`end` are (year, quarter) tuples; `start=None` means the first
+        period and `end=None` a single period. Keyword arguments fix
+        dimensions to one value, e.g. ``states="Goa"``.
+        """
+        by = tuple(by)
+        empty = pd.DataFrame(columns=[*by, *self.measures])
+        block = self._range(start, end)
+        if block is None:
+            return empty
+        index = [slice(None)]
+        for dim in self.dimensions:
+            if dim in where:
+                code = self._codes[dim].get(str(where[dim]))
+                if code is None:
+                    return empty
+                index.append(code)
+            else:
+                index.append(slice(None))
+        block = block[tuple(index)]
+
+        free = [dim for dim in self.dimensions if dim not in where]
+        summed = tuple(1 + i for i, dim in enumerate(free) if dim not in by)
+        if summed:
+            block = block.sum(axis=summed)
+        kept = [dim for dim in free if dim in by]
+        # Reorder the remaining axes to follow `by`
+        block = np.moveaxis(block, [1 + kept.index(dim) for dim in by], range(1, len(by) + 1))
+
+        flat = block.reshape(block.shape[0], -1)
+        present = flat[-1] > 0
+        columns = {}
+        if by:
+            grid = np.meshgrid(*(np.array(self.categories[dim], dtype=object) for dim in by), indexing="ij")
+            for dim, values in zip(by, grid):
+                columns[dim] = values.reshape(-1)[present]
+        for m, measure in enumerate(self.measures):
+            values = flat[m][present]
+            columns[measure] = values.round().astype(np.int64) if measure in self.integer_measures else values
+        return pd.DataFrame(columns)
+
+
+@st.cache_resource
+def _build_cube(table, dimensions, measures, version):
+    record_miss("_build_cube")
+    df = load_slice(table, (*TIME, *dimensions), measures, raise_errors=True)
+    if df.empty:
+        # Raising keeps an empty or failed load out of the cache
+        raise LookupError(f"No {table} data")
+    with timed(f"pandas:cube:{table}"):
+        return Cube(df, dimensions, measures)
+
+
+def load_cube(table, dimensions, measures, raise_errors=False):
+    """Cube over the whole table, built from one server-side GROUP BY; None if there is no data.
+
+    A failed query is shown with st.error and returns None, or raises
+    QueryError with `raise_errors`.
+    """
+    try:
+        return call_versioned(_build_cube, table, tuple(dimensions), tuple(measures))
+    except LookupError:
+        return None
+    except QueryError as e:
+        if raise_errors:
+            raise
+        st.error(str(e))
+        return None
+
+
+def load_transaction_cube(raise_errors=False):
+    """Transaction counts and amounts by state and transaction type."""
+    return load_cube("aggregated_transaction", ("states", "transaction_type"),
+                     ("transaction_count", "transaction_amount"), raise_errors)
@@ -0,0 +1,67 @@
+"""Data version counter behind the dashboard's cache invalidation.
+
+loader.py, ingest.py, rollups.py and pincodes.py bump a one-row
+`data_version` table in the same run that changes the data, and every
+Parquet snapshot carries its own counter in a `_version` file. The dashboard
+probes the counter (see queries.data_version) and keys its caches on it, so
+cached results live until the data actually changes.
+"""
+import os
+
+import psycopg2.errors
+
+CREATE_DATA_VERSION = """
+    CREATE TABLE IF NOT EXISTS data_version (
+        id boolean PRIMARY KEY DEFAULT true CHECK (id),
+        version bigint NOT NULL,
+        updated_at timestamptz NOT NULL DEFAULT now()
+    )"""
+
+BUMP_DATA_VERSION = """
+    INSERT INTO data_version (version) VALUES (1)
+    ON CONFLICT (id) DO UPDATE SET version = data_version.version + 1, updated_at = now()
+    RETURNING version"""
+
+SELECT_DATA_VERSION = "SELECT version FROM data_version"
+
+# Version file at the root of a Parquet snapshot
+VERSION_FILE = "_version"
+
+
+def bump(conn):
+    """Advance the database's data version; returns the new version."""
+    with conn.cursor() as cursor:
+        cursor.execute(CREATE_DATA_VERSION)
+        cursor.execute(BUMP_DATA_VERSION)
+        version = cursor.fetchone()[0]
+    conn.commit()
+    return version
+
+
+def read(conn):
+    """The database's data version; 0 if nothing has bumped it yet."""
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(SELECT_DATA_VERSION)
+            row = cursor.fetchone()
+    except psycopg2.errors.UndefinedTable:
+        conn.rollback()
+        return 0
+    return row[0] if row else 0
+
+
+def read_file(root):
+    """The version recorded in a Parquet snapshot; 0 for snapshots without one."""
+    try:
+        with open(os.path.join(root, VERSION_FILE)) as f:
+            return int(f.read().strip() or 0)
+    except FileNotFoundError:
+        return 0
+
+
+def write_file(root, version):
+    # Written last and swapped in, so a version never points at a half-written snapshot
+    path = os.path.join(root, VERSION_FILE)
+    with open(path + ".tmp", "w") as f:
+        f.write(f"{version}\n")
+    os.replace(path + ".tmp", path)
@@ -0,0 +1,132 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+import pandas as pd
+import psycopg2
+import streamlit as st
+from psycopg2 import pool as pg_pool
+
+from config import DB_CONFIG, DB_POOL_MIN, DB_POOL_MAX, DB_HEALTHCHECK_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+# Errors that mean the connection itself is unusable
+CONNECTION_ERRORS = (psycopg2.OperationalError, psycopg2.InterfaceError)
+
+# getconn() fails instead of waiting once DB_POOL_MAX connections are out;
+# concurrent page fetches, the warm-up and sessions queue here instead
+_checkouts = threading.BoundedSemaphore(DB_POOL_MAX)
+_stats_lock = threading.Lock()
+_query_stats = {}
+
+
+class PooledConnection(psycopg2.extensions.connection):
+    """A connection that remembers when it was last returned to the pool."""
+    last_used = 0.0
+
+
+# One pool per process, shared by every session and rerun
+@st.cache_resource
+def get_pool():
+    return pg_pool.ThreadedConnectionPool(DB_POOL_MIN, DB_POOL_MAX, connection_factory=PooledConnection,
+                                          **DB_CONFIG)
+
+
+def _is_healthy(conn):
+    if conn.closed:
+        return False
+    # Only ping connections that have been idle for a while
+    if time.monotonic() - conn.last_used < DB_HEALTHCHECK_INTERVAL:
+        return True
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT 1")
+        conn.rollback()
+        return True
+    except CONNECTION_ERRORS:
+        return False
+
+
+def _checkout(pool):
+    # After a server restart every idle connection can be stale; replacements are checked too
+    for _ in range(DB_POOL_MAX + 1):
+        conn = pool.getconn()
+        if _is_healthy(conn):
+            return conn
+        logger.warning("Discarding stale database connection")
+        pool.putconn(conn, close=True)
+    raise psycopg2.OperationalError("No healthy database connection available")
+
+
+@contextmanager
+def get_connection():
+    """Borrow a pooled connection; commits on success, rolls back on error."""
+    pool = get_pool()
+    with _checkouts:
+        conn = _checkout(pool)
+        broken = False
+        try:
+            yield conn
+            conn.commit()
+        except CONNECTION_ERRORS:
+            broken = True
+            raise
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.last_used = time.monotonic()
+            pool.putconn(conn, close=broken or bool(conn.closed))
+
+
+def _label(query):
+    if isinstance(query, str):
+        return " ".join(query.split())[:80]
+    return type(query).__name__
+
+
+def record_latency(name, elapsed, rows=0, nbytes=0):
+    with _stats_lock:
+        stats = _query_stats.setdefault(name, {"calls": 0, "total_s": 0.0, "max_s": 0.0, "rows": 0, "bytes": 0})
+        stats["calls"] += 1
+        stats["total_s"] += elapsed
+        stats["max_s"] = max(stats["max_s"], elapsed)
+        stats["rows"] += int(rows)
+        stats["bytes"] += int(nbytes)
+
+
+def run_query(query, params=None, name=None):
+    """Execute a query with bind parameters and return the rows as a DataFrame.
+
+    A query that fails because its connection dropped is retried once on a
+    fresh connection.
+    """
+    name = name or _label(query)
+    for attempt in (1, 2):
+        try:
+            with get_connection() as conn:
+                start = time.perf_counter()
+                with conn.cursor() as cursor:
+                    cursor.execute(query, params)
+                    rows = cursor.fetchall()
+                    columns = [col[0] for col in cursor.description]
+                elapsed = time.perf_counter() - start
+                df = pd.DataFrame(rows, columns=columns)
+                record_latency(name, elapsed, len(df), df.memory_usage(deep=True).sum())
+                return df
+        except CONNECTION_ERRORS:
+            if attempt == 2:
+                raise
+            logger.warning("Query %r lost its connection, retrying", name)
+
+
+def query_stats():
+    """Per-query call count, latency, rows and result bytes recorded by run_query and the backends."""
+    with _stats_lock:
+        rows = [
+            {"query": name, **stats, "avg_s": stats["total_s"] / stats["calls"]}
+            for name, stats in _query_stats.items()
+        ]
+    return pd.DataFrame(rows, columns=["query", "calls", "total_s", "max_s", "avg_s", "rows", "bytes"])
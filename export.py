@@ -0,0 +1,186 @@
+"""CSV, Parquet and Excel exports of the dashboard's views, streamed in chunks.
+
+Exports read from the storage backend with `select_chunks`: a server-side
+(named) cursor on PostgreSQL, record batches on Parquet and DuckDB. Each
+chunk is written out before the next one is fetched, so exporting the full
+district x quarter history never holds the whole result in memory:
+
+    python export.py --list
+    python export.py district_transaction_history -o history.parquet
+    python export.py user_districts --year 2024 --quarter 1 --state Karnataka -o districts.xlsx
+
+The dashboard's download buttons link to the API's /v1/export route
+(api.py), which streams the same files.
+"""
+import argparse
+import os
+import sys
+from urllib.parse import quote, urlencode
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+try:
+    import openpyxl
+except ImportError:  # optional, only needed for Excel exports
+    openpyxl = None
+
+from backends import get_backend
+from config import API_URL, EXPORT_CHUNK_ROWS
+from queries import FACTS
+
+TRANSACTION_METRICS = ("transaction_count", "transaction_amount")
+USER_METRICS = ("registereduser", "appopens")
+
+# Exportable views: backend select arguments behind each page's tables
+VIEWS = {
+    "transaction_states": dict(
+        table="aggregated_transaction", group_by=("states",), metrics=TRANSACTION_METRICS),
+    "transaction_types": dict(
+        table="aggregated_transaction", group_by=("states", "transaction_type"), metrics=TRANSACTION_METRICS),
+    "user_brands": dict(
+        table="aggregated_user", group_by=("brands",), metrics=("transaction_count",)),
+    "user_states": dict(
+        table="map_user", group_by=("states",), metrics=USER_METRICS),
+    "user_districts": dict(
+        table="map_user", group_by=("states", "districts"), metrics=USER_METRICS),
+    "district_transaction_history": dict(
+        table="map_transaction",
+        columns=("states", "district", "years", "quarter", *TRANSACTION_METRICS)),
+    "district_user_history": dict(
+        table="map_user", columns=("states", "districts", "years", "quarter", *USER_METRICS)),
+    "district_penetration": dict(
+        table="district_quarter_fact", order_by="penetration_rank",
+        columns=("years", "quarter", "states", "district", "penetration_rank", "state_penetration_rank",
+                 "transactions_per_user", "amount_per_app_open", *TRANSACTION_METRICS, *USER_METRICS)),
+    **{f"fact:{fact}": spec for fact, spec in FACTS.items()},
+}
+
+FORMATS = {
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+# Worksheet limit, including the header row
+EXCEL_MAX_ROWS = 1_048_576
+
+
+def view_chunks(view, year=None, quarter=None, state=None, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Frames of a view for one year/quarter/state (None means all), in order."""
+    spec = dict(VIEWS[view])
+    # Plain ints: the database drivers cannot bind numpy scalars
+    year = None if year is None else int(year)
+    quarter = None if quarter is None else int(quarter)
+    if view.startswith("fact:"):
+        # Facts come from the yearly rollups, and users_growth spans every year
+        filters = {} if spec.get("group_by") == ("years",) else {"years": year}
+    else:
+        filters = {"years": year, "quarter": quarter, "states": state}
+    return get_backend().select_chunks(**spec, filters=filters, chunk_rows=chunk_rows)
+
+
+def write_csv(chunks, out):
+    header = True
+    for chunk in chunks:
+        out.write(chunk.to_csv(index=False, header=header).encode())
+        header = False
+
+
+def write_parquet(chunks, out):
+    writer = None
+    try:
+        for chunk in chunks:
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(out, table.schema)
+            else:
+                # Later chunks can infer narrower types (e.g. an all-null column)
+                table = table.cast(writer.schema)
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def write_xlsx(chunks, out):
+    if openpyxl is None:
+        raise RuntimeError("Excel exports need the openpyxl package (pip install openpyxl)")
+    # Write-only workbooks stream rows to disk instead of keeping cell objects
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet("data")
+    rows = 0
+    for i, chunk in enumerate(chunks):
+        if i == 0:
+            sheet.append([str(column) for column in chunk.columns])
+        rows += len(chunk)
+        if rows >= EXCEL_MAX_ROWS:
+            raise ValueError(f"More than {EXCEL_MAX_ROWS - 1:,} rows; export as csv or parquet instead")
+        values = chunk.astype(object).where(chunk.notna(), None)
+        for row in values.itertuples(index=False):
+            sheet.append(list(row))
+    workbook.save(out)
+
+
+WRITERS = {"csv": write_csv, "parquet": write_parquet, "xlsx": write_xlsx}
+
+
+def export(view, fmt, out, year=None, quarter=None, state=None, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Write a view to the binary file object `out` in format `fmt`."""
+    WRITERS[fmt](view_chunks(view, year, quarter, state, chunk_rows), out)
+
+
+def export_url(view, fmt, year=None, quarter=None, state=None):
+    """The API URL that streams this export, for download links."""
+    params = {"format": fmt, "year": year, "quarter": quarter, "state": state}
+    query = urlencode({name: value for name, value in params.items() if value is not None})
+    return f"{API_URL}/v1/export/{quote(view)}?{query}"
+
+
+def file_name(view, fmt, year=None, quarter=None, state=None):
+    parts = [view.replace(":", "_")]
+    if year is not None:
+        parts.append(str(year))
+    if quarter is not None:
+        parts.append(f"q{quarter}")
+    if state is not None:
+        parts.append(str(state).replace(" ", "_"))
+    return f"{'_'.join(parts)}.{fmt}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export a dashboard view as CSV, Parquet or Excel")
+    parser.add_argument("view", nargs="?", choices=list(VIEWS), metavar="VIEW")
+    parser.add_argument("--list", action="store_true", help="list the exportable views")
+    parser.add_argument("--year", type=int)
+    parser.add_argument("--quarter", type=int, choices=[1, 2, 3, 4])
+    parser.add_argument("--state")
+    parser.add_argument("--format", choices=list(FORMATS),
+                        help="output format (default: from the output file's extension, else csv)")
+    parser.add_argument("--chunk-rows", type=int, default=EXPORT_CHUNK_ROWS)
+    parser.add_argument("-o", "--output", help="output file (default: CSV on stdout)")
+    args = parser.parse_args()
+
+    if args.list:
+        for view, spec in VIEWS.items():
+            print(f"{view:32s} {spec['table']}")
+        return
+    if args.view is None:
+        parser.error("a VIEW is required (see --list)")
+
+    fmt = args.format
+    if fmt is None and args.output:
+        fmt = os.path.splitext(args.output)[1].lstrip(".").lower()
+    fmt = fmt if fmt in FORMATS else "csv"
+    if args.output is None:
+        if fmt != "csv":
+            parser.error(f"{fmt} exports need --output")
+        export(args.view, fmt, sys.stdout.buffer, args.year, args.quarter, args.state, args.chunk_rows)
+        return
+    with open(args.output, "wb") as out:
+        export(args.view, fmt, out, args.year, args.quarter, args.state, args.chunk_rows)
+    print(f"{args.view}: written to {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
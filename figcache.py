@@ -0,0 +1,149 @@
+"""Pre-rendered Plotly figures, cached as JSON.
+
+Building a chart (plotly.express data wrangling, the choropleth's GeoJSON)
+costs tens of milliseconds; rebuilding a figure from its JSON without
+validation takes about one. Figures are cached per view and parameters
+under a byte budget with LRU eviction. Keys carry queries.data_version(),
+so charts are rebuilt as soon as the data behind them can have changed.
+"""
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+import pandas as pd
+import plotly.graph_objects as go
+import plotly.io as pio
+import streamlit as st
+
+from config import FIGURE_CACHE_MB
+from queries import data_version
+
+logger = logging.getLogger(__name__)
+
+_stats_lock = threading.Lock()
+_view_stats = {}
+
+
+class FigureCache:
+    """Thread-safe LRU of figure JSON, bounded by the total size of the stored strings."""
+
+    def __init__(self, budget_bytes):
+        self.budget_bytes = int(budget_bytes)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.size_bytes = 0
+        self.hits = self.misses = self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            spec = self._entries.get(key)
+            if spec is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return spec
+
+    def put(self, key, spec):
+        size = len(spec)
+        if size > self.budget_bytes:
+            logger.debug("Figure %s (%d bytes) exceeds the cache budget", key, size)
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.size_bytes -= len(previous)
+            self._entries[key] = spec
+            self.size_bytes += size
+            while self.size_bytes > self.budget_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.size_bytes -= len(evicted)
+                self.evictions += 1
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size_bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {"figures": len(self._entries), "bytes": self.size_bytes,
+                    "budget_bytes": self.budget_bytes, "hits": self.hits,
+                    "misses": self.misses, "evictions": self.evictions}
+
+
+# One cache per process, shared by every session
+@st.cache_resource
+def get_figure_cache():
+    return FigureCache(FIGURE_CACHE_MB * 1024 * 1024)
+
+
+def render(view, build):
+    """Build a figure and serialise it to JSON, recording the time and payload size per view."""
+    start = time.perf_counter()
+    fig = build()
+    built = time.perf_counter()
+    spec = pio.to_json(fig, validate=False)
+    serialised = time.perf_counter()
+    with _stats_lock:
+        stats = _view_stats.setdefault(view, {"renders": 0, "build_s": 0.0, "to_json_s": 0.0,
+                                              "last_bytes": 0, "max_bytes": 0})
+        stats["renders"] += 1
+        stats["build_s"] += built - start
+        stats["to_json_s"] += serialised - built
+        stats["last_bytes"] = len(spec)
+        stats["max_bytes"] = max(stats["max_bytes"], len(spec))
+    return spec
+
+
+def view_stats():
+    """Per-view render count, build and serialisation time, and figure payload size."""
+    with _stats_lock:
+        rows = [{"view": view, **stats} for view, stats in _view_stats.items()]
+    return pd.DataFrame(rows, columns=["view", "renders", "build_s", "to_json_s", "last_bytes", "max_bytes"])
+
+
+def figure_key(view, metric=None, year=None, quarter=None, state=None, **params):
+    return (view, metric, year, quarter, state, data_version(), tuple(sorted(params.items())))
+
+
+def cached_figure(build, view, metric=None, year=None, quarter=None, state=None, **params):
+    """The figure for a view, calling `build()` only when it is not cached.
+
+    Extra keyword arguments (map detail, a quarter range, ...) become part
+    of the key; they must be hashable.
+    """
+    cache = get_figure_cache()
+    key = figure_key(view, metric, year, quarter, state, **params)
+    spec = cache.get(key)
+    if spec is None:
+        spec = render(view, build)
+        cache.put(key, spec)
+    # The spec was produced by plotly itself, so skip re-validating it
+    return go.Figure(json.loads(spec), _validate=False)
+
+
+def warm(jobs):
+    """Render figures ahead of time; `jobs` yields (build, view, key kwargs) tuples.
+
+    Figures already cached for the current data version are skipped.
+    Returns the number of figures rendered.
+    """
+    cache = get_figure_cache()
+    rendered = 0
+    for build, view, params in jobs:
+        key = figure_key(view, **params)
+        if key in cache:
+            continue
+        try:
+            cache.put(key, render(view, build))
+            rendered += 1
+        except Exception:
+            logger.exception("Could not pre-render %s", key)
+    return rendered
@@ -0,0 +1,275 @@
+"""State and district boundaries for the choropleths.
+
+State boundaries are downloaded once and simplified per level of detail.
+District boundaries are split into one file per state and level, so a
+district map only ever loads (and sends to the browser) a single state:
+
+    python geo.py split-districts [india_districts.geojson]
+"""
+import argparse
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import requests
+import streamlit as st
+
+from config import DISTRICTS_GEOJSON_URL, GEO_DIR
+from normalise import STATES, district_key, name_key, state_ids
+from profiling import timed
+
+STATES_GEOJSON_URL = "https://gist.githubusercontent.com/jbrobst/56c13bbbf9d97d187fea01ca62ea5112/raw/e388c4cae20aa53cb5090210a42ebb9b765c0a36/india_states.geojson"
+STATES_GEOJSON = "india_states.geojson"
+FEATURE_ID_KEY = "properties.ST_NM"
+
+# Douglas-Peucker tolerance (degrees) and coordinate precision per level of detail
+DETAIL_LEVELS = {
+    "coarse": (0.05, 2),
+    "medium": (0.01, 3),
+    "fine": (0.002, 4),
+}
+
+DISTRICTS_GEOJSON = "india_districts.geojson"
+DISTRICTS_DIR = os.path.join(GEO_DIR, "districts")
+DISTRICT_FEATURE_ID_KEY = "properties.DISTRICT"
+# States written by split_districts; split files are keyed by state id
+DISTRICTS_INDEX = "states.json"
+
+# Districts are drawn one state at a time, so each level keeps more detail
+DISTRICT_DETAIL_LEVELS = {
+    "coarse": (0.01, 3),
+    "medium": (0.003, 4),
+    "fine": (0.001, 4),
+}
+
+# Property names used for the state and district by common district GeoJSON
+# sources (datameet/Census 2011, GADM, ...); the first one present wins
+STATE_PROPERTIES = ("ST_NM", "st_nm", "STATE", "state", "NAME_1", "stname")
+DISTRICT_PROPERTIES = ("DISTRICT", "district", "NAME_2", "dtname", "DIST_NAME")
+
+
+def _write_atomic(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def ensure_states_geojson():
+    """Path to the full-resolution state boundaries, downloading them once if missing."""
+    path = os.path.join(GEO_DIR, STATES_GEOJSON)
+    if not os.path.exists(path):
+        with timed("geo:download:states"):
+            response = requests.get(STATES_GEOJSON_URL, timeout=30)
+            response.raise_for_status()
+        _write_atomic(path, response.content)
+    return path
+
+
+def _simplify_ring(points, tolerance):
+    # Iterative Douglas-Peucker; first and last points are always kept
+    if len(points) < 5:
+        return points
+    keep = np.zeros(len(points), dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+        a, b = points[start], points[end]
+        inner = points[start + 1:end]
+        dx, dy = b - a
+        norm = np.hypot(dx, dy)
+        if norm == 0:
+            dist = np.hypot(inner[:, 0] - a[0], inner[:, 1] - a[1])
+        else:
+            dist = np.abs(dx * (inner[:, 1] - a[1]) - dy * (inner[:, 0] - a[0])) / norm
+        i = int(np.argmax(dist))
+        if dist[i] > tolerance:
+            split = start + 1 + i
+            keep[split] = True
+            stack.append((start, split))
+            stack.append((split, end))
+    simplified = points[keep]
+    # A ring needs at least four points (three distinct plus closure)
+    return simplified if len(simplified) >= 4 else points
+
+
+def _simplify_polygon(rings, tolerance, precision):
+    return [
+        np.round(_simplify_ring(np.asarray(ring, dtype=float), tolerance), precision).tolist()
+        for ring in rings
+    ]
+
+
+def simplify_geojson(geojson, tolerance, precision):
+    """Copy of a FeatureCollection with simplified, rounded polygon coordinates."""
+    features = []
+    for feature in geojson["features"]:
+        geometry = feature["geometry"]
+        if geometry["type"] == "Polygon":
+            coordinates = _simplify_polygon(geometry["coordinates"], tolerance, precision)
+        elif geometry["type"] == "MultiPolygon":
+            coordinates = [
+                _simplify_polygon(polygon, tolerance, precision)
+                for polygon in geometry["coordinates"]
+            ]
+        else:
+            coordinates = geometry["coordinates"]
+        features.append({
+            "type": "Feature",
+            "properties": feature["properties"],
+            "geometry": {"type": geometry["type"], "coordinates": coordinates},
+        })
+    return {"type": "FeatureCollection", "features": features}
+
+
+def _read_json(path):
+    with open(path, "rb") as f:
+        return json.loads(f.read())
+
+
+# Parsed once per process and shared by every session
+@st.cache_resource
+def load_states_geojson(detail="coarse"):
+    """State boundaries at the requested level of detail (see DETAIL_LEVELS).
+
+    Simplified copies are written next to the source file so later
+    processes skip both the download and the simplification.
+    """
+    tolerance, precision = DETAIL_LEVELS[detail]
+    path = os.path.join(GEO_DIR, f"india_states.{detail}.geojson")
+    if os.path.exists(path):
+        with timed(f"geo:parse:{detail}"):
+            return _read_json(path)
+    source = _read_json(ensure_states_geojson())
+    with timed(f"geo:simplify:{detail}"):
+        geojson = simplify_geojson(source, tolerance, precision)
+    _write_atomic(path, json.dumps(geojson, separators=(",", ":")).encode())
+    return geojson
+
+
+@st.cache_resource
+def _feature_names():
+    """ST_NM spelling of each state id in the boundary file; None where it has no feature."""
+    names = [f["properties"]["ST_NM"] for f in load_states_geojson("coarse")["features"]]
+    by_id = np.full(len(STATES) + 1, None, dtype=object)
+    by_id[state_ids(names)] = names
+    by_id[0] = None
+    return by_id
+
+
+def match_states(states):
+    """Map a Series of state names from the database to their GeoJSON ST_NM spelling.
+
+    Names are matched on their state id (see normalise.py); states without a
+    boundary feature keep their name.
+    """
+    names = _feature_names()[state_ids(states)]
+    return pd.Series(np.where(pd.isna(names), states.to_numpy(dtype=object), names), index=states.index)
+
+
+def ensure_districts_geojson():
+    """Path to the full-resolution district boundaries, downloading them once if configured."""
+    path = os.path.join(GEO_DIR, DISTRICTS_GEOJSON)
+    if not os.path.exists(path):
+        if not DISTRICTS_GEOJSON_URL:
+            raise FileNotFoundError(
+                f"{path} not found; copy a district GeoJSON there or set PHONEPE_DISTRICTS_GEOJSON_URL")
+        with timed("geo:download:districts"):
+            response = requests.get(DISTRICTS_GEOJSON_URL, timeout=60)
+            response.raise_for_status()
+        _write_atomic(path, response.content)
+    return path
+
+
+def _first_property(properties, names):
+    for name in names:
+        if properties.get(name):
+            return str(properties[name])
+    return None
+
+
+def _state_file_key(state):
+    # Split files are named after the state id, or the name key for unknown states
+    state_id = int(state_ids([state])[0])
+    return str(state_id) if state_id else name_key(state)
+
+
+def _district_path(state_key, detail):
+    return os.path.join(DISTRICTS_DIR, f"{state_key}.{detail}.geojson")
+
+
+def split_districts(source=None):
+    """Write each state's districts at every DISTRICT_DETAIL_LEVELS level; returns the state keys.
+
+    Features are reduced to ST_NM and DISTRICT properties, whatever the
+    source called them. An index of the states written marks the split
+    as done.
+    """
+    geojson = _read_json(source or ensure_districts_geojson())
+    by_state = {}
+    for feature in geojson["features"]:
+        state = _first_property(feature["properties"], STATE_PROPERTIES)
+        district = _first_property(feature["properties"], DISTRICT_PROPERTIES)
+        if state is None or district is None or feature.get("geometry") is None:
+            continue
+        by_state.setdefault(_state_file_key(state), []).append({
+            "type": "Feature",
+            "properties": {"ST_NM": state, "DISTRICT": district},
+            "geometry": feature["geometry"],
+        })
+    for state_key, features in by_state.items():
+        collection = {"type": "FeatureCollection", "features": features}
+        for detail, (tolerance, precision) in DISTRICT_DETAIL_LEVELS.items():
+            simplified = simplify_geojson(collection, tolerance, precision)
+            _write_atomic(_district_path(state_key, detail), json.dumps(simplified, separators=(",", ":")).encode())
+    _write_atomic(os.path.join(DISTRICTS_DIR, DISTRICTS_INDEX), json.dumps(sorted(by_state)).encode())
+    return sorted(by_state)
+
+
+# Only the states actually viewed are held in memory
+@st.cache_resource(max_entries=64)
+def _load_district_geojson(state_key, detail):
+    index_path = os.path.join(DISTRICTS_DIR, DISTRICTS_INDEX)
+    if not os.path.exists(index_path):
+        split_districts()
+    if state_key not in _read_json(index_path):
+        # Raising keeps the miss out of the cache
+        raise LookupError(f"No district boundaries for {state_key}")
+    return _read_json(_district_path(state_key, detail))
+
+
+def load_district_geojson(state, detail="coarse"):
+    """One state's district boundaries at a DISTRICT_DETAIL_LEVELS level, or None if unavailable."""
+    try:
+        return _load_district_geojson(_state_file_key(state), detail)
+    except (LookupError, FileNotFoundError):
+        return None
+
+
+def match_districts(districts, geojson):
+    """Map district names from the database to the DISTRICT spelling used in `geojson`."""
+    names = {district_key(f["properties"]["DISTRICT"]): f["properties"]["DISTRICT"] for f in geojson["features"]}
+    return districts.map({
+        district: names.get(district_key(district), district) for district in districts.unique()
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Map geometry utilities")
+    commands = parser.add_subparsers(dest="command", required=True)
+    split = commands.add_parser("split-districts", help="precompute per-state district boundaries")
+    split.add_argument("source", nargs="?", help=f"district GeoJSON (default: {DISTRICTS_GEOJSON} in GEO_DIR)")
+    args = parser.parse_args()
+
+    if args.command == "split-districts":
+        states = split_districts(args.source)
+        print(f"District boundaries written for {len(states)} states to {DISTRICTS_DIR}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+"""Parallel ingestion of a PhonePe Pulse checkout.
+
+Every dataset is described by a DATASETS entry: where its quarter files
+live and how to pull rows out of one file. Files are parsed across a
+process pool in chunks and come back as columnar batches (typed NumPy
+columns, categorical strings) ready for the bulk loader:
+
+    python ingest.py /path/to/pulse --upsert
+    python ingest.py /path/to/pulse --incremental   # only new/changed quarters
+"""
+import argparse
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import groupby
+from operator import itemgetter
+
+import numpy as np
+import pandas as pd
+import psycopg2
+
+import dataversion
+import loader
+import manifest
+import normalise
+import rollups
+from config import DB_CONFIG
+
+# Quarter files handed to a worker per task
+FILES_PER_TASK = 64
+
+
+def _aggregated_transaction(data):
+    for item in data["transactionData"] or []:
+        instrument = item["paymentInstruments"][0]
+        yield item["name"], instrument["count"], instrument["amount"]
+
+
+def _aggregated_user(data):
+    # usersByDevice is null for quarters without device data
+    for item in data["usersByDevice"] or []:
+        yield item["brand"], item["count"], item["percentage"]
+
+
+def _map_transaction(data):
+    for item in data["hoverDataList"] or []:
+        metric = item["metric"][0]
+        yield item["name"], metric["count"], metric["amount"]
+
+
+def _map_user(data):
+    for district, item in (data["hoverData"] or {}).items():
+        yield district, item["registeredUsers"], item["appOpens"]
+
+
+def _top_transaction(data):
+    for item in data["pincodes"] or []:
+        yield item["entityName"], item["metric"]["count"], item["metric"]["amount"]
+
+
+def _top_user(data):
+    for item in data["pincodes"] or []:
+        yield item["name"], item["registeredUsers"]
+
+
+# Source directory, row extractor and the (name, dtype) of each extracted field
+DATASETS = {
+    "aggregated_transaction": {
+        "path": "data/aggregated/transaction/country/india/state",
+        "extract": _aggregated_transaction,
+        "fields": (("transaction_type", "category"), ("transaction_count", np.int64),
+                   ("transaction_amount", np.float64)),
+    },
+    "aggregated_user": {
+        "path": "data/aggregated/user/country/india/state",
+        "extract": _aggregated_user,
+        "fields": (("brands", "category"), ("transaction_count", np.int64),
+                   ("percentage", np.float64)),
+    },
+    "map_transaction": {
+        "path": "data/map/transaction/hover/country/india/state",
+        "extract": _map_transaction,
+        "fields": (("district", "category"), ("transaction_count", np.int64),
+                   ("transaction_amount", np.float64)),
+    },
+    "map_user": {
+        "path": "data/map/user/hover/country/india/state",
+        "extract": _map_user,
+        "fields": (("districts", "category"), ("registereduser", np.int64),
+                   ("appopens", np.int64)),
+    },
+    "top_transaction": {
+        "path": "data/top/transaction/country/india/state",
+        "extract": _top_transaction,
+        "fields": (("pincodes", "category"), ("transaction_count", np.int64),
+                   ("transaction_amount", np.float64)),
+    },
+    "top_user": {
+        "path": "data/top/user/country/india/state",
+        "extract": _top_user,
+        "fields": (("pincodes", "category"), ("registereduser", np.int64)),
+    },
+}
+
+
+def discover_files(root, dataset):
+    """Yield (path, state, year, quarter) for every quarter file of a dataset."""
+    base = os.path.join(root, DATASETS[dataset]["path"])
+    for state in sorted(os.listdir(base)):
+        state_dir = os.path.join(base, state)
+        for year in sorted(os.listdir(state_dir)):
+            year_dir = os.path.join(state_dir, year)
+            for file in sorted(os.listdir(year_dir)):
+                if file.endswith(".json"):
+                    yield os.path.join(year_dir, file), state, int(year), int(file[:-len(".json")])
+
+
+def extract_batch(dataset, files):
+    """Parse a list of quarter files into one columnar DataFrame batch."""
+    spec = DATASETS[dataset]
+    fields = spec["fields"]
+    columns = [[] for _ in fields]
+    states, years, quarters = [], [], []
+    for path, state, year, quarter in files:
+        with open(path, "rb") as f:
+            data = json.load(f)["data"]
+        rows = 0
+        for record in spec["extract"](data):
+            for column, value in zip(columns, record):
+                column.append(value)
+            rows += 1
+        states.extend([state] * rows)
+        years.extend([year] * rows)
+        quarters.extend([quarter] * rows)
+
+    batch = {
+        # Directory slugs, resolved once per distinct state
+        "states": normalise.normalise_states(states),
+        "years": np.array(years, dtype=np.int16),
+        "quarter": np.array(quarters, dtype=np.int8),
+    }
+    for (name, dtype), values in zip(fields, columns):
+        if dtype == "category":
+            batch[name] = pd.Categorical(values)
+        else:
+            batch[name] = np.array(values, dtype=dtype)
+    return pd.DataFrame(batch)
+
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def iter_batches(root, datasets=None, workers=None, files=None):
+    """Yield (dataset, batch) pairs, parsing files on a process pool.
+
+    All tasks are submitted up front so every core stays busy; batches are
+    yielded dataset by dataset so each table can be loaded in one pass.
+    `files` ({dataset: [(path, state, year, quarter), ...]}) restricts the
+    run to those quarter files instead of the whole checkout.
+    """
+    if files is None:
+        files = {dataset: list(discover_files(root, dataset)) for dataset in datasets or DATASETS}
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            dataset: [
+                executor.submit(extract_batch, dataset, chunk)
+                for chunk in _chunks(dataset_files, FILES_PER_TASK)
+            ]
+            for dataset, dataset_files in files.items()
+        }
+        for dataset, dataset_futures in futures.items():
+            for future in dataset_futures:
+                yield dataset, future.result()
+
+
+def extract_frames(root, datasets=None, workers=None):
+    """Parse a Pulse checkout into {table: DataFrame}."""
+    batches = {}
+    for dataset, batch in iter_batches(root, datasets, workers):
+        batches.setdefault(dataset, []).append(batch)
+    return {dataset: pd.concat(frames, ignore_index=True) for dataset, frames in batches.items()}
+
+
+def ingest(conn, root, datasets=None, workers=None, upsert=False, incremental=False):
+    """Stream a Pulse checkout into PostgreSQL and refresh the rollups; returns the years loaded.
+
+    With `incremental`, only quarter files that are new or changed since the
+    last run (according to the manifest) are parsed and upserted.
+    """
+    years = set()
+    files = {dataset: list(discover_files(root, dataset)) for dataset in datasets or DATASETS}
+    entries = []
+    if incremental:
+        files, entries = manifest.diff(conn, root, files)
+        upsert = True
+        print(f"{sum(len(f) for f in files.values()):,} new or changed quarter files")
+
+    def track_years(group):
+        for _, batch in group:
+            years.update(int(year) for year in np.unique(batch["years"]))
+            yield batch
+
+    for dataset, group in groupby(iter_batches(root, workers=workers, files=files), key=itemgetter(0)):
+        rows = loader.copy_batches(conn, dataset, track_years(group), upsert)
+        print(f"{dataset}: {rows:,} rows loaded")
+
+    if years:
+        rollups.create_rollups(conn)
+        rollups.refresh_rollups(conn, years)
+    if entries:
+        manifest.record(conn, entries)
+    if years:
+        dataversion.bump(conn)
+    return years
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingest a PhonePe Pulse checkout into PostgreSQL")
+    parser.add_argument("root", help="path to a clone of https://github.com/PhonePe/pulse")
+    parser.add_argument("--datasets", nargs="+", choices=list(DATASETS), help="only ingest these tables")
+    parser.add_argument("--workers", type=int, help="worker processes (default: one per core)")
+    parser.add_argument("--upsert", action="store_true", help="merge on the natural key instead of appending")
+    parser.add_argument("--incremental", action="store_true",
+                        help="only load quarter files that are new or changed since the last run")
+    args = parser.parse_args()
+
+    conn = psycopg2.connect(**DB_CONFIG)
+    try:
+        ingest(conn, args.root, args.datasets, args.workers, args.upsert, args.incremental)
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,304 @@
+"""Bulk loader for the Pulse tables.
+
+Frames are streamed into PostgreSQL with COPY FROM STDIN, one transaction
+per table. With --upsert, rows are merged on their natural key
+(states, years, quarter, <key>) so re-running a load never duplicates rows;
+when a load repeats a key, its last row wins:
+
+    python loader.py --upsert aggregated_transaction=agg_txn.csv map_user=map_user.parquet
+
+Without --upsert a load only inserts: the natural key is a unique index, so
+a row whose key is already in the table (or repeated in the load) fails the
+whole table's transaction. Use it to fill empty tables.
+
+State names are normalised on the way in, and rows get the integer state
+and district ids of normalise.py; --backfill-keys adds them to rows loaded
+before those columns existed.
+"""
+import argparse
+import io
+import os
+
+import pandas as pd
+import psycopg2
+
+import dataversion
+import normalise
+import rollups
+from config import DB_CONFIG
+
+# Rows written per COPY buffer
+COPY_CHUNK_ROWS = 50_000
+
+TABLE_SCHEMAS = {
+    "aggregated_transaction": {
+        "columns": {
+            "states": "varchar(50)",
+            "state_id": "smallint",
+            "years": "int",
+            "quarter": "int",
+            "transaction_type": "varchar(50)",
+            "transaction_count": "bigint",
+            "transaction_amount": "bigint",
+        },
+        "key": ("states", "years", "quarter", "transaction_type"),
+    },
+    "aggregated_user": {
+        "columns": {
+            "states": "varchar(50)",
+            "state_id": "smallint",
+            "years": "int",
+            "quarter": "int",
+            "brands": "varchar(50)",
+            "transaction_count": "bigint",
+            "percentage": "float",
+        },
+        "key": ("states", "years", "quarter", "brands"),
+    },
+    "map_transaction": {
+        "columns": {
+            "states": "varchar(50)",
+            "state_id": "smallint",
+            "years": "int",
+            "quarter": "int",
+            "district": "varchar(50)",
+            "district_id": "int",
+            "transaction_count": "bigint",
+            "transaction_amount": "float",
+        },
+        "key": ("states", "years", "quarter", "district"),
+        "district": "district",
+    },
+    "map_user": {
+        "columns": {
+            "states": "varchar(50)",
+            "state_id": "smallint",
+            "years": "int",
+            "quarter": "int",
+            "districts": "varchar(50)",
+            "district_id": "int",
+            "registereduser": "bigint",
+            "appopens": "bigint",
+        },
+        "key": ("states", "years", "quarter", "districts"),
+        "district": "districts",
+    },
+    "top_transaction": {
+        "columns": {
+            "states": "varchar(50)",
+            "state_id": "smallint",
+            "years": "int",
+            "quarter": "int",
+            "pincodes": "int",
+            "transaction_count": "bigint",
+            "transaction_amount": "bigint",
+        },
+        "key": ("states", "years", "quarter", "pincodes"),
+    },
+    "top_user": {
+        "columns": {
+            "states": "varchar(50)",
+            "state_id": "smallint",
+            "years": "int",
+            "quarter": "int",
+            "pincodes": "int",
+            "registereduser": "bigint",
+        },
+        "key": ("states", "years", "quarter", "pincodes"),
+    },
+    "pincode_centroids": {
+        "columns": {
+            "pincodes": "int",
+            "latitude": "double precision",
+            "longitude": "double precision",
+        },
+        "key": ("pincodes",),
+    },
+}
+
+INTEGER_TYPES = ("smallint", "int", "bigint")
+
+
+def _drop_duplicate_keys(cursor, table, key):
+    """Delete all but the latest row (by ctid) of each natural key that appears more than once."""
+    cursor.execute(
+        f"DELETE FROM {table} a USING {table} b "
+        f"WHERE {' AND '.join(f'a.{col} = b.{col}' for col in key)} AND a.ctid < b.ctid"
+    )
+    if cursor.rowcount:
+        print(f"{table}: {cursor.rowcount:,} rows with a duplicate {', '.join(key)} removed")
+
+
+def create_table(cursor, table):
+    schema = TABLE_SCHEMAS[table]
+    columns = ", ".join(f"{name} {sql_type}" for name, sql_type in schema["columns"].items())
+    cursor.execute(f"CREATE TABLE IF NOT EXISTS {table} ({columns})")
+    # Tables created before a column was added to the schema
+    for name, sql_type in schema["columns"].items():
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {name} {sql_type}")
+    # Natural key that upserts resolve conflicts on
+    cursor.execute("SELECT to_regclass(%s)", (f"{table}_natural_key",))
+    if cursor.fetchone()[0] is None:
+        _drop_duplicate_keys(cursor, table, schema["key"])
+        cursor.execute(f"CREATE UNIQUE INDEX {table}_natural_key ON {table} ({', '.join(schema['key'])})")
+    # Integer keys that joins and rollups group on
+    for column in ("state_id", "district_id"):
+        if column in schema["columns"]:
+            cursor.execute(f"CREATE INDEX IF NOT EXISTS {table}_{column} ON {table} ({column}, years, quarter)")
+
+
+def add_keys(conn, table, df):
+    """Normalise the state names and add the table's integer state and district ids (see normalise.py)."""
+    schema = TABLE_SCHEMAS[table]
+    df = df.rename(columns=str.lower)
+    if "state_id" not in schema["columns"]:
+        return df
+    states = normalise.normalise_states(df["states"])
+    ids = normalise.state_ids(states)
+    # Unknown states are stored without an id
+    df = df.assign(states=states, state_id=pd.arrays.IntegerArray(ids, ids == 0))
+    if "district" in schema:
+        df = df.assign(district_id=normalise.assign_district_ids(conn, states, df[schema["district"]]))
+    return df
+
+
+def prepare_frame(table, df):
+    """Select and order the table's columns, with integer columns rounded to int64."""
+    schema = TABLE_SCHEMAS[table]
+    frame = df.rename(columns=str.lower)[list(schema["columns"])]
+    for column, sql_type in schema["columns"].items():
+        if sql_type in INTEGER_TYPES:
+            frame[column] = pd.to_numeric(frame[column]).round().astype("Int64")
+    return frame
+
+
+def _copy_chunks(cursor, target, columns, frame):
+    copy_sql = f"COPY {target} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)"
+    for start in range(0, len(frame), COPY_CHUNK_ROWS):
+        buffer = io.StringIO()
+        frame.iloc[start:start + COPY_CHUNK_ROWS].to_csv(buffer, index=False, header=False)
+        buffer.seek(0)
+        cursor.copy_expert(copy_sql, buffer)
+
+
+def copy_batches(conn, table, batches, upsert=False):
+    """Stream an iterable of frames into `table` in a single transaction; returns the row count."""
+    schema = TABLE_SCHEMAS[table]
+    columns = list(schema["columns"])
+    key = schema["key"]
+    rows = 0
+    with conn.cursor() as cursor:
+        create_table(cursor, table)
+        target = table
+        if upsert:
+            target = f"{table}_staging"
+            cursor.execute(f"CREATE TEMP TABLE {target} (LIKE {table}) ON COMMIT DROP")
+            # Numbers rows in the order they are copied, so the last of duplicate keys wins
+            cursor.execute(f"ALTER TABLE {target} ADD COLUMN staging_seq bigserial")
+        for batch in batches:
+            frame = prepare_frame(table, add_keys(conn, table, batch))
+            _copy_chunks(cursor, target, columns, frame)
+            rows += len(frame)
+        if upsert:
+            updates = ", ".join(f"{col} = EXCLUDED.{col}" for col in columns if col not in key)
+            cursor.execute(
+                f"INSERT INTO {table} ({', '.join(columns)}) "
+                f"SELECT DISTINCT ON ({', '.join(key)}) {', '.join(columns)} FROM {target} "
+                f"ORDER BY {', '.join(key)}, staging_seq DESC "
+                f"ON CONFLICT ({', '.join(key)}) DO UPDATE SET {updates}"
+            )
+    conn.commit()
+    return rows
+
+
+def copy_frame(conn, table, df, upsert=False):
+    """Load one frame into `table` in a single transaction; returns the row count."""
+    return copy_batches(conn, table, [df], upsert)
+
+
+def load_frames(conn, frames, upsert=False):
+    """Load {table: DataFrame} and refresh the rollups for the years that were loaded."""
+    years = set()
+    for table, df in frames.items():
+        rows = copy_frame(conn, table, df, upsert)
+        df = df.rename(columns=str.lower)
+        if "years" in df:
+            years.update(int(year) for year in pd.unique(df["years"]))
+        print(f"{table}: {rows:,} rows loaded")
+    if years:
+        rollups.create_rollups(conn)
+        rollups.refresh_rollups(conn, years)
+    if frames:
+        dataversion.bump(conn)
+
+
+def backfill_keys(conn):
+    """Set the state and district ids on rows loaded before those columns existed."""
+    with conn.cursor() as cursor:
+        for table, schema in TABLE_SCHEMAS.items():
+            if "state_id" not in schema["columns"]:
+                continue
+            create_table(cursor, table)
+            district = schema.get("district")
+            names = ["states", district] if district else ["states"]
+            missing = "state_id IS NULL OR district_id IS NULL" if district else "state_id IS NULL"
+            cursor.execute(f"SELECT DISTINCT {', '.join(names)} FROM {table} WHERE {missing}")
+            pairs = pd.DataFrame(cursor.fetchall(), columns=names)
+            if pairs.empty:
+                continue
+            states = normalise.normalise_states(pairs["states"])
+            keys = {"states": pairs["states"].tolist(),
+                    "state_id": [int(i) or None for i in normalise.state_ids(states)]}
+            types = {"states": "varchar", "state_id": "smallint"}
+            if district:
+                keys[district] = pairs[district].tolist()
+                ids = normalise.assign_district_ids(conn, states, pairs[district])
+                keys["district_id"] = [None if pd.isna(i) else int(i) for i in ids]
+                types.update({district: "varchar", "district_id": "int"})
+            cursor.execute(
+                f"UPDATE {table} t SET state_id = u.state_id"
+                + (", district_id = u.district_id" if district else "")
+                + f" FROM unnest({', '.join(f'%s::{types[k]}[]' for k in keys)}) AS u({', '.join(keys)})"
+                + f" WHERE {' AND '.join(f't.{name} = u.{name}' for name in names)}",
+                list(keys.values()),
+            )
+            print(f"{table}: ids set on {cursor.rowcount:,} rows")
+    conn.commit()
+
+
+def read_frame(path):
+    if os.path.splitext(path)[1].lower() == ".parquet":
+        return pd.read_parquet(path)
+    return pd.read_csv(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk load Pulse data into PostgreSQL")
+    parser.add_argument("sources", nargs="*", metavar="TABLE=PATH",
+                        help="CSV or Parquet file to load into a table")
+    parser.add_argument("--upsert", action="store_true",
+                        help="merge on the natural key instead of inserting into empty tables")
+    parser.add_argument("--backfill-keys", action="store_true",
+                        help="set state and district ids on rows loaded before they existed")
+    args = parser.parse_args()
+    if not args.sources and not args.backfill_keys:
+        parser.error("nothing to do: give TABLE=PATH sources or --backfill-keys")
+
+    frames = {}
+    for source in args.sources:
+        table, _, path = source.partition("=")
+        if table not in TABLE_SCHEMAS or not path:
+            parser.error(f"expected TABLE=PATH with TABLE one of {', '.join(TABLE_SCHEMAS)}")
+        frames[table] = read_frame(path)
+
+    conn = psycopg2.connect(**DB_CONFIG)
+    try:
+        load_frames(conn, frames, args.upsert)
+        if args.backfill_keys:
+            backfill_keys(conn)
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""Performance metrics of the dashboard process, for the admin panel and for export.
+
+Collects what the other modules already record: query latency, rows and
+bytes (db.query_stats), section and stage timings (profiling.section_stats),
+query-cache hit ratios (queries.cache_stats), figure cache and payload sizes
+(figcache) and the compaction footprint. They can be exported as
+
+* Prometheus text from a local endpoint (PHONEPE_METRICS_PORT):
+  ``curl localhost:9464/metrics``, or ``/metrics.json`` for the raw snapshot;
+* one JSON log line every PHONEPE_METRICS_LOG_INTERVAL seconds on the
+  ``metrics`` logger.
+"""
+import json
+import logging
+import math
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from compact import footprint
+from db import query_stats
+from figcache import get_figure_cache, view_stats
+from profiling import section_stats
+from queries import cache_stats, data_version
+
+logger = logging.getLogger(__name__)
+
+
+def snapshot(warmer=None):
+    """Every recorded metric as plain JSON-serialisable data."""
+    def records(df):
+        return json.loads(df.to_json(orient="records"))
+
+    return {
+        "data_version": data_version(),
+        "queries": records(query_stats()),
+        "sections": records(section_stats()),
+        "caches": records(cache_stats()),
+        "figure_cache": get_figure_cache().stats(),
+        "figures": records(view_stats()),
+        "footprint": records(footprint()),
+        "warmup": warmer.stats() if warmer is not None else None,
+    }
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _family(lines, name, kind, description, samples):
+    lines.append(f"# HELP {name} {description}")
+    lines.append(f"# TYPE {name} {kind}")
+    for labels, value in samples:
+        if value is None or (isinstance(value, float) and math.isnan(value)):
+            continue
+        label_text = ",".join(f'{key}="{_escape(v)}"' for key, v in labels.items())
+        lines.append(f"{name}{{{label_text}}} {value}" if label_text else f"{name} {value}")
+
+
+def prometheus(snap):
+    """Render a snapshot() in the Prometheus text exposition format."""
+    lines = []
+    _family(lines, "pulse_data_version", "gauge", "Data version the caches are serving.",
+            [({}, snap["data_version"])])
+
+    queries = snap["queries"]
+    for field, name, kind, description in [
+        ("calls", "pulse_query_calls_total", "counter", "Queries run against the storage backend."),
+        ("total_s", "pulse_query_seconds_total", "counter", "Time spent running queries."),
+        ("max_s", "pulse_query_seconds_max", "gauge", "Slowest run of each query."),
+        ("rows", "pulse_query_rows_total", "counter", "Rows returned by queries."),
+        ("bytes", "pulse_query_bytes_total", "counter", "Bytes read or returned by queries."),
+    ]:
+        _family(lines, name, kind, description, [({"query": q["query"]}, q[field]) for q in queries])
+
+    sections = snap["sections"]
+    _family(lines, "pulse_section_runs_total", "counter", "Renders of each section or runs of each stage.",
+            [({"section": s["section"]}, s["renders"]) for s in sections])
+    _family(lines, "pulse_section_seconds_total", "counter", "Time spent in each section or stage.",
+            [({"section": s["section"]}, s["total_s"]) for s in sections])
+
+    caches = snap["caches"]
+    _family(lines, "pulse_cache_calls_total", "counter", "Lookups of each query cache.",
+            [({"cache": c["cache"]}, c["calls"]) for c in caches])
+    _family(lines, "pulse_cache_misses_total", "counter", "Misses of each query cache.",
+            [({"cache": c["cache"]}, c["misses"]) for c in caches])
+
+    figure_cache = snap["figure_cache"]
+    for field, kind in [("hits", "counter"), ("misses", "counter"), ("evictions", "counter"),
+                        ("figures", "gauge"), ("bytes", "gauge")]:
+        suffix = "_total" if kind == "counter" else ""
+        _family(lines, f"pulse_figure_cache_{field}{suffix}", kind, f"Figure cache {field}.",
+                [({}, figure_cache[field])])
+
+    figures = snap["figures"]
+    _family(lines, "pulse_figure_renders_total", "counter", "Figures built and serialised, per view.",
+            [({"view": f["view"]}, f["renders"]) for f in figures])
+    _family(lines, "pulse_figure_build_seconds_total", "counter", "Time spent building figures.",
+            [({"view": f["view"]}, f["build_s"]) for f in figures])
+    _family(lines, "pulse_figure_to_json_seconds_total", "counter", "Time spent serialising figures.",
+            [({"view": f["view"]}, f["to_json_s"]) for f in figures])
+    _family(lines, "pulse_figure_bytes", "gauge", "JSON payload size of the last figure per view.",
+            [({"view": f["view"]}, f["last_bytes"]) for f in figures])
+
+    warmup = snap["warmup"]
+    if warmup:
+        _family(lines, "pulse_warmup_runs_total", "counter", "Completed cache warm-ups.",
+                [({}, warmup["runs"])])
+        _family(lines, "pulse_warmup_last_seconds", "gauge", "Duration of the last warm-up.",
+                [({}, warmup["last_run_s"])])
+    return "\n".join(lines) + "\n"
+
+
+def _handler(warmer):
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == "/metrics":
+                body = prometheus(snapshot(warmer)).encode()
+                content_type = "text/plain; version=0.0.4; charset=utf-8"
+            elif self.path == "/metrics.json":
+                body = json.dumps(snapshot(warmer)).encode()
+                content_type = "application/json"
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            logger.debug("%s - %s", self.address_string(), format % args)
+
+    return MetricsHandler
+
+
+def serve(port, host="127.0.0.1", warmer=None):
+    """Serve /metrics and /metrics.json from a daemon thread; returns the server."""
+    server = ThreadingHTTPServer((host, port), _handler(warmer))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    logger.info("Serving metrics on http://%s:%d/metrics", host, server.server_port)
+    return server
+
+
+def log_periodically(interval, warmer=None):
+    """Log a JSON snapshot every `interval` seconds from a daemon thread."""
+    def loop():
+        while True:
+            stop.wait(interval)
+            if stop.is_set():
+                return
+            try:
+                logger.info(json.dumps(snapshot(warmer)))
+            except Exception:
+                logger.exception("Could not collect metrics")
+
+    stop = threading.Event()
+    threading.Thread(target=loop, name="metrics-log", daemon=True).start()
+    return stop
@@ -0,0 +1,168 @@
+"""State and district names and their integer keys, shared by every dataset.
+
+Pulse spells a state as a directory slug ("andaman-&-nicobar-islands"),
+exports and boundary files spell it in other ways, and districts come as
+"north goa district" in one table and "North Goa" in another. Instead of
+chains of string replacements per table, names are reduced to a key
+(`name_key`) and resolved against one mapping table:
+
+* STATES lists the canonical state names; a state's id is its position + 1
+  and never changes, so it can be stored and joined on.
+* District ids are assigned at load time and kept in the `district_keys`
+  table, one per (state, district key).
+
+All functions work on the categories of a pandas Categorical, so each
+distinct spelling is resolved once and rows are mapped through integer
+codes, however many rows there are.
+"""
+import logging
+import re
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Canonical state names, as stored in the tables and shown by the dashboard.
+# Append only: a state's id is its position + 1.
+STATES = (
+    "Andaman & Nicobar", "Andhra Pradesh", "Arunachal Pradesh", "Assam", "Bihar",
+    "Chandigarh", "Chhattisgarh", "Dadra and Nagar Haveli and Daman and Diu", "Delhi", "Goa",
+    "Gujarat", "Haryana", "Himachal Pradesh", "Jammu & Kashmir", "Jharkhand",
+    "Karnataka", "Kerala", "Ladakh", "Lakshadweep", "Madhya Pradesh",
+    "Maharashtra", "Manipur", "Meghalaya", "Mizoram", "Nagaland",
+    "Odisha", "Puducherry", "Punjab", "Rajasthan", "Sikkim",
+    "Tamil Nadu", "Telangana", "Tripura", "Uttar Pradesh", "Uttarakhand",
+    "West Bengal",
+)
+
+# Other spellings seen in Pulse, boundary files and older exports
+STATE_ALIASES = {
+    "Andaman & Nicobar Islands": "Andaman & Nicobar",
+    "Andaman and Nicobar Island": "Andaman & Nicobar",
+    "Dadra and Nagar Haveli": "Dadra and Nagar Haveli and Daman and Diu",
+    "Daman and Diu": "Dadra and Nagar Haveli and Daman and Diu",
+    "NCT of Delhi": "Delhi",
+    "Orissa": "Odisha",
+    "Pondicherry": "Puducherry",
+    "Uttaranchal": "Uttarakhand",
+}
+
+CREATE_DISTRICT_KEYS = """
+    CREATE TABLE IF NOT EXISTS district_keys (
+        district_id serial PRIMARY KEY,
+        states varchar(50) NOT NULL,
+        district_key varchar(80) NOT NULL,
+        district varchar(80) NOT NULL,
+        UNIQUE (states, district_key)
+    )"""
+
+ASSIGN_DISTRICT_IDS = """
+    INSERT INTO district_keys (states, district_key, district)
+    SELECT * FROM unnest(%s::varchar[], %s::varchar[], %s::varchar[])
+    ON CONFLICT (states, district_key) DO NOTHING"""
+
+SELECT_DISTRICT_IDS = """
+    SELECT k.states, k.district_key, k.district_id
+    FROM district_keys k
+    JOIN unnest(%s::varchar[], %s::varchar[]) AS u(states, district_key) USING (states, district_key)"""
+
+
+def name_key(name):
+    """Spelling-insensitive key: "Andaman-&-Nicobar" and "andaman and nicobar" match."""
+    name = name.casefold().replace("&", "and")
+    return re.sub(r"[^a-z0-9]+", "", name)
+
+
+def district_key(name):
+    # Pulse names districts "north goa district"; boundary files say "North Goa"
+    return name_key(re.sub(r"\s+district$", "", name.strip(), flags=re.IGNORECASE))
+
+
+_STATE_IDS = {name_key(name): i + 1 for i, name in enumerate(STATES)}
+_STATE_IDS.update({name_key(alias): STATES.index(name) + 1 for alias, name in STATE_ALIASES.items()})
+
+
+def _categorical(values):
+    return values if isinstance(values, pd.Categorical) else pd.Categorical(values)
+
+
+def _recode(values, names, categories):
+    """`values` with category i renamed to names[i], as a Categorical over `categories`."""
+    categories = pd.Index(categories)
+    # Code -1 (missing) picks the trailing -1
+    lookup = np.append(categories.get_indexer(names), -1)
+    return pd.Categorical.from_codes(lookup[values.codes], categories=categories)
+
+
+def _state_id(name):
+    return _STATE_IDS.get(name_key(str(name)), 0)
+
+
+def state_ids(values):
+    """Integer state ids for any spelling of the state names; 0 where the state is unknown."""
+    values = _categorical(values)
+    lookup = np.array([_state_id(name) for name in values.categories] + [0], dtype=np.int16)
+    return lookup[values.codes]
+
+
+def normalise_states(values):
+    """Canonical state names as a Categorical over STATES, so codes are state ids - 1.
+
+    Unknown states are kept, tidied from slug form ("new-state" -> "New State"),
+    as extra categories after STATES.
+    """
+    values = _categorical(values)
+    names = []
+    unknown = set()
+    for name in values.categories:
+        state_id = _state_id(name)
+        if state_id:
+            names.append(STATES[state_id - 1])
+        else:
+            names.append(str(name).replace("-", " ").title())
+            unknown.add(names[-1])
+    if unknown:
+        logger.warning("Unknown state name(s), kept without a state id: %s", ", ".join(sorted(unknown)))
+    return _recode(values, names, [*STATES, *sorted(unknown)])
+
+
+def district_keys(values):
+    """District keys (see district_key) as a Categorical."""
+    values = _categorical(values)
+    names = [district_key(str(name)) for name in values.categories]
+    return _recode(values, names, sorted(set(names)))
+
+
+def assign_district_ids(conn, states, districts):
+    """District ids for (state, district) rows, registering new districts in `district_keys`.
+
+    `states` must already be normalised. Only the distinct pairs go to the
+    database; rows are mapped back through their codes. Rows with a null
+    state or district get no id (a missing value in the nullable result).
+    """
+    states = _categorical(states)
+    keys = district_keys(districts)
+    raw = _categorical(districts)
+    # Code -1 is a null; indexing the categories with it would pick the last name
+    valid = (states.codes != -1) & (keys.codes != -1)
+    if not valid.all():
+        logger.warning("%d row(s) without a state or district name get no district id", (~valid).sum())
+    ids = pd.arrays.IntegerArray(np.zeros(len(valid), dtype=np.int32), ~valid)
+    if not valid.any():
+        return ids
+
+    pairs = states.codes[valid].astype(np.int64) * (len(keys.categories) + 1) + keys.codes[valid]
+    _, first, inverse = np.unique(pairs, return_index=True, return_inverse=True)
+    rows = np.flatnonzero(valid)[first]
+    pair_states = [str(states.categories[states.codes[i]]) for i in rows]
+    pair_keys = [str(keys.categories[keys.codes[i]]) for i in rows]
+    pair_names = [str(raw.categories[raw.codes[i]]) for i in rows]
+
+    with conn.cursor() as cursor:
+        cursor.execute(CREATE_DISTRICT_KEYS)
+        cursor.execute(ASSIGN_DISTRICT_IDS, (pair_states, pair_keys, pair_names))
+        cursor.execute(SELECT_DISTRICT_IDS, (pair_states, pair_keys))
+        found = {(state, key): district_id for state, key, district_id in cursor.fetchall()}
+    ids[valid] = np.array([found[pair] for pair in zip(pair_states, pair_keys)], dtype=np.int32)[inverse]
+    return ids
@@ -0,0 +1,135 @@
+"""The data behind each dashboard page, declared up front and fetched concurrently.
+
+Once a page's period is chosen its loads no longer depend on each other, but
+rendering top to bottom runs them one after another, so a cold page takes
+the sum of its queries. Each page instead lists them in PAGES and fetches
+them at once on a shared thread pool before drawing anything; it then waits
+about as long as its slowest query, and its own calls that follow are cache
+hits. On PostgreSQL every worker borrows its own pooled connection (db.py).
+
+    year, quarter = ...  # from the page's selectors
+    prefetch(PAGES["user"](year, quarter))
+
+The lists cover each page's default view: the newest quarter in the page's
+PERIOD_TABLES table, which is also what the warm-up loads (warmup.py).
+Selections made later (another state, metric or map level) load on demand
+as before.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import streamlit as st
+
+from config import PAGE_FETCH_WORKERS
+from cube import TIME, load_transaction_cube
+from geo import load_states_geojson
+from pincodes import load_pincode_index
+from queries import data_version, load_district_fact, load_periods, load_slice, pinned_version
+from trends import TREND_TABLES
+
+logger = logging.getLogger(__name__)
+
+USER_METRICS = ("registereduser", "appopens")
+
+
+def trend_jobs(metric):
+    """What show_trends loads for `metric` across all of India, its default scope."""
+    table = TREND_TABLES[metric]
+    return [
+        lambda: load_periods(table),
+        lambda: load_slice(table, ("states",), (metric,)),
+        lambda: load_slice(table, TIME, (metric,)),
+    ]
+
+
+def transaction_page(year, quarter):
+    return [load_transaction_cube, *trend_jobs("transaction_amount")]
+
+
+def _first_state_districts(year, quarter):
+    # The district panel opens on the first state in the list
+    states = load_slice("map_user", ("states",), USER_METRICS, year, quarter)
+    if not states.empty:
+        load_slice("map_user", ("districts",), USER_METRICS, year, quarter, sorted(states["states"].unique())[0])
+
+
+def user_page(year, quarter):
+    return [
+        lambda: load_slice("aggregated_user", ("brands",), ("transaction_count",), year, quarter),
+        lambda: _first_state_districts(year, quarter),
+        *trend_jobs("registereduser"),
+    ]
+
+
+def geo_page(year, quarter):
+    return [
+        load_transaction_cube,
+        lambda: load_slice("map_user", ("states",), ("registereduser",), year, quarter),
+        lambda: load_slice("map_transaction", ("states",), ("transaction_count",), year, quarter),
+        lambda: load_states_geojson("coarse"),
+        *trend_jobs("transaction_amount"),
+    ]
+
+
+def pincode_page(year, quarter):
+    return [
+        lambda: load_slice("top_transaction", ("states",), ("transaction_count",), year, quarter),
+        lambda: load_slice("top_transaction", ("pincodes",), ("transaction_amount",), year, quarter),
+        load_pincode_index,
+    ]
+
+
+def penetration_page(year, quarter):
+    return [lambda: load_district_fact(year, quarter), lambda: load_states_geojson("coarse")]
+
+
+# page -> table whose periods the page's year/quarter selectors offer
+PERIOD_TABLES = {
+    "transaction": "aggregated_transaction",
+    "user": "map_user",
+    "geo": "aggregated_transaction",
+    "pincode": "top_transaction",
+    "penetration": "district_quarter_fact",
+}
+
+# page -> function(year, quarter) returning the page's loads for that period
+PAGES = {
+    "transaction": transaction_page,
+    "user": user_page,
+    "geo": geo_page,
+    "pincode": pincode_page,
+    "penetration": penetration_page,
+}
+
+
+# One pool per process, shared by every session
+@st.cache_resource
+def _executor():
+    return ThreadPoolExecutor(PAGE_FETCH_WORKERS, thread_name_prefix="page-fetch")
+
+
+def fetch(jobs):
+    """Run `jobs` concurrently at the caller's data version and return their results in order.
+
+    Every job is waited for; the first failure, if any, is then raised.
+    """
+    version = data_version()
+
+    def run(job):
+        with pinned_version(version):
+            return job()
+
+    futures = [_executor().submit(run, job) for job in jobs]
+    wait(futures)
+    return [future.result() for future in futures]
+
+
+def prefetch(jobs):
+    """Fill the caches behind `jobs` concurrently, waiting until all are loaded.
+
+    Failures are only logged: the page reports them when it makes the same call.
+    """
+    try:
+        fetch(jobs)
+    except Exception:
+        logger.debug("Page prefetch failed", exc_info=True)
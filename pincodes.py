@@ -0,0 +1,189 @@
+"""Pincode centroids and the spatial index behind the Pincode Insights page.
+
+Centroids come from the India Post pincode directory (a CSV with pincode,
+latitude and longitude columns, one row per post office). Each pincode's
+post offices are averaged into one centroid and loaded into
+`pincode_centroids`:
+
+    python pincodes.py all_india_pincode_directory.csv
+"""
+import argparse
+
+import numpy as np
+import pandas as pd
+import psycopg2
+import streamlit as st
+from psycopg2.errors import UndefinedTable
+
+try:
+    from scipy.spatial import cKDTree
+except ImportError:  # optional; searches fall back to a vectorised scan
+    cKDTree = None
+
+import dataversion
+import loader
+from backends import get_backend
+from config import DB_CONFIG
+from queries import call_versioned, load_slice, record_miss
+
+EARTH_RADIUS_KM = 6371.0088
+
+# Rough bounding box of India; the directory has some rows with swapped or junk coordinates
+LATITUDE_RANGE = (6.0, 37.5)
+LONGITUDE_RANGE = (68.0, 97.5)
+
+
+def read_directory(path):
+    """One centroid per pincode from the India Post directory CSV."""
+    df = pd.read_csv(path, usecols=lambda column: column.strip().lower() in ("pincode", "latitude", "longitude"),
+                     dtype=str)
+    df.columns = [column.strip().lower() for column in df.columns]
+    df = df.apply(pd.to_numeric, errors="coerce").dropna()
+    df = df[df["latitude"].between(*LATITUDE_RANGE) & df["longitude"].between(*LONGITUDE_RANGE)]
+    return (df.groupby("pincode", as_index=False)[["latitude", "longitude"]].mean()
+            .rename(columns={"pincode": "pincodes"}))
+
+
+def _unit_vectors(latitude, longitude):
+    latitude = np.radians(np.asarray(latitude, dtype=float))
+    longitude = np.radians(np.asarray(longitude, dtype=float))
+    return np.column_stack([
+        np.cos(latitude) * np.cos(longitude),
+        np.cos(latitude) * np.sin(longitude),
+        np.sin(latitude),
+    ])
+
+
+def _chord(distance_km):
+    return 2 * np.sin(np.asarray(distance_km, dtype=float) / (2 * EARTH_RADIUS_KM))
+
+
+def _great_circle(chord):
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.clip(np.asarray(chord) / 2, 0, 1))
+
+
+class PincodeIndex:
+    """Nearest-neighbour and radius searches over pincode centroids.
+
+    Centroids are stored as 3-D unit vectors, where straight-line (chord)
+    distance grows with great-circle distance, so a KD-tree answers both
+    searches in logarithmic time. Without scipy the same searches run as a
+    vectorised scan, which is still a few milliseconds for all of India.
+    """
+
+    def __init__(self, centroids):
+        self.pincodes = centroids["pincodes"].to_numpy(dtype=np.int64)
+        self.latitude = centroids["latitude"].to_numpy(dtype=float)
+        self.longitude = centroids["longitude"].to_numpy(dtype=float)
+        self._points = _unit_vectors(self.latitude, self.longitude)
+        self._tree = cKDTree(self._points) if cKDTree is not None else None
+        self._position = {pincode: i for i, pincode in enumerate(self.pincodes.tolist())}
+
+    def __len__(self):
+        return len(self.pincodes)
+
+    def locate(self, pincode):
+        """(latitude, longitude) of a pincode, or None if it has no centroid."""
+        i = self._position.get(int(pincode))
+        if i is None:
+            return None
+        return float(self.latitude[i]), float(self.longitude[i])
+
+    def _frame(self, positions, chords):
+        return pd.DataFrame({
+            "pincodes": self.pincodes[positions],
+            "latitude": self.latitude[positions],
+            "longitude": self.longitude[positions],
+            "distance_km": _great_circle(chords),
+        })
+
+    def nearest(self, latitude, longitude, k=10):
+        """The `k` pincodes closest to a point, nearest first."""
+        k = min(int(k), len(self))
+        if k <= 0:
+            return self._frame([], [])
+        point = _unit_vectors([latitude], [longitude])[0]
+        if self._tree is not None:
+            chords, positions = self._tree.query(point, k=k)
+            return self._frame(np.atleast_1d(positions), np.atleast_1d(chords))
+        chords = np.linalg.norm(self._points - point, axis=1)
+        positions = np.argpartition(chords, k - 1)[:k]
+        positions = positions[np.argsort(chords[positions])]
+        return self._frame(positions, chords[positions])
+
+    def within(self, latitude, longitude, radius_km):
+        """Every pincode within `radius_km` of a point, nearest first."""
+        point = _unit_vectors([latitude], [longitude])[0]
+        radius = _chord(min(radius_km, np.pi * EARTH_RADIUS_KM))
+        if self._tree is not None:
+            positions = np.asarray(self._tree.query_ball_point(point, radius), dtype=np.intp)
+            chords = np.linalg.norm(self._points[positions] - point, axis=1)
+        else:
+            chords = np.linalg.norm(self._points - point, axis=1)
+            positions = np.flatnonzero(chords <= radius)
+            chords = chords[positions]
+        order = np.argsort(chords)
+        return self._frame(positions[order], chords[order])
+
+
+# Built once per data version; centroids only change when the directory is reloaded
+@st.cache_resource
+def _build_index(version):
+    record_miss("_build_index")
+    try:
+        centroids = get_backend().select("pincode_centroids")
+    except (UndefinedTable, FileNotFoundError) as e:
+        # The table is optional: not created in PostgreSQL, or not in the Parquet snapshot
+        raise LookupError("No pincode centroids loaded") from e
+    if centroids.empty:
+        # Raising keeps a missing table out of the cache
+        raise LookupError("No pincode centroids loaded")
+    return PincodeIndex(centroids)
+
+
+def load_pincode_index():
+    """The shared PincodeIndex, or None if no centroids have been loaded."""
+    try:
+        return call_versioned(_build_index)
+    except LookupError:
+        pass
+    except Exception as e:
+        st.error(f"Error loading pincode centroids: {e}")
+    return None
+
+
+def _by_pincode(df):
+    # Pulse has the odd row without a pincode
+    pincodes = pd.to_numeric(df["pincodes"], errors="coerce")
+    return df.assign(pincodes=pincodes).dropna(subset=["pincodes"]).astype({"pincodes": np.int64})
+
+
+def with_activity(found, year, quarter):
+    """Attach the quarter's top_transaction / top_user figures to search results.
+
+    Pulse only reports each state's top pincodes, so most results have none.
+    """
+    transactions = load_slice("top_transaction", ("pincodes",),
+                              ("transaction_count", "transaction_amount"), year, quarter)
+    users = load_slice("top_user", ("pincodes",), ("registereduser",), year, quarter)
+    return (found.merge(_by_pincode(transactions), on="pincodes", how="left")
+            .merge(_by_pincode(users), on="pincodes", how="left"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load pincode centroids from the India Post directory")
+    parser.add_argument("directory", help="CSV with pincode, latitude and longitude columns")
+    args = parser.parse_args()
+
+    centroids = read_directory(args.directory)
+    conn = psycopg2.connect(**DB_CONFIG)
+    try:
+        rows = loader.copy_frame(conn, "pincode_centroids", centroids, upsert=True)
+        dataversion.bump(conn)
+    finally:
+        conn.close()
+    print(f"pincode_centroids: {rows:,} pincodes loaded")
+
+
+if __name__ == "__main__":
+    main()
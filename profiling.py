@@ -0,0 +1,67 @@
+"""Render timings for dashboard sections and hot-path stages.
+
+    with section("transaction:state_panel"):
+        ...
+
+    with timed("geo:download"):
+        ...
+
+Timings are kept per process, like db.query_stats(). With the sidebar
+"Show section timings" toggle on, each section also prints how long it
+took to render; `timed` stages (downloads, pandas work outside the query
+layer) are only recorded, so they can run outside a Streamlit script.
+"""
+import threading
+import time
+from contextlib import contextmanager
+
+import pandas as pd
+import streamlit as st
+
+# Session-state key of the sidebar toggle
+SHOW_TIMINGS_KEY = "show_section_timings"
+
+_lock = threading.Lock()
+_section_stats = {}
+
+
+def record_section(name, elapsed):
+    with _lock:
+        stats = _section_stats.setdefault(name, {"renders": 0, "total_s": 0.0, "max_s": 0.0, "last_s": 0.0})
+        stats["renders"] += 1
+        stats["total_s"] += elapsed
+        stats["max_s"] = max(stats["max_s"], elapsed)
+        stats["last_s"] = elapsed
+
+
+@contextmanager
+def timed(name):
+    """Record the block as one run of stage `name`."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_section(name, time.perf_counter() - start)
+
+
+@contextmanager
+def section(name):
+    """Time the block as one render of section `name`."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        record_section(name, elapsed)
+        if st.session_state.get(SHOW_TIMINGS_KEY):
+            st.caption(f"⏱ {name}: {elapsed * 1000:.0f} ms")
+
+
+def section_stats():
+    """Per-section (and per-stage) render count and timings."""
+    with _lock:
+        rows = [
+            {"section": name, **stats, "avg_s": stats["total_s"] / stats["renders"]}
+            for name, stats in _section_stats.items()
+        ]
+    return pd.DataFrame(rows, columns=["section", "renders", "total_s", "max_s", "last_s", "avg_s"])
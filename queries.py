@@ -0,0 +1,236 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+import pandas as pd
+import streamlit as st
+
+from backends import get_backend
+from compact import compact_frame
+from config import VERSION_POLL_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+# Cached results carry the data version they were loaded at and live until
+# it changes. warmup.py loads a new version in the background and then
+# publishes it, so live traffic keeps hitting the previous, complete version
+# in the meantime; without a warm-up thread readers follow the probe directly.
+_lock = threading.Lock()
+_published = None
+_probe = {"version": None, "checked": 0.0}
+_pinned = threading.local()
+# version -> {(cached function, args)} loaded at that version, for eviction
+_loaded = {}
+# cached function name -> {"calls", "misses"}
+_cache_stats = {}
+
+
+def probe_version(max_age=VERSION_POLL_INTERVAL):
+    """The storage backend's data version, asked at most once every `max_age` seconds."""
+    with _lock:
+        if _probe["version"] is not None and time.monotonic() - _probe["checked"] < max_age:
+            return _probe["version"]
+        previous = _probe["version"]
+    try:
+        version = get_backend().version()
+    except Exception:
+        logger.exception("Could not probe the data version")
+        version = 0 if previous is None else previous
+    with _lock:
+        _probe.update(version=version, checked=time.monotonic())
+        following = _published is None
+    if following and version != previous:
+        _evict_except(version)
+    return version
+
+
+def data_version():
+    """Data version of the cached query results.
+
+    Every cached query, and every cache layered on top of them (see
+    figcache.py), includes it in its key.
+    """
+    pinned = getattr(_pinned, "version", None)
+    if pinned is not None:
+        return pinned
+    return _published if _published is not None else probe_version()
+
+
+@contextmanager
+def pinned_version(version):
+    """Read and fill version `version` of the caches in this thread."""
+    previous = getattr(_pinned, "version", None)
+    _pinned.version = version
+    try:
+        yield
+    finally:
+        _pinned.version = previous
+
+
+def publish_version(version):
+    """Switch every reader over to `version` and drop results cached at other versions."""
+    global _published
+    with _lock:
+        _published = version
+    _evict_except(version)
+
+
+def call_versioned(fetch, *args):
+    """`fetch(*args, version)` for the current data version.
+
+    `fetch` is an st.cache_resource function; its entries for other versions
+    are cleared when a new version is published.
+    """
+    version = data_version()
+    with _lock:
+        _loaded.setdefault(version, set()).add((fetch, args))
+        _cache_stats.setdefault(fetch.__name__, {"calls": 0, "misses": 0})["calls"] += 1
+    return fetch(*args, version)
+
+
+def record_miss(name):
+    """Count a miss of cached function `name`; called from its body, which only runs on a miss."""
+    with _lock:
+        _cache_stats.setdefault(name, {"calls": 0, "misses": 0})["misses"] += 1
+
+
+def cache_stats():
+    """Calls, misses and hit ratio of each cache behind call_versioned."""
+    with _lock:
+        rows = [
+            {"cache": name, **stats,
+             "hit_ratio": 1 - stats["misses"] / stats["calls"] if stats["calls"] else None}
+            for name, stats in _cache_stats.items()
+        ]
+    return pd.DataFrame(rows, columns=["cache", "calls", "misses", "hit_ratio"])
+
+
+def _evict_except(version):
+    with _lock:
+        stale = [(v, _loaded.pop(v)) for v in list(_loaded) if v != version]
+    for v, calls in stale:
+        for fetch, args in calls:
+            fetch.clear(*args, v)
+
+
+class QueryError(RuntimeError):
+    """A load failed in the storage backend, as opposed to returning no rows."""
+
+
+# Cached frames are compacted once and shared by every session (st.cache_resource
+# does not pickle); callers get shallow copies over read-only columns, never deep copies.
+
+# Each (table, year, quarter, state, grouping, metrics) combination is cached separately
+@st.cache_resource
+def _fetch_slice(table, group_by, metrics, year, quarter, state, version):
+    record_miss("_fetch_slice")
+    df = get_backend().select(
+        table,
+        group_by=group_by,
+        metrics=metrics,
+        filters={"years": year, "quarter": quarter, "states": state},
+    )
+    return compact_frame(df, key=("slice", table, group_by, metrics, year, quarter, state))
+
+
+def load_slice(table, group_by=(), metrics=(), year=None, quarter=None, state=None, raise_errors=False):
+    """Sum `metrics` per `group_by` for one year/quarter/state, computed by the storage backend.
+
+    A failed query is shown with st.error and returns an empty frame, or
+    raises QueryError with `raise_errors`.
+    """
+    # Plain ints, so numpy and Python years share one cache entry
+    year = None if year is None else int(year)
+    quarter = None if quarter is None else int(quarter)
+    try:
+        return call_versioned(_fetch_slice, table, tuple(group_by), tuple(metrics),
+                              year, quarter, state).copy(deep=False)
+    except Exception as e:
+        if raise_errors:
+            raise QueryError(f"Error loading {table} data: {e}") from e
+        st.error(f"Error loading {table} data: {e}")
+    return pd.DataFrame(columns=[*group_by, *metrics])
+
+
+@st.cache_resource
+def _fetch_periods(table, version):
+    record_miss("_fetch_periods")
+    return compact_frame(get_backend().periods(table), key=("periods", table))
+
+
+def load_periods(table, raise_errors=False):
+    """Distinct (years, quarter) pairs present in a table; failures are handled as in load_slice."""
+    try:
+        return call_versioned(_fetch_periods, table).copy(deep=False)
+    except Exception as e:
+        if raise_errors:
+            raise QueryError(f"Error loading {table} data: {e}") from e
+        st.error(f"Error loading {table} data: {e}")
+    return pd.DataFrame(columns=["years", "quarter"])
+
+
+# Facts & Insights queries, answered from the yearly rollup tables (see rollups.py)
+FACTS = {
+    "top_brands": dict(
+        table="rollup_brand_year", columns=("brands", "transaction_count"),
+        order_by="transaction_count", descending=True),
+    "districts_amount_lowest": dict(
+        table="rollup_district_transaction_year", columns=("district", "transaction_amount"),
+        order_by="transaction_amount", limit=10),
+    "districts_amount_highest": dict(
+        table="rollup_district_transaction_year", columns=("district", "transaction_amount"),
+        order_by="transaction_amount", descending=True, limit=10),
+    "users_growth": dict(
+        table="rollup_state_user_year", group_by=("years",), metrics=("registereduser",)),
+    "states_usage_highest": dict(
+        table="rollup_state_user_year", columns=("states", "registereduser"),
+        order_by="registereduser", descending=True, limit=10),
+    "states_usage_lowest": dict(
+        table="rollup_state_user_year", columns=("states", "registereduser"),
+        order_by="registereduser", limit=10),
+    "districts_usage_highest": dict(
+        table="rollup_district_user_year", columns=("districts", "states", "registereduser"),
+        order_by="registereduser", descending=True, limit=10),
+    "districts_usage_lowest": dict(
+        table="rollup_district_user_year", columns=("districts", "states", "registereduser"),
+        order_by="registereduser", limit=10),
+    "districts_count_highest": dict(
+        table="rollup_district_transaction_year", columns=("states", "district", "transaction_count"),
+        order_by="transaction_count", descending=True, limit=10),
+    "districts_count_lowest": dict(
+        table="rollup_district_transaction_year", columns=("states", "district", "transaction_count"),
+        order_by="transaction_count", limit=10),
+}
+
+
+@st.cache_resource
+def _fetch_fact(fact, year, version):
+    record_miss("_fetch_fact")
+    df = get_backend().select(**FACTS[fact], filters={"years": year})
+    return compact_frame(df, key=("fact", fact, year))
+
+
+def load_fact(fact, year=None):
+    """Run one of the FACTS lookups for a year."""
+    year = None if year is None else int(year)
+    try:
+        return call_versioned(_fetch_fact, fact, year).copy(deep=False)
+    except Exception as e:
+        raise QueryError(f"Error loading {fact}: {e}") from e
+
+
+@st.cache_resource
+def _fetch_district_fact(year, quarter, version):
+    record_miss("_fetch_district_fact")
+    df = get_backend().select("district_quarter_fact", filters={"years": year, "quarter": quarter},
+                              order_by="penetration_rank")
+    return compact_frame(df, key=("district_fact", year, quarter))
+
+
+def load_district_fact(year, quarter):
+    """Every district's row of district_quarter_fact (see rollups.py) for a quarter, by penetration rank."""
+    try:
+        return call_versioned(_fetch_district_fact, int(year), int(quarter)).copy(deep=False)
+    except Exception as e:
+        raise QueryError(f"Error loading district_quarter_fact data: {e}") from e
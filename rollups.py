@@ -0,0 +1,250 @@
+"""Summary tables behind the Facts & Insights page and the trend views.
+
+Yearly rollups answer the Facts lookups; per-state quarterly rollups hold
+the time series for trends.py; district_quarter_fact joins each district's
+transactions with its users (on the district ids of normalise.py) for the
+District Penetration page. Rollups are rebuilt per year, so loading a new quarter only recomputes the
+years it touches:
+
+    python rollups.py                 # create tables and rebuild everything
+    python rollups.py --years 2023    # refresh a single year
+"""
+import argparse
+
+import psycopg2
+
+import dataversion
+from config import DB_CONFIG
+from normalise import CREATE_DISTRICT_KEYS
+
+# Transactions per registered user, the ratio districts are ranked on
+TRANSACTIONS_PER_USER = "t.transaction_count::double precision / NULLIF(u.registereduser, 0)"
+
+ROLLUPS = {
+    "rollup_district_transaction_year": {
+        "source": "map_transaction",
+        "create": """
+            CREATE TABLE IF NOT EXISTS rollup_district_transaction_year (
+                years int NOT NULL,
+                states varchar(50) NOT NULL,
+                district varchar(50) NOT NULL,
+                transaction_count bigint NOT NULL,
+                transaction_amount double precision NOT NULL,
+                PRIMARY KEY (years, states, district)
+            )""",
+        "indexes": [
+            "CREATE INDEX IF NOT EXISTS rollup_district_transaction_year_amount_idx "
+            "ON rollup_district_transaction_year (years, transaction_amount)",
+            "CREATE INDEX IF NOT EXISTS rollup_district_transaction_year_count_idx "
+            "ON rollup_district_transaction_year (years, transaction_count)",
+        ],
+        "populate": """
+            INSERT INTO rollup_district_transaction_year
+            SELECT years, states, district, SUM(transaction_count), SUM(transaction_amount)
+            FROM map_transaction
+            WHERE years = ANY(%(years)s)
+            GROUP BY years, states, district""",
+    },
+    "rollup_district_user_year": {
+        "source": "map_user",
+        "create": """
+            CREATE TABLE IF NOT EXISTS rollup_district_user_year (
+                years int NOT NULL,
+                states varchar(50) NOT NULL,
+                districts varchar(50) NOT NULL,
+                registereduser bigint NOT NULL,
+                PRIMARY KEY (years, states, districts)
+            )""",
+        "indexes": [
+            "CREATE INDEX IF NOT EXISTS rollup_district_user_year_users_idx "
+            "ON rollup_district_user_year (years, registereduser)",
+        ],
+        "populate": """
+            INSERT INTO rollup_district_user_year
+            SELECT years, states, districts, SUM(registereduser)
+            FROM map_user
+            WHERE years = ANY(%(years)s)
+            GROUP BY years, states, districts""",
+    },
+    "rollup_state_user_year": {
+        "source": "map_user",
+        "create": """
+            CREATE TABLE IF NOT EXISTS rollup_state_user_year (
+                years int NOT NULL,
+                states varchar(50) NOT NULL,
+                registereduser bigint NOT NULL,
+                PRIMARY KEY (years, states)
+            )""",
+        "indexes": [
+            "CREATE INDEX IF NOT EXISTS rollup_state_user_year_users_idx "
+            "ON rollup_state_user_year (years, registereduser)",
+        ],
+        "populate": """
+            INSERT INTO rollup_state_user_year
+            SELECT years, states, SUM(registereduser)
+            FROM map_user
+            WHERE years = ANY(%(years)s)
+            GROUP BY years, states""",
+    },
+    "rollup_brand_year": {
+        "source": "aggregated_user",
+        "create": """
+            CREATE TABLE IF NOT EXISTS rollup_brand_year (
+                years int NOT NULL,
+                brands varchar(50) NOT NULL,
+                transaction_count bigint NOT NULL,
+                PRIMARY KEY (years, brands)
+            )""",
+        "indexes": [
+            "CREATE INDEX IF NOT EXISTS rollup_brand_year_count_idx "
+            "ON rollup_brand_year (years, transaction_count)",
+        ],
+        "populate": """
+            INSERT INTO rollup_brand_year
+            SELECT years, brands, SUM(transaction_count)
+            FROM aggregated_user
+            WHERE years = ANY(%(years)s)
+            GROUP BY years, brands""",
+    },
+    # Quarterly series per state for trends.py
+    "rollup_state_transaction_quarter": {
+        "source": "aggregated_transaction",
+        "create": """
+            CREATE TABLE IF NOT EXISTS rollup_state_transaction_quarter (
+                years int NOT NULL,
+                quarter int NOT NULL,
+                states varchar(50) NOT NULL,
+                transaction_count bigint NOT NULL,
+                transaction_amount double precision NOT NULL,
+                PRIMARY KEY (years, quarter, states)
+            )""",
+        "indexes": [],
+        "populate": """
+            INSERT INTO rollup_state_transaction_quarter
+            SELECT years, quarter, states, SUM(transaction_count), SUM(transaction_amount)
+            FROM aggregated_transaction
+            WHERE years = ANY(%(years)s)
+            GROUP BY years, quarter, states""",
+    },
+    "rollup_state_user_quarter": {
+        "source": "map_user",
+        "create": """
+            CREATE TABLE IF NOT EXISTS rollup_state_user_quarter (
+                years int NOT NULL,
+                quarter int NOT NULL,
+                states varchar(50) NOT NULL,
+                registereduser bigint NOT NULL,
+                appopens bigint NOT NULL,
+                PRIMARY KEY (years, quarter, states)
+            )""",
+        "indexes": [],
+        "populate": """
+            INSERT INTO rollup_state_user_quarter
+            SELECT years, quarter, states, SUM(registereduser), SUM(appopens)
+            FROM map_user
+            WHERE years = ANY(%(years)s)
+            GROUP BY years, quarter, states""",
+    },
+    # One row per district and quarter with both datasets' metrics and the
+    # per-user ratios, ranked nationally and within each state
+    "district_quarter_fact": {
+        "source": "map_transaction",
+        "create": """
+            CREATE TABLE IF NOT EXISTS district_quarter_fact (
+                years int NOT NULL,
+                quarter int NOT NULL,
+                district_id int NOT NULL,
+                state_id smallint,
+                states varchar(50) NOT NULL,
+                district varchar(80) NOT NULL,
+                transaction_count bigint NOT NULL,
+                transaction_amount double precision NOT NULL,
+                registereduser bigint NOT NULL,
+                appopens bigint NOT NULL,
+                transactions_per_user double precision,
+                amount_per_app_open double precision,
+                penetration_rank int NOT NULL,
+                state_penetration_rank int NOT NULL,
+                PRIMARY KEY (years, quarter, district_id)
+            )""",
+        "indexes": [
+            "CREATE INDEX IF NOT EXISTS district_quarter_fact_rank_idx "
+            "ON district_quarter_fact (years, quarter, penetration_rank)",
+            "CREATE INDEX IF NOT EXISTS district_quarter_fact_state_rank_idx "
+            "ON district_quarter_fact (years, quarter, states, state_penetration_rank)",
+        ],
+        "populate": f"""
+            INSERT INTO district_quarter_fact
+            SELECT years, quarter, district_id, t.state_id, t.states, k.district,
+                   t.transaction_count, t.transaction_amount, u.registereduser, u.appopens,
+                   {TRANSACTIONS_PER_USER},
+                   t.transaction_amount / NULLIF(u.appopens, 0),
+                   RANK() OVER (PARTITION BY years, quarter
+                                ORDER BY {TRANSACTIONS_PER_USER} DESC NULLS LAST),
+                   RANK() OVER (PARTITION BY years, quarter, t.states
+                                ORDER BY {TRANSACTIONS_PER_USER} DESC NULLS LAST)
+            FROM (
+                SELECT years, quarter, district_id, MIN(state_id) AS state_id, MIN(states) AS states,
+                       SUM(transaction_count) AS transaction_count, SUM(transaction_amount) AS transaction_amount
+                FROM map_transaction
+                WHERE years = ANY(%(years)s) AND district_id IS NOT NULL
+                GROUP BY years, quarter, district_id
+            ) t
+            JOIN (
+                SELECT years, quarter, district_id,
+                       SUM(registereduser) AS registereduser, SUM(appopens) AS appopens
+                FROM map_user
+                WHERE years = ANY(%(years)s) AND district_id IS NOT NULL
+                GROUP BY years, quarter, district_id
+            ) u USING (years, quarter, district_id)
+            JOIN district_keys k USING (district_id)""",
+    },
+}
+
+
+def create_rollups(conn):
+    with conn.cursor() as cursor:
+        # district_quarter_fact takes its district names from here
+        cursor.execute(CREATE_DISTRICT_KEYS)
+        for rollup in ROLLUPS.values():
+            cursor.execute(rollup["create"])
+            for index in rollup["indexes"]:
+                cursor.execute(index)
+    conn.commit()
+
+
+def refresh_rollups(conn, years=None):
+    """Recompute the rollup rows for `years` (every loaded year if None) in one transaction."""
+    with conn.cursor() as cursor:
+        for name, rollup in ROLLUPS.items():
+            refresh_years = years
+            if refresh_years is None:
+                cursor.execute(f"SELECT DISTINCT years FROM {rollup['source']}")
+                refresh_years = [row[0] for row in cursor.fetchall()]
+            refresh_years = sorted({int(year) for year in refresh_years})
+            cursor.execute(f"DELETE FROM {name} WHERE years = ANY(%(years)s)", {"years": refresh_years})
+            cursor.execute(rollup["populate"], {"years": refresh_years})
+    conn.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Create and refresh the summary rollups")
+    parser.add_argument("--years", type=int, nargs="+", help="only refresh these years")
+    args = parser.parse_args()
+
+    # loader.py imports this module
+    import loader
+
+    conn = psycopg2.connect(**DB_CONFIG)
+    try:
+        # Rows loaded before the district ids existed would drop out of district_quarter_fact
+        loader.backfill_keys(conn)
+        create_rollups(conn)
+        refresh_rollups(conn, args.years)
+        dataversion.bump(conn)
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+# Tables the dashboard reads: the columns they may be filtered/grouped on,
+# the metrics they can sum together with the SQL type the sum is returned
+# as, and the columns a snapshot is partitioned by.
+TABLES = {
+    "aggregated_transaction": {
+        "dimensions": ("states", "years", "quarter", "transaction_type"),
+        "metrics": {"transaction_count": "bigint", "transaction_amount": "double precision"},
+        "partitions": ("years", "quarter"),
+    },
+    "aggregated_user": {
+        "dimensions": ("states", "years", "quarter", "brands"),
+        "metrics": {"transaction_count": "bigint", "percentage": "double precision"},
+        "partitions": ("years", "quarter"),
+    },
+    "map_transaction": {
+        "dimensions": ("states", "years", "quarter", "district"),
+        "metrics": {"transaction_count": "bigint", "transaction_amount": "double precision"},
+        "partitions": ("years", "quarter"),
+    },
+    "map_user": {
+        "dimensions": ("states", "years", "quarter", "districts"),
+        "metrics": {"registereduser": "bigint", "appopens": "bigint"},
+        "partitions": ("years", "quarter"),
+    },
+    "top_transaction": {
+        "dimensions": ("states", "years", "quarter", "pincodes"),
+        "metrics": {"transaction_count": "bigint", "transaction_amount": "double precision"},
+        "partitions": ("years", "quarter"),
+    },
+    "top_user": {
+        "dimensions": ("states", "years", "quarter", "pincodes"),
+        "metrics": {"registereduser": "bigint"},
+        "partitions": ("years", "quarter"),
+    },
+    # Pincode locations (see pincodes.py)
+    "pincode_centroids": {
+        "dimensions": ("pincodes", "latitude", "longitude"),
+        "metrics": {},
+        "partitions": (),
+    },
+    # Rollups (see rollups.py)
+    "rollup_district_transaction_year": {
+        "dimensions": ("years", "states", "district"),
+        "metrics": {"transaction_count": "bigint", "transaction_amount": "double precision"},
+        "partitions": ("years",),
+    },
+    "rollup_district_user_year": {
+        "dimensions": ("years", "states", "districts"),
+        "metrics": {"registereduser": "bigint"},
+        "partitions": ("years",),
+    },
+    "rollup_state_user_year": {
+        "dimensions": ("years", "states"),
+        "metrics": {"registereduser": "bigint"},
+        "partitions": ("years",),
+    },
+    "rollup_brand_year": {
+        "dimensions": ("years", "brands"),
+        "metrics": {"transaction_count": "bigint"},
+        "partitions": ("years",),
+    },
+    "rollup_state_transaction_quarter": {
+        "dimensions": ("years", "quarter", "states"),
+        "metrics": {"transaction_count": "bigint", "transaction_amount": "double precision"},
+        "partitions": ("years",),
+    },
+    "rollup_state_user_quarter": {
+        "dimensions": ("years", "quarter", "states"),
+        "metrics": {"registereduser": "bigint", "appopens": "bigint"},
+        "partitions": ("years",),
+    },
+    # Per-district ratios and ranks are selected as they are, never summed
+    "district_quarter_fact": {
+        "dimensions": ("years", "quarter", "district_id", "state_id", "states", "district",
+                       "transactions_per_user", "amount_per_app_open",
+                       "penetration_rank", "state_penetration_rank"),
+        "metrics": {"transaction_count": "bigint", "transaction_amount": "double precision",
+                    "registereduser": "bigint", "appopens": "bigint"},
+        "partitions": ("years",),
+    },
+}
+
+
+def check_columns(table, dimensions=(), metrics=()):
+    """Raise ValueError unless every column belongs to the table."""
+    if table not in TABLES:
+        raise ValueError(f"Unknown table: {table}")
+    spec = TABLES[table]
+    for column in dimensions:
+        if column not in spec["dimensions"]:
+            raise ValueError(f"{table} has no dimension {column}")
+    for column in metrics:
+        if column not in spec["metrics"]:
+            raise ValueError(f"{table} has no metric {column}")
+
+
+def table_columns(table):
+    spec = TABLES[table]
+    return (*spec["dimensions"], *spec["metrics"])
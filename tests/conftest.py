@@ -0,0 +1,72 @@
+"""Shared fixtures: small synthetic Pulse frames and a recording database connection."""
+import logging
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks import synthetic  # noqa: E402
+
+# Cached loads warn on every call made outside a Streamlit session
+logging.getLogger("streamlit.runtime.scriptrunner_utils.script_run_context").setLevel(logging.ERROR)
+
+
+class FakeCursor:
+    """Records the SQL it is given; `results` supplies fetchone/fetchall rows in order."""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.rowcount = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query, params=None):
+        self.conn.executed.append((" ".join(query.split()), params))
+
+    def copy_expert(self, query, buffer):
+        self.conn.copied.append((query, buffer.read()))
+
+    def fetchone(self):
+        return self.conn.results.pop(0)
+
+    def fetchall(self):
+        return self.conn.results.pop(0)
+
+
+class FakeConnection:
+    def __init__(self):
+        self.executed = []
+        self.copied = []
+        self.results = []
+        self.commits = 0
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        pass
+
+    def statements(self, prefix):
+        return [query for query, _ in self.executed if query.startswith(prefix)]
+
+
+@pytest.fixture
+def fake_conn():
+    return FakeConnection()
+
+
+@pytest.fixture(scope="session")
+def frames():
+    """Two states, three districts each, 2023-2024, with the rollups."""
+    frames = synthetic.generate(states=2, districts=3, years=range(2023, 2025))
+    frames.update(synthetic.rollup_frames(frames))
+    return frames
@@ -0,0 +1,109 @@
+import itertools
+
+import pytest
+
+import queries
+from backends import ParquetBackend, write_snapshot
+from benchmarks.synthetic import FrameSource
+
+# The API is optional (pip install starlette uvicorn)
+TestClient = pytest.importorskip("starlette.testclient").TestClient
+import api  # noqa: E402
+
+# Every test reads at fresh data versions, so no cached result carries over
+_versions = itertools.count(1000)
+
+
+@pytest.fixture(scope="module")
+def snapshot(tmp_path_factory, frames):
+    root = str(tmp_path_factory.mktemp("api") / "snapshot")
+    write_snapshot(root, source=FrameSource(frames))
+    return root
+
+
+@pytest.fixture
+def client(monkeypatch, snapshot):
+    backend = ParquetBackend(snapshot)
+    monkeypatch.setattr(queries, "get_backend", lambda: backend)
+    monkeypatch.setattr(queries, "_published", None)
+    publish()
+    # Without a context manager the lifespan, and so the warm-up thread, does not run
+    return TestClient(api.app)
+
+
+def publish():
+    version = next(_versions)
+    queries.publish_version(version)
+    return version
+
+
+PATH = "/v1/users/states?year=2024&quarter=1"
+
+
+def test_response_carries_an_etag_tied_to_the_data_version(client):
+    response = client.get(PATH)
+    assert response.status_code == 200
+    version = response.json()["data_version"]
+    assert response.headers["x-data-version"] == str(version)
+    assert response.headers["etag"].startswith(f'W/"{version}-')
+    assert response.headers["cache-control"] == "no-cache"
+    assert len(response.json()["rows"]) == 2
+
+
+def test_if_none_match_is_answered_with_304_before_any_query(client, monkeypatch):
+    etag = client.get(PATH).headers["etag"]
+
+    def fail(*args):
+        raise AssertionError("query ran for a conditional request")
+
+    monkeypatch.setattr(api, "_body", fail)
+    for header in (etag, etag.removeprefix("W/"), f'"other", {etag}', "*"):
+        response = client.get(PATH, headers={"If-None-Match": header})
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response.headers["etag"] == etag
+
+
+def test_etag_depends_on_the_normalised_request(client):
+    etag = client.get(PATH).headers["etag"]
+    assert client.get("/v1/users/states?quarter=1&year=2024").headers["etag"] == etag
+    assert client.get("/v1/users/states?year=2024&quarter=2").headers["etag"] != etag
+    response = client.get("/v1/users/states?year=2024&quarter=2", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+
+
+def test_new_data_version_invalidates_the_etag(client):
+    etag = client.get(PATH).headers["etag"]
+    version = publish()
+    response = client.get(PATH, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    assert response.json()["data_version"] == version
+
+
+def test_failed_query_is_503_without_an_etag_and_not_cached(client, monkeypatch):
+    class Broken:
+        def select(self, *args, **kwargs):
+            raise OSError("disk gone")
+
+    working = queries.get_backend
+    monkeypatch.setattr(queries, "get_backend", lambda: Broken())
+    response = client.get(PATH)
+    assert response.status_code == 503
+    assert "etag" not in response.headers
+    assert "disk gone" in response.json()["error"]
+    monkeypatch.setattr(queries, "get_backend", working)
+    assert client.get(PATH).status_code == 200
+
+
+@pytest.mark.parametrize("path, status", [
+    ("/v1/users/states?year=2024&quarter=5", 400),
+    ("/v1/users/states?year=2024&colour=red", 400),
+    ("/v1/facts/top_brands", 400),
+    ("/v1/facts/no_such_fact?year=2024", 404),
+    ("/v1/periods/no_such_table", 404),
+])
+def test_bad_requests(client, path, status):
+    response = client.get(path)
+    assert response.status_code == status
+    assert "error" in response.json()
@@ -0,0 +1,106 @@
+import os
+
+import pandas as pd
+import pytest
+
+import dataversion
+from backends import ParquetBackend, build_query, snapshot_tables, write_snapshot
+from benchmarks.synthetic import FrameSource
+from schema import TABLES
+
+
+@pytest.fixture
+def snapshot(tmp_path, frames):
+    root = str(tmp_path / "snapshot")
+    write_snapshot(root, source=FrameSource(frames))
+    return root
+
+
+def table_dirs(root, table):
+    return sorted(entry for entry in os.listdir(root) if entry.split(".v")[0] == table)
+
+
+def test_write_snapshot_points_every_table_at_the_new_generation(snapshot):
+    assert dataversion.read_file(snapshot) == 1
+    assert snapshot_tables(snapshot) == {table: f"{table}.v1" for table in TABLES}
+
+
+def test_write_snapshot_keeps_only_the_previous_generation(snapshot, frames):
+    source = FrameSource(frames)
+    # A snapshot written before versioned directories
+    os.rename(os.path.join(snapshot, "top_user.v1"), os.path.join(snapshot, "top_user"))
+    os.remove(os.path.join(snapshot, "_tables.json"))
+    write_snapshot(snapshot, source=source)
+    assert table_dirs(snapshot, "top_user") == ["top_user", "top_user.v2"]
+    write_snapshot(snapshot, source=source)
+    write_snapshot(snapshot, source=source)
+    assert dataversion.read_file(snapshot) == 4
+    assert table_dirs(snapshot, "top_user") == ["top_user.v3", "top_user.v4"]
+    assert table_dirs(snapshot, "map_user") == ["map_user.v3", "map_user.v4"]
+
+
+def test_partial_snapshot_keeps_the_other_tables(snapshot, frames):
+    write_snapshot(snapshot, tables=["map_user"], source=FrameSource(frames))
+    write_snapshot(snapshot, tables=["map_user"], source=FrameSource(frames))
+    tables = snapshot_tables(snapshot)
+    assert tables["map_user"] == "map_user.v3"
+    assert tables["top_user"] == "top_user.v1"
+    assert table_dirs(snapshot, "top_user") == ["top_user.v1"]
+    assert table_dirs(snapshot, "map_user") == ["map_user.v2", "map_user.v3"]
+
+
+def test_parquet_select_matches_pandas(snapshot, frames):
+    backend = ParquetBackend(snapshot)
+    df = backend.select("map_user", group_by=("states",), metrics=("registereduser", "appopens"),
+                        filters={"years": 2024, "quarter": 2})
+    source = frames["map_user"]
+    expected = (source[(source["years"] == 2024) & (source["quarter"] == 2)]
+                .groupby("states", as_index=False)[["registereduser", "appopens"]].sum())
+    pd.testing.assert_frame_equal(df, expected, check_dtype=False)
+
+
+def test_parquet_select_orders_and_limits(snapshot, frames):
+    backend = ParquetBackend(snapshot)
+    df = backend.select("rollup_state_user_year", columns=("states", "registereduser"),
+                        filters={"years": 2023}, order_by="registereduser", descending=True, limit=1)
+    source = frames["rollup_state_user_year"]
+    top = source[source["years"] == 2023].nlargest(1, "registereduser")
+    assert df.to_dict("records") == top[["states", "registereduser"]].to_dict("records")
+
+
+def test_parquet_backend_reads_a_new_snapshot_after_version(snapshot, frames):
+    backend = ParquetBackend(snapshot)
+    assert backend.version() == 1
+    before = backend.select("map_user", metrics=("registereduser",))
+    doubled = dict(frames, map_user=frames["map_user"].assign(registereduser=lambda df: df["registereduser"] * 2))
+    write_snapshot(snapshot, tables=["map_user"], source=FrameSource(doubled))
+    assert backend.version() == 2
+    after = backend.select("map_user", metrics=("registereduser",))
+    assert after["registereduser"][0] == 2 * before["registereduser"][0]
+
+
+def test_duckdb_views_follow_a_new_snapshot(snapshot, frames):
+    pytest.importorskip("duckdb")
+    from backends import DuckDBBackend
+
+    backend = DuckDBBackend("parquet", snapshot)
+    parquet = ParquetBackend(snapshot)
+    args = dict(group_by=("states",), metrics=("transaction_count",), filters={"years": 2023, "quarter": 4})
+    pd.testing.assert_frame_equal(backend.select("map_transaction", **args),
+                                  parquet.select("map_transaction", **args), check_dtype=False)
+    before = backend.select("map_transaction", **args)
+    doubled = frames["map_transaction"].assign(transaction_count=lambda df: df["transaction_count"] * 2)
+    write_snapshot(snapshot, tables=["map_transaction"], source=FrameSource(dict(frames, map_transaction=doubled)))
+    assert backend.version() == 2
+    after = backend.select("map_transaction", **args)
+    assert after["transaction_count"].tolist() == [2 * n for n in before["transaction_count"]]
+
+
+def test_build_query_binds_filters_and_checks_identifiers():
+    query, params = build_query("map_user", group_by=("states",), metrics=("registereduser",),
+                                filters={"years": 2024, "quarter": None}, paramstyle="dollar")
+    assert query == ('SELECT "states", SUM("registereduser")::bigint AS "registereduser" FROM "map_user" '
+                     'WHERE "years" = $years GROUP BY "states" ORDER BY "states" ASC')
+    assert params == {"years": 2024}
+    with pytest.raises(ValueError):
+        build_query("map_user", columns=("states; DROP TABLE map_user",))
@@ -0,0 +1,76 @@
+import pandas as pd
+import pytest
+
+from cube import Cube
+
+DIMENSIONS = ("states", "transaction_type")
+MEASURES = ("transaction_count", "transaction_amount")
+
+
+@pytest.fixture
+def source(frames):
+    return frames["aggregated_transaction"]
+
+
+@pytest.fixture
+def cube(source):
+    return Cube(source, DIMENSIONS, MEASURES)
+
+
+def expected(source, by, start, end, **where):
+    period = source["years"] * 10 + source["quarter"]
+    rows = source[(period >= start[0] * 10 + start[1]) & (period <= end[0] * 10 + end[1])]
+    for dim, value in where.items():
+        rows = rows[rows[dim] == value]
+    return rows.groupby(list(by), as_index=False)[list(MEASURES)].sum()
+
+
+def assert_matches(result, frame, by):
+    result = result.sort_values(list(by), ignore_index=True)
+    pd.testing.assert_frame_equal(result, frame, check_dtype=False, check_exact=False)
+
+
+def test_single_period_by_state(cube, source):
+    assert_matches(cube.aggregate(("states",), (2024, 2)), expected(source, ("states",), (2024, 2), (2024, 2)),
+                   ("states",))
+
+
+def test_range_is_a_difference_of_prefix_sums(cube, source):
+    by = ("transaction_type",)
+    assert_matches(cube.aggregate(by, (2023, 3), (2024, 2)), expected(source, by, (2023, 3), (2024, 2)), by)
+    # start=None starts at the first period
+    assert_matches(cube.aggregate(by, None, (2024, 4)), expected(source, by, (2023, 1), (2024, 4)), by)
+
+
+def test_fixed_dimension_and_reordered_axes(cube, source):
+    state = sorted(source["states"].unique())[1]
+    by = ("transaction_type",)
+    assert_matches(cube.aggregate(by, (2024, 1), (2024, 4), states=state),
+                   expected(source, by, (2024, 1), (2024, 4), states=state), by)
+    result = cube.aggregate(("transaction_type", "states"), (2024, 1))
+    assert list(result.columns[:2]) == ["transaction_type", "states"]
+
+
+def test_totals_without_grouping(cube, source):
+    result = cube.aggregate((), (2023, 1), (2024, 4))
+    assert result["transaction_count"].tolist() == [source["transaction_count"].sum()]
+    assert result["transaction_count"].dtype == "int64"
+
+
+def test_cells_without_rows_are_left_out(source):
+    state = sorted(source["states"].unique())[0]
+    cube = Cube(source[~((source["states"] == state) & (source["transaction_type"] == "Others"))],
+                DIMENSIONS, MEASURES)
+    result = cube.aggregate(DIMENSIONS, (2024, 1))
+    assert len(result) == source["states"].nunique() * source["transaction_type"].nunique() - 1
+
+
+@pytest.mark.parametrize("start, end, where", [
+    ((2019, 1), None, {}),
+    ((2024, 2), (2024, 1), {}),
+    ((2024, 1), None, {"states": "Atlantis"}),
+])
+def test_unknown_periods_and_values_give_an_empty_frame(cube, start, end, where):
+    result = cube.aggregate(("states",), start, end, **where)
+    assert result.empty
+    assert list(result.columns) == ["states", *MEASURES]
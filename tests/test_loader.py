@@ -0,0 +1,77 @@
+import pandas as pd
+
+import loader
+import normalise
+
+KEY = "states, years, quarter, transaction_type"
+
+
+def transactions(*rows):
+    return pd.DataFrame(rows, columns=["States", "Years", "Quarter", "Transaction_type",
+                                       "Transaction_count", "Transaction_amount"])
+
+
+def test_create_table_drops_duplicate_keys_before_the_unique_index(fake_conn):
+    fake_conn.results = [(None,)]
+    with fake_conn.cursor() as cursor:
+        loader.create_table(cursor, "aggregated_transaction")
+    statements = [query for query, _ in fake_conn.executed]
+    delete = fake_conn.statements("DELETE FROM aggregated_transaction")
+    assert delete == [
+        "DELETE FROM aggregated_transaction a USING aggregated_transaction b "
+        "WHERE a.states = b.states AND a.years = b.years AND a.quarter = b.quarter "
+        "AND a.transaction_type = b.transaction_type AND a.ctid < b.ctid"
+    ]
+    index = f"CREATE UNIQUE INDEX aggregated_transaction_natural_key ON aggregated_transaction ({KEY})"
+    assert statements.index(delete[0]) < statements.index(index)
+
+
+def test_create_table_keeps_an_existing_index(fake_conn):
+    fake_conn.results = [("aggregated_transaction_natural_key",)]
+    with fake_conn.cursor() as cursor:
+        loader.create_table(cursor, "aggregated_transaction")
+    assert not fake_conn.statements("DELETE")
+    assert not fake_conn.statements("CREATE UNIQUE INDEX")
+
+
+def test_insert_copies_into_the_table(fake_conn):
+    fake_conn.results = [("aggregated_transaction_natural_key",)]
+    rows = loader.copy_frame(fake_conn, "aggregated_transaction",
+                             transactions(("karnataka", 2024, 1, "Others", 10, 99.6)))
+    assert rows == 1
+    [(copy_sql, data)] = fake_conn.copied
+    assert copy_sql.startswith("COPY aggregated_transaction (")
+    # Slug-form state names are normalised and integers rounded
+    assert data == f"Karnataka,{normalise.STATES.index('Karnataka') + 1},2024,1,Others,10,100\n"
+    assert not fake_conn.statements("INSERT")
+    assert fake_conn.commits == 1
+
+
+def test_upsert_stages_rows_in_order_and_keeps_the_last_per_key(fake_conn):
+    fake_conn.results = [("aggregated_transaction_natural_key",)]
+    batches = [
+        transactions(("Karnataka", 2024, 1, "Others", 1, 1)),
+        transactions(("Karnataka", 2024, 1, "Others", 2, 2), ("Kerala", 2024, 1, "Others", 3, 3)),
+    ]
+    rows = loader.copy_batches(fake_conn, "aggregated_transaction", batches, upsert=True)
+    assert rows == 3
+    assert fake_conn.statements("CREATE TEMP TABLE aggregated_transaction_staging")
+    assert fake_conn.statements("ALTER TABLE aggregated_transaction_staging ADD COLUMN staging_seq bigserial")
+    # Copied in load order, so staging_seq numbers the repeated key's rows 1 and 2
+    assert [copy_sql.split(" (")[0] for copy_sql, _ in fake_conn.copied] == [
+        "COPY aggregated_transaction_staging"] * 2
+    assert [data.splitlines()[0].split(",")[-2] for _, data in fake_conn.copied] == ["1", "2"]
+    [upsert] = fake_conn.statements("INSERT INTO aggregated_transaction")
+    assert f"SELECT DISTINCT ON ({KEY})" in upsert
+    assert f"ORDER BY {KEY}, staging_seq DESC" in upsert
+    assert f"ON CONFLICT ({KEY}) DO UPDATE SET" in upsert
+    assert "transaction_count = EXCLUDED.transaction_count" in upsert
+    assert "states = EXCLUDED" not in upsert
+
+
+def test_prepare_frame_orders_columns_and_rounds_integers():
+    df = transactions(("Kerala", 2024.0, 2, "Others", 4.6, 7.2)).rename(columns=str.lower)
+    frame = loader.prepare_frame("aggregated_transaction", df.assign(state_id=17))
+    assert list(frame.columns) == list(loader.TABLE_SCHEMAS["aggregated_transaction"]["columns"])
+    assert frame.iloc[0].tolist() == ["Kerala", 17, 2024, 2, "Others", 5, 7]
+    assert str(frame["transaction_count"].dtype) == "Int64"
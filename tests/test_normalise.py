@@ -0,0 +1,96 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import geo
+import normalise
+from normalise import STATES, assign_district_ids, district_key, normalise_states, state_ids
+
+
+def state_id(name):
+    return STATES.index(name) + 1
+
+
+@pytest.mark.parametrize("spelling, name", [
+    ("andaman-&-nicobar-islands", "Andaman & Nicobar"),
+    ("Andaman and Nicobar Island", "Andaman & Nicobar"),
+    ("dadra-&-nagar-haveli-&-daman-&-diu", "Dadra and Nagar Haveli and Daman and Diu"),
+    ("Daman and Diu", "Dadra and Nagar Haveli and Daman and Diu"),
+    ("NCT of Delhi", "Delhi"),
+    ("Orissa", "Odisha"),
+    ("pondicherry", "Puducherry"),
+    ("UTTARANCHAL", "Uttarakhand"),
+    ("jammu-&-kashmir", "Jammu & Kashmir"),
+    ("tamil-nadu", "Tamil Nadu"),
+])
+def test_aliases_and_slugs_resolve_to_the_canonical_state(spelling, name):
+    assert list(normalise_states(pd.Series([spelling]))) == [name]
+    assert state_ids(pd.Series([spelling])).tolist() == [state_id(name)]
+
+
+def test_every_alias_targets_a_canonical_state():
+    assert set(normalise.STATE_ALIASES.values()) <= set(STATES)
+
+
+def test_unknown_states_are_tidied_and_get_no_id():
+    states = normalise_states(pd.Series(["new-state", "goa", None]))
+    assert list(states[:2]) == ["New State", "Goa"]
+    assert pd.isna(states[2])
+    # Codes of known states are their ids - 1
+    assert states.codes[1] == state_id("Goa") - 1
+    assert state_ids(pd.Series(["new-state", "goa", None])).tolist() == [0, state_id("Goa"), 0]
+
+
+@pytest.mark.parametrize("name, key", [
+    ("north goa district", "northgoa"),
+    ("North Goa", "northgoa"),
+    ("  Y.S.R. District ", "ysr"),
+    ("Purba Bardhaman & Paschim", "purbabardhamanandpaschim"),
+])
+def test_district_key(name, key):
+    assert district_key(name) == key
+
+
+def test_assign_district_ids_sends_each_pair_once_and_maps_rows_back(fake_conn):
+    states = normalise_states(pd.Series(["goa", "Goa", "kerala", "goa", None]))
+    districts = pd.Series(["north goa district", "North Goa", "Kollam", "south goa district", "Kollam"])
+    fake_conn.results = [[("Goa", "northgoa", 7), ("Goa", "southgoa", 8), ("Kerala", "kollam", 3)]]
+    ids = assign_district_ids(fake_conn, states, districts)
+    assert ids.dtype == "Int32"
+    assert ids[:4].tolist() == [7, 7, 3, 8]
+    assert pd.isna(ids[4])
+    [(_, (pair_states, pair_keys, pair_names))] = [
+        (query, params) for query, params in fake_conn.executed if query.startswith("INSERT INTO district_keys")]
+    assert sorted(zip(pair_states, pair_keys)) == [("Goa", "northgoa"), ("Goa", "southgoa"), ("Kerala", "kollam")]
+    # The first spelling of each district is the one registered
+    assert dict(zip(pair_keys, pair_names))["northgoa"] == "north goa district"
+
+
+def test_assign_district_ids_without_valid_rows_skips_the_database(fake_conn):
+    ids = assign_district_ids(fake_conn, normalise_states(pd.Series([None, "goa"])), pd.Series(["Kollam", None]))
+    assert ids.isna().all()
+    assert fake_conn.executed == []
+
+
+def test_match_states_uses_the_boundary_file_spelling(monkeypatch):
+    features = [{"properties": {"ST_NM": name}} for name in ("Andaman & Nicobar Island", "NCT of Delhi", "Goa")]
+    monkeypatch.setattr(geo, "load_states_geojson", lambda detail="coarse": {"features": features})
+    geo._feature_names.clear()
+    try:
+        states = pd.Series(["Andaman & Nicobar", "Delhi", "Kerala", "Goa"], index=[3, 2, 1, 0])
+        matched = geo.match_states(states)
+    finally:
+        geo._feature_names.clear()
+    assert matched.to_dict() == {3: "Andaman & Nicobar Island", 2: "NCT of Delhi", 1: "Kerala", 0: "Goa"}
+
+
+def test_match_districts_uses_the_geojson_spelling():
+    geojson = {"features": [{"properties": {"DISTRICT": name}} for name in ("North Goa", "South Goa")]}
+    districts = pd.Series(["north goa district", "south goa district", "Kollam", "north goa district"])
+    assert geo.match_districts(districts, geojson).tolist() == ["North Goa", "South Goa", "Kollam", "North Goa"]
+
+
+def test_normalised_codes_are_stable_across_calls():
+    first = normalise_states(pd.Series(["goa", "kerala"]))
+    second = normalise_states(pd.Series(["Kerala", "Goa"]))
+    assert np.array_equal(first.codes, second.codes[::-1])
@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import trends
+from trends import add_trends, period_number
+
+
+def series(values, start=(2022, 1)):
+    first = period_number(*start)
+    periods = np.arange(first, first + len(values))
+    return pd.DataFrame({"years": periods // 4, "quarter": periods % 4 + 1, "transaction_count": values})
+
+
+def test_period_numbers_are_consecutive_across_years():
+    assert (period_number(2020, 1) - period_number(2019, 4)).item() == 1
+    assert period_number([2019, 2020], [4, 1]).tolist() == [2019 * 4 + 3, 2020 * 4]
+
+
+def test_quarter_on_quarter_and_year_on_year_growth():
+    df = add_trends(series([100, 110, 121, 0, 200, 220]), "transaction_count")
+    assert df["qoq_pct"].tolist()[1:3] == pytest.approx([10.0, 10.0])
+    # Growth from zero is unknown, not infinite
+    assert np.isnan(df["qoq_pct"][0]) and np.isnan(df["qoq_pct"][4])
+    assert np.isnan(df["yoy_pct"][:4]).all()
+    assert df["yoy_pct"].tolist()[4:] == pytest.approx([100.0, 100.0])
+
+
+def test_moving_average_uses_up_to_window_quarters():
+    df = add_trends(series([4, 8, 12, 16, 20]), "transaction_count", window=2)
+    assert df["moving_avg"].tolist() == pytest.approx([4, 6, 10, 14, 18])
+
+
+def test_missing_quarters_count_as_unknown():
+    df = series([100, 110, 120, 130, 140, 150]).drop(index=[3, 4])
+    df = add_trends(df.sample(frac=1, random_state=0), "transaction_count")
+    # Sorted by period; 2023 Q2 follows a gap, so its QoQ is unknown
+    assert df["quarter"].tolist() == [1, 2, 3, 2]
+    assert np.isnan(df["qoq_pct"][3])
+    assert df["yoy_pct"][3] == pytest.approx((150 - 110) / 110 * 100)
+
+
+def test_load_trend_filters_the_range_after_computing_growth(monkeypatch):
+    calls = []
+
+    def load_slice(table, group_by, metrics, state=None, raise_errors=False):
+        calls.append((table, state))
+        return series([100, 110, 121, 133.1, 146.41], start=(2023, 1))
+
+    monkeypatch.setattr(trends, "load_slice", load_slice)
+    df = trends.load_trend("transaction_count", start=(2023, 3), end=(2024, 1), state="Goa")
+    assert calls == [("rollup_state_transaction_quarter", "Goa")]
+    assert df["period"].tolist() == ["2023 Q3", "2023 Q4", "2024 Q1"]
+    # The first quarter of the range still compares against 2023 Q2
+    assert df["qoq_pct"][0] == pytest.approx(10.0)
+    assert df["yoy_pct"][2] == pytest.approx(46.41)
+    assert df["cumulative"].tolist() == pytest.approx([121, 254.1, 400.51])
+
+
+def test_registered_users_are_running_totals_already(monkeypatch):
+    monkeypatch.setattr(trends, "load_slice", lambda *args, **kwargs: series([5, 7, 9]).rename(
+        columns={"transaction_count": "registereduser"}))
+    df = trends.load_trend("registereduser")
+    assert df["cumulative"].tolist() == [5, 7, 9]
+
+
+def test_empty_series_has_the_trend_columns(monkeypatch):
+    monkeypatch.setattr(trends, "load_slice", lambda *args, **kwargs: series([]))
+    df = trends.load_trend("transaction_count")
+    assert df.empty
+    assert {"qoq_pct", "yoy_pct", "moving_avg", "cumulative", "period"} <= set(df.columns)
@@ -0,0 +1,76 @@
+"""Quarterly time series with growth rates, moving averages and running totals.
+
+Series are read from the per-state quarterly rollups (see rollups.py), which
+loader.py and ingest.py refresh for the years they load, so a trend over any
+quarter range never rescans the raw tables.
+"""
+import numpy as np
+import pandas as pd
+
+from cube import TIME
+from profiling import timed
+from queries import load_slice
+
+# Quarterly rollup holding each metric
+TREND_TABLES = {
+    "transaction_count": "rollup_state_transaction_quarter",
+    "transaction_amount": "rollup_state_transaction_quarter",
+    "registereduser": "rollup_state_user_quarter",
+    "appopens": "rollup_state_user_quarter",
+}
+
+# Pulse reports registered users as a running total already
+RUNNING_TOTALS = {"registereduser"}
+
+
+def period_number(years, quarter):
+    """Consecutive quarters map to consecutive integers (2019 Q4 -> 2020 Q1 is +1)."""
+    return np.asarray(years, dtype=np.int64) * 4 + np.asarray(quarter, dtype=np.int64) - 1
+
+
+def add_trends(series, metric, window=4):
+    """Add QoQ/YoY growth (%), a moving average and a cumulative total to a quarterly series.
+
+    Growth compares against the same metric one and four quarters earlier;
+    quarters missing from the series count as unknown rather than zero.
+    """
+    series = series.sort_values(list(TIME)).reset_index(drop=True)
+    values = pd.Series(series[metric].to_numpy(dtype=float), index=period_number(series["years"], series["quarter"]))
+    full = values.reindex(np.arange(values.index.min(), values.index.max() + 1)) if len(values) else values
+
+    def growth(lag):
+        previous = full.shift(lag).reindex(values.index)
+        return ((values - previous) / previous.where(previous != 0) * 100).to_numpy()
+
+    moving = full.rolling(window, min_periods=1).mean().reindex(values.index)
+    return series.assign(
+        qoq_pct=growth(1),
+        yoy_pct=growth(4),
+        moving_avg=moving.to_numpy(),
+    )
+
+
+def load_trend(metric, start=None, end=None, state=None, window=4, raise_errors=False):
+    """Quarterly series of `metric` for one state (all states if None) between two (year, quarter)s.
+
+    Growth and moving averages are computed over the full history, so the
+    first quarters of the range still compare against earlier ones; the
+    cumulative column starts at `start`. `raise_errors` is passed to load_slice.
+    """
+    series = load_slice(TREND_TABLES[metric], TIME, (metric,), state=state, raise_errors=raise_errors)
+    if series.empty:
+        return series.assign(qoq_pct=[], yoy_pct=[], moving_avg=[], cumulative=[], period=[])
+    with timed(f"pandas:trend:{metric}"):
+        series = add_trends(series, metric, window)
+    periods = period_number(series["years"], series["quarter"])
+    keep = np.ones(len(series), dtype=bool)
+    if start is not None:
+        keep &= periods >= period_number(*start)
+    if end is not None:
+        keep &= periods <= period_number(*end)
+    series = series[keep].reset_index(drop=True)
+    cumulative = series[metric] if metric in RUNNING_TOTALS else series[metric].cumsum()
+    return series.assign(
+        cumulative=cumulative,
+        period=[f"{year} Q{quarter}" for year, quarter in zip(series["years"], series["quarter"])],
+    )
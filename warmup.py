@@ -0,0 +1,132 @@
+"""Background warm-up of the dashboard caches.
+
+A daemon thread probes the data version (see dataversion.py) every
+VERSION_POLL_INTERVAL seconds. When the dashboard process starts, and
+whenever the version changes, it loads the query, cube and figure caches for
+that version on a small thread pool: every page's data for the newest
+quarter (pagedata.PAGES), the quarterly trend series and the Facts &
+Insights lookups. Only then is the version published
+(queries.publish_version), so readers keep getting the previous one in the
+meantime and no request waits on a reload.
+
+    warmer = Warmer(figure_jobs=latest_quarter_figures)
+    warmer.start()
+"""
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from config import VERSION_POLL_INTERVAL, WARMUP_WORKERS
+from figcache import warm
+from geo import DETAIL_LEVELS, load_states_geojson
+from pagedata import PAGES, PERIOD_TABLES, trend_jobs
+from queries import FACTS, data_version, load_fact, load_periods, pinned_version, probe_version, publish_version
+from trends import TREND_TABLES
+
+logger = logging.getLogger(__name__)
+
+
+def latest_period(table="aggregated_transaction", raise_errors=False):
+    """Newest (year, quarter) in a table, or None if it is empty."""
+    periods = load_periods(table, raise_errors)
+    if periods.empty:
+        return None
+    return max(zip(periods["years"], periods["quarter"]))
+
+
+def default_periods():
+    """{page: (year, quarter)} each page opens on; pages without data are left out."""
+    periods = {page: latest_period(table) for page, table in PERIOD_TABLES.items()}
+    return {page: period for page, period in periods.items() if period is not None}
+
+
+def data_jobs(periods, years):
+    """Query and cube loads behind the pages' default views (see default_periods)."""
+    jobs = [job for page, period in periods.items() for job in PAGES[page](*period)]
+    # Trend series cover every quarter, so they do not depend on the period
+    for metric in TREND_TABLES:
+        jobs += trend_jobs(metric)
+    for fact in FACTS:
+        if fact == "users_growth":
+            jobs.append(lambda f=fact: load_fact(f))
+        else:
+            jobs += [lambda f=fact, y=y: load_fact(f, y) for y in years]
+    jobs += [lambda d=d: load_states_geojson(d) for d in DETAIL_LEVELS]
+    return jobs
+
+
+class Warmer:
+    """Loads and publishes the dashboard caches for each new data version.
+
+    `figure_jobs(year, quarter)` returns figcache.warm() jobs for the charts
+    worth pre-rendering; they run after the data they are built from.
+    """
+
+    def __init__(self, figure_jobs=None, workers=WARMUP_WORKERS, interval=VERSION_POLL_INTERVAL):
+        self.figure_jobs = figure_jobs
+        self.workers = workers
+        self.interval = interval
+        self._wake = threading.Event()
+        self._thread = None
+        self.runs = 0
+        self.last_run_s = None
+        self.last_finished = None
+        self.failures = 0
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="cache-warmup", daemon=True)
+            self._thread.start()
+        return self
+
+    def refresh(self):
+        """Check the data version now instead of at the next interval."""
+        self._wake.set()
+
+    def _loop(self):
+        published = None
+        while True:
+            try:
+                version = probe_version(max_age=0)
+                if version != published:
+                    self.warm(version)
+                    publish_version(version)
+                    published = version
+            except Exception:
+                logger.exception("Cache warm-up failed; keeping data version %s", published)
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+    def _run(self, pool, version, jobs):
+        def run(job):
+            with pinned_version(version):
+                job()
+        failed = sum(1 for future in [pool.submit(run, job) for job in jobs] if future.exception())
+        self.failures += failed
+        return failed
+
+    def warm(self, version):
+        """Load the caches for data version `version`, concurrently."""
+        start = time.perf_counter()
+        with pinned_version(version):
+            period = latest_period()
+            periods = default_periods()
+            years = sorted(load_periods("aggregated_transaction")["years"].unique())
+        if period is None:
+            raise LookupError("No transaction data to warm")
+        year, quarter = period
+        with ThreadPoolExecutor(self.workers, thread_name_prefix="cache-warmup") as pool:
+            failed = self._run(pool, version, data_jobs(periods, years))
+            if self.figure_jobs is not None:
+                jobs = [lambda job=job: warm([job]) for job in self.figure_jobs(year, quarter)]
+                failed += self._run(pool, version, jobs)
+        self.runs += 1
+        self.last_run_s = time.perf_counter() - start
+        self.last_finished = time.time()
+        logger.info("Warmed data version %s (%s Q%s) in %.1fs, %d jobs failed",
+                    version, year, quarter, self.last_run_s, failed)
+
+    def stats(self):
+        return {"version": data_version(), "runs": self.runs, "last_run_s": self.last_run_s,
+                "last_finished": self.last_finished, "failures": self.failures}